@@ -0,0 +1,69 @@
+"""The JSON request contract shared by the AWS lambda function and aims serve.
+
+A request is a JSON object with the following members:
+
+roster
+    The text of the AIMS report.
+format
+    One of "roster", "efj", "csv" or "ical".
+options
+    A list of strings. "ade" includes all day events in ical output, "cache"
+    caches the parse result and "tz=ZONE" sets the time zone of roster
+    output.
+
+The response is the converted text or, if the report could not be
+converted, an error message.
+
+"""
+from typing import Any, Iterable
+
+from aims.parse import parse
+import aims.output as output
+from aims.data_structures import RosterException
+from aims.cache import ParseCache, DEFAULT_DIR
+from aims.localtime import DEFAULT_ZONE
+
+
+def option(options: Iterable[str], name: str, default: str) -> str:
+    """Find the value of an option given as a "name=value" string.
+
+    :param options: The options of a request.
+    :param name: The name of the option.
+    :param default: The value if the option is not present.
+    :return: The value of the option.
+
+    """
+    for item in options:
+        key, sep, value = item.partition("=")
+        if sep and key == name:
+            return value
+    return default
+
+
+def convert(request: dict[str, Any], cache_dir: str = DEFAULT_DIR) -> str:
+    """Convert a report as described by a request.
+
+    :param request: The decoded JSON request.
+    :param cache_dir: The directory used if the "cache" option is given.
+    :return: The converted text, or an error message.
+    :raises KeyError: If a member of the request is missing.
+
+    """
+    in_ = request["roster"]
+    format_ = request["format"]
+    options = request["options"]
+    try:
+        cache = ParseCache(cache_dir) if "cache" in options else None
+        duties, ade = parse(in_, cache)
+        if format_ == "csv":
+            return output.csv(duties)
+        elif format_ == "roster":
+            return output.roster(duties,
+                                 option(options, "tz", DEFAULT_ZONE))
+        elif format_ == "efj":
+            return output.efj(duties)
+        elif format_ == "ical":
+            return output.ical(duties, ade if "ade" in options else ())
+        return "Not implemented"
+    except (RosterException, ValueError) as e:
+        return str(e)
@@ -0,0 +1,207 @@
+"""Conversion of many report files in one run.
+
+Each file is parsed once and rendered in all of the requested formats, with
+the output written alongside the input or to a separate output directory.
+Files are processed in parallel across a pool of worker processes, and a
+failure to convert one file does not stop the others from being processed.
+
+"""
+import glob
+import os
+import os.path
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Iterable, Iterator
+
+from aims.parse import parse, parse_stream, split
+from aims.data_structures import Duty, AllDayEvent
+from aims.cache import ParseCache
+import aims.output as output
+from aims.enrich import enrich
+import aims.source
+from aims.localtime import DEFAULT_ZONE
+
+
+EXTENSIONS = {"roster": ".txt", "efj": ".efj", "csv": ".csv", "ical": ".ics"}
+NIGHT_FORMATS = {"efj", "csv"}
+
+
+class Job:
+
+    def __init__(self, formats: Iterable[str],
+                 output_dir: Optional[str] = None,
+                 with_ade: bool = False,
+                 cache_dir: Optional[str] = None,
+                 tz: str = DEFAULT_ZONE) -> None:
+        self.formats = tuple(formats)
+        self.output_dir = output_dir
+        self.with_ade = with_ade
+        self.cache_dir = cache_dir
+        self.tz = tz
+
+    def output_paths(self, path: str) -> dict[str, str]:
+        """The output file path for each format for a given input file."""
+        stem = aims.source.stem(path)
+        directory = self.output_dir or os.path.dirname(path)
+        return {X: os.path.join(directory, stem + EXTENSIONS[X])
+                for X in self.formats}
+
+    def __call__(self, path: str) -> tuple[str, list[str], Optional[str]]:
+        """Convert a single file.
+
+        Output is written exactly as ``aims FORMAT < path > output`` would
+        write it.
+
+        :param path: The path of the report to convert. This may be gzip
+            compressed or a zip archive, as for parse.
+        :return: A tuple of the input path, the list of output paths written
+            and an error message, which is None on success.
+
+        """
+        written: list[str] = []
+        try:
+            if self.cache_dir:
+                duties, ade = parse(pathlib.Path(path),
+                                    ParseCache(self.cache_dir))
+            else:
+                duties, ade = split(parse_stream(pathlib.Path(path)))
+            if not self.with_ade:
+                ade = ()
+            write(duties, ade, self.output_paths(path), tz=self.tz,
+                  written=written)
+        except Exception as e:
+            return (path, written, f"{type(e).__name__}: {e}")
+        return (path, written, None)
+
+
+def write(duties: Iterable[Duty],
+          ade: tuple[AllDayEvent, ...],
+          paths: dict[str, str],
+          jobs: int = 1,
+          tz: str = DEFAULT_ZONE,
+          written: Optional[list[str]] = None,
+          night_engine: str = "nightflight") -> list[str]:
+    """Render duties in several formats, writing each to its own file.
+
+    Derived data, in particular night flying, is calculated once and shared
+    by all the formats. Files are written exactly as ``aims FORMAT >
+    path`` would write them, and any missing directories are created.
+
+    :param duties: The duties to render.
+    :param ade: All day events, used by the ical format.
+    :param paths: The output path for each format to be written.
+    :param jobs: The number of processes to use for night calculations.
+    :param tz: The IANA name of the time zone for roster output.
+    :param written: A list to which the paths are appended as each file is
+        written, so that the caller knows which files exist if an error
+        occurs part way through.
+    :param night_engine: The night calculation engine, one of
+        aims.night.ENGINES.
+    :return: The list of paths written.
+
+    """
+    written = [] if written is None else written
+    enriched = tuple(enrich(duties, night=bool(
+        NIGHT_FORMATS.intersection(paths)), jobs=jobs,
+        night_engine=night_engine))
+    for format_, path in paths.items():
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            output.write(format_, enriched, f, ade, tz=tz)
+            f.write("\n")
+        written.append(path)
+    return written
+
+
+def expand(patterns: Iterable[str]) -> list[str]:
+    """Expand glob patterns, preserving order and removing duplicates.
+
+    Arguments that contain no glob characters are passed through unchanged,
+    so that missing files are reported as failures rather than ignored.
+
+    """
+    seen: set[str] = set()
+    paths: list[str] = []
+    for pattern in patterns:
+        matches = (sorted(glob.glob(pattern)) if glob.has_magic(pattern)
+                   else [pattern])
+        for match in matches:
+            if match not in seen:
+                seen.add(match)
+                paths.append(match)
+    return paths
+
+
+def _clashes(paths: list[str], job: Job) -> dict[int, str]:
+    # error messages, by position, for the inputs that would write to an
+    # output file of an earlier input, e.g. r.htm and r.htm.gz
+    owners: dict[str, str] = {}
+    errors = {}
+    for index, path in enumerate(paths):
+        outputs = {os.path.normcase(os.path.abspath(X)): X
+                   for X in job.output_paths(path).values()}
+        clash = next((X for X in outputs if X in owners), None)
+        if clash:
+            errors[index] = (f"Output file {outputs[clash]} is also the "
+                             f"output of {owners[clash]}")
+        else:
+            owners.update(dict.fromkeys(outputs, path))
+    return errors
+
+
+def convert(paths: Iterable[str], job: Job, jobs: Optional[int] = None
+            ) -> Iterator[tuple[str, list[str], Optional[str]]]:
+    """Convert a set of files.
+
+    A file whose output files would overwrite those of an earlier file is
+    not converted, and is reported as a failure.
+
+    :param paths: The paths of the reports to convert.
+    :param job: The conversion settings.
+    :param jobs: The number of worker processes. Defaults to the number of
+        CPUs. If 1, files are converted in the current process.
+    :return: An iterator of the results of Job.__call__, in input order.
+
+    """
+    paths = list(paths)
+    errors = _clashes(paths, job)
+    todo = [X for n, X in enumerate(paths) if n not in errors]
+    jobs = min(jobs or os.cpu_count() or 1, len(todo) or 1)
+    if jobs == 1:
+        yield from _merged(paths, errors, map(job, todo))
+        return
+    with ProcessPoolExecutor(jobs) as executor:
+        yield from _merged(paths, errors, executor.map(job, todo))
+
+
+def _merged(paths: list[str], errors: dict[int, str],
+            results: Iterator[tuple[str, list[str], Optional[str]]]
+            ) -> Iterator[tuple[str, list[str], Optional[str]]]:
+    # the results in input order, with those of the skipped inputs
+    for index, path in enumerate(paths):
+        if index in errors:
+            yield (path, [], errors[index])
+        else:
+            yield next(results)
+
+
+def run(patterns: Iterable[str], job: Job, jobs: Optional[int] = None) -> int:
+    """Convert a set of files, reporting progress on stdout and stderr.
+
+    :return: 0 if all files were converted, otherwise 1.
+
+    """
+    failed = 0
+    paths = expand(patterns)
+    for path, written, error in convert(paths, job, jobs):
+        if error:
+            failed += 1
+            print(f"{path}: {error}", file=sys.stderr)
+        else:
+            print(f"{path} -> {', '.join(written)}")
+    if failed:
+        print(f"{failed} of {len(paths)} files failed", file=sys.stderr)
+    return 1 if failed else 0
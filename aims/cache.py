@@ -0,0 +1,157 @@
+"""Content addressed on-disk cache of parse results.
+
+Parsing is by far the most expensive part of converting a report, and the
+same report is often converted several times, e.g. to produce different
+output formats. Results are therefore stored under a key derived from the
+input HTML and the package version, so that a change to either invalidates
+the entry. Entries are pickled and compressed with zlib.
+
+The cache is bounded in size. The modification time of each entry is updated
+whenever it is read, and the least recently used entries are removed when the
+total size of the cache exceeds the limit.
+
+"""
+import os
+import os.path
+import zlib
+from typing import Optional, Union
+
+from aims.data_structures import Duty, AllDayEvent
+from aims.source import Buffer
+
+
+Result = tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]
+
+DEFAULT_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "aims-convert")
+DEFAULT_MAX_BYTES = 32 << 20
+SUFFIX = ".pickle.z"
+
+
+class ParseCache:
+
+    def __init__(self, directory: str = DEFAULT_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, html: Union[str, Buffer]) -> str:
+        """Generate the cache key for a document.
+
+        :param html: The text of the document, or its raw bytes. Text is
+            hashed as UTF-8, so a UTF-8 encoded document has the same key
+            whether it is supplied as text or bytes.
+        :return: A hex digest of the package version and the document.
+
+        """
+        # imported here so that merely importing this module, e.g. for
+        # DEFAULT_DIR, stays cheap
+        import hashlib
+        from aims.version import VERSION
+        h = hashlib.sha256(VERSION.encode())
+        h.update(b"\0")
+        if isinstance(html, str):
+            h.update(html.encode("utf-8", "surrogatepass"))
+        else:
+            h.update(html)
+        return h.hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[Result]:
+        """Retrieve a result from the cache.
+
+        Entries that cannot be read or decoded are treated as misses and
+        removed.
+
+        :param key: A key as generated by the key method.
+        :return: The stored result, or None if there is no usable entry.
+
+        """
+        import pickle
+        path = self.__path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            result = pickle.loads(zlib.decompress(data))
+        except Exception:
+            self.__remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key: str, result: Result) -> None:
+        """Store a result in the cache, evicting old entries if required.
+
+        Failure to write to the cache is not an error; the result is simply
+        not stored.
+
+        :param key: A key as generated by the key method.
+        :param result: The result of parsing the document.
+
+        """
+        import pickle
+        import tempfile
+        data = zlib.compress(
+            pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        if len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self.__path(key))
+            except BaseException:
+                # don't leave a partly written file behind
+                os.unlink(tmp)
+                raise
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until within the size limit."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(SUFFIX):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.__remove(path)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(SUFFIX):
+                        self.__remove(entry.path)
+        except OSError:
+            pass
+
+    def __remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
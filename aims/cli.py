@@ -2,38 +2,304 @@
 
 import sys
 import argparse
+import os.path
+from typing import Iterable, Iterator, Union, TYPE_CHECKING
 
-from aims.parse import parse
-import aims.output as output
-from aims.version import VERSION
+# Only the modules needed to parse the arguments are imported here. Those
+# needed to convert a report, or by other code paths such as batch
+# conversion, are imported where they are used, so that every invocation
+# doesn't pay for them. See tests/test_import_time.py.
+if TYPE_CHECKING:
+    from aims.data_structures import Duty, AllDayEvent
+
+
+DEFAULT_PREFIX = "aims"
+
+
+def _format_list(value: str) -> list[str]:
+    from aims.output import FORMATS
+    formats = [X.strip() for X in value.split(",")]
+    for format_ in formats:
+        if format_ not in FORMATS:
+            raise argparse.ArgumentTypeError(
+                f"invalid format: {format_!r} "
+                f"(choose from {', '.join(FORMATS)})")
+    return formats
+
+
+def _zone(value: str) -> str:
+    import aims.localtime
+    try:
+        aims.localtime.zone(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
 
 
 def _args():
     parser = argparse.ArgumentParser(
         description=(
             'Process an AIMS detailed roster into various useful formats.'))
-    parser.add_argument('format',
-                        choices=['roster', 'efj', 'csv', 'ical', 'version'])
+    parser.add_argument('format', metavar='FORMAT',
+                        help=('One of roster, efj, csv, ical, version, '
+                              'batch, watch or serve, or a comma separated '
+                              'list of output formats to write to files'))
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help=('Files or glob patterns to convert (batch '
+                              'only), or the directory to watch (watch '
+                              'only)'))
     parser.add_argument('--ade', action="store_true")
-    return parser.parse_args()
+    parser.add_argument('--input', '-i', metavar='PATH',
+                        help=('Read the report from PATH, which may be gzip '
+                              'compressed or a zip archive, instead of '
+                              'stdin'))
+    # the default directory is that of aims.cache, which is only imported if
+    # used
+    parser.add_argument('--cache', nargs='?', const=True,
+                        metavar='DIR',
+                        help=('Cache parse results in DIR (default: '
+                              '$XDG_CACHE_HOME/aims-convert, or '
+                              '~/.cache/aims-convert if XDG_CACHE_HOME is '
+                              'not set)'))
+    parser.add_argument('--formats', type=_format_list, default=['efj'],
+                        metavar='LIST',
+                        help=('Comma separated list of formats to produce '
+                              '(batch and watch only, default: efj)'))
+    parser.add_argument('--jobs', '-j', type=int, metavar='N',
+                        help=('Number of worker processes. For batch, files '
+                              'are converted in parallel (default: number '
+                              'of CPUs); for efj and csv, night flying '
+                              'calculations are; for watch, reports that '
+                              'are ready at once are; for serve, requests '
+                              'are (default: 1)'))
+    # the choices are aims.night.ENGINES, which is only imported if used
+    parser.add_argument('--night-engine', default='nightflight',
+                        choices=('nightflight', 'numpy'),
+                        help=('How night flying is calculated for efj and '
+                              'csv output. numpy, which requires NumPy, is '
+                              'faster for large logbooks, but night '
+                              'durations may differ by up to 2 minutes from '
+                              'those of the default, and night landings '
+                              'close to the end of twilight may differ '
+                              '(default: %(default)s)'))
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help=('Write output files to DIR. For batch and '
+                              'watch, the default is alongside the input; '
+                              'otherwise it is the current directory'))
+    parser.add_argument('--prefix', metavar='NAME',
+                        help=('File name, without extension, of output '
+                              'files (default: the name of the --input '
+                              f'file, or {DEFAULT_PREFIX!r})'))
+    # the default is that of aims.localtime, which is only imported if used
+    parser.add_argument('--tz', type=_zone, metavar='ZONE',
+                        help=('Time zone for local times in roster output, '
+                              'e.g. Europe/Madrid '
+                              '(default: Europe/London)'))
+    parser.add_argument('--sync', metavar='FILE',
+                        help=('Only output events that have changed since '
+                              'FILE, either a calendar produced by an earlier '
+                              'ical conversion or a --sync-state file '
+                              '(ical only)'))
+    parser.add_argument('--sync-state', metavar='FILE',
+                        help=('Save the state of the events to FILE, for use '
+                              'with --sync next time (ical only)'))
+    parser.add_argument('--timings', action='store_true',
+                        help=('Report the time and CPU time spent in each '
+                              'stage of the conversion on stderr'))
+    parser.add_argument('--allocations', action='store_true',
+                        help=('As --timings, also reporting the memory '
+                              'allocated in each stage. Tracing allocations '
+                              'slows the conversion considerably, so the '
+                              'times are less representative'))
+    parser.add_argument('--profile', metavar='FILE',
+                        help=('Write cProfile statistics to FILE and '
+                              'collapsed stacks, for flame graphs, to '
+                              'FILE.folded'))
+    # the default is that of aims.watch, which is only imported if used
+    parser.add_argument('--interval', type=float, default=2.0,
+                        metavar='SECONDS',
+                        help=('Time between checks of the directory (watch '
+                              'only, default: %(default)s)'))
+    # the defaults are those of aims.serve, which is only imported if used
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on (serve only, default: '
+                        '%(default)s)')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='Port to listen on (serve only, default: '
+                        '%(default)s)')
+    parser.add_argument('--socket', metavar='PATH',
+                        help=('Listen on a Unix domain socket at PATH '
+                              'instead of a port (serve only)'))
+    parser.add_argument('--threads', type=int, default=8, metavar='N',
+                        help=('Number of connections handled at once '
+                              '(serve only, default: %(default)s)'))
+    parser.add_argument('--max-bytes', type=int, default=16 << 20,
+                        metavar='N',
+                        help=('Largest request accepted (serve only, '
+                              'default: %(default)s)'))
+    args = parser.parse_args()
+    if args.cache is True:
+        from aims.cache import DEFAULT_DIR
+        args.cache = DEFAULT_DIR
+    args.outputs = []
+    if args.format not in ('version', 'batch', 'watch', 'serve'):
+        try:
+            args.outputs = _format_list(args.format)
+        except argparse.ArgumentTypeError as e:
+            parser.error(f"argument FORMAT: {e}")
+        args.format = args.outputs[0]
+    if args.format in ('batch', 'watch') and args.prefix:
+        parser.error(f"--prefix is not used with {args.format}")
+    if args.format == 'batch' and not args.files:
+        parser.error("batch requires at least one FILE")
+    elif args.format == 'watch' and len(args.files) != 1:
+        parser.error("watch requires a single directory")
+    elif args.format not in ('batch', 'watch') and args.files:
+        parser.error("FILE arguments are only used with batch and watch")
+    if args.format in ('batch', 'watch', 'serve') and args.input:
+        parser.error(f"--input is not used with {args.format}")
+    if args.format == 'serve' and (args.output_dir or args.prefix):
+        parser.error("--output-dir and --prefix are not used with serve")
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+    if args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if ((args.sync or args.sync_state)
+            and (args.outputs != ['ical'] or args.output_dir or args.prefix)):
+        parser.error("--sync and --sync-state are only used with ical output "
+                     "to stdout")
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.night_engine != 'nightflight':
+        if args.format in ('batch', 'watch', 'serve'):
+            parser.error(f"--night-engine is not used with {args.format}")
+        import importlib.util
+        if importlib.util.find_spec("numpy") is None:
+            parser.error("--night-engine numpy requires NumPy")
+    return args
+
+
+def _output_paths(args) -> dict[str, str]:
+    from aims.batch import EXTENSIONS
+    import aims.source
+    prefix = args.prefix or (aims.source.stem(args.input) if args.input
+                             else DEFAULT_PREFIX)
+    return {X: os.path.join(args.output_dir or "", prefix + EXTENSIONS[X])
+            for X in args.outputs}
+
+
+def _duties(events: Iterable[Union["Duty", "AllDayEvent"]],
+            ade: list["AllDayEvent"]) -> Iterator["Duty"]:
+    from aims.data_structures import Duty
+    for event in events:
+        if isinstance(event, Duty):
+            yield event
+        else:
+            ade.append(event)
+
+
+def _batch(args) -> int:
+    import aims.batch as batch
+    job = batch.Job(args.formats, args.output_dir, args.ade, args.cache,
+                    args.tz)
+    return batch.run(args.files, job, args.jobs)
+
+
+def _watch(args) -> int:
+    import aims.batch as batch
+    import aims.watch
+    job = batch.Job(args.formats, args.output_dir, args.ade, args.cache,
+                    args.tz)
+    return aims.watch.run(args.files[0], job, args.interval, args.jobs or 1)
+
+
+def _serve(args) -> int:
+    import aims.serve
+    from aims.cache import DEFAULT_DIR
+    return aims.serve.run((args.host, args.port), args.socket, args.threads,
+                          args.jobs or 1, args.max_bytes,
+                          args.cache or DEFAULT_DIR)
 
 
 def main() -> int:
     args = _args()
+    args.timings = args.timings or args.allocations
+    if not (args.timings or args.profile):
+        return _main(args)
+    import contextlib
+    import aims.instrument
+    with contextlib.ExitStack() as stack:
+        if args.profile:
+            stack.enter_context(aims.instrument.profile(args.profile))
+        if args.timings:
+            timings = stack.enter_context(
+                aims.instrument.collect(args.allocations))
+        retval = _main(args)
+    if args.timings:
+        print(timings.summary(), file=sys.stderr)
+    return retval
+
+
+def _main(args) -> int:
     if args.format == "version":
+        from aims.version import VERSION
         print(f"Version: {VERSION}")
         return 0
-    duties, ade = parse(sys.stdin.read())
-    if args.format == "roster":
-        print(output.roster(duties))
-    elif args.format == "efj":
-        print(output.efj(duties))
-    elif args.format == "csv":
-        print(output.csv(duties))
-    elif args.format == "ical":
-        if not args.ade:
-            ade = ()
-        print(output.ical(duties, ade))
+    # not given to argparse as the default, since it would then validate it,
+    # which means importing zoneinfo even when it isn't needed
+    from aims.localtime import DEFAULT_ZONE
+    args.tz = args.tz or DEFAULT_ZONE
+    if args.format == "batch":
+        return _batch(args)
+    if args.format == "watch":
+        return _watch(args)
+    if args.format == "serve":
+        return _serve(args)
+    from aims.parse import parse, parse_stream, split
+    import aims.output as output
+    # stdin is read as bytes so that the document's own encoding declaration
+    # is used to decode it
+    path = None
+    if args.input:
+        import pathlib
+        path = pathlib.Path(args.input)
+    if args.cache:
+        # the whole document is needed to calculate the cache key
+        import itertools
+        from aims.cache import ParseCache
+        events: Iterable[Union[Duty, AllDayEvent]] = itertools.chain(
+            *parse(path or sys.stdin.buffer.read(), ParseCache(args.cache)))
+    else:
+        events = parse_stream(path or sys.stdin.buffer)
+    jobs = args.jobs or 1
+    if len(args.outputs) > 1 or args.output_dir or args.prefix:
+        # parse once, then write each format to its own file
+        import aims.batch as batch
+        duties, all_day = split(events)
+        batch.write(duties, all_day if args.ade else (), _output_paths(args),
+                    jobs, args.tz, night_engine=args.night_engine)
+        return 0
+    if args.sync or args.sync_state:
+        import aims.ical_sync as ical_sync
+        duties, all_day = split(events)
+        text, state = ical_sync.sync(
+            duties, all_day if args.ade else (),
+            ical_sync.load(args.sync) if args.sync else {})
+        if text:
+            print(text)
+        else:
+            # an empty calendar isn't valid, so nothing is output
+            print("No changes to output", file=sys.stderr)
+        if args.sync_state:
+            ical_sync.save(state, args.sync_state)
+        return 0
+    # duties are rendered and written as they are parsed; all day events
+    # are collected along the way, and are only needed once the duties
+    # have all been rendered
+    ade: list[AllDayEvent] = []
+    output.write(args.format, _duties(events, ade), sys.stdout,
+                 ade if args.ade else (), jobs, args.tz, args.night_engine)
+    print()
     return 0
 
 
@@ -0,0 +1,189 @@
+"""Derived per-sector and per-duty data shared by the output renderers.
+
+Several output formats need the same values derived from each sector, such
+as the block time, the night flying and the cleaned up crew names, and the
+night calculation in particular is expensive. The enrich function calculates
+these once, so that rendering the same duties in several formats doesn't
+repeat the work.
+
+aims.night, and with it the airport database, is only imported once night
+flying is actually calculated.
+
+"""
+import datetime as dt
+from functools import lru_cache
+from typing import NamedTuple, Iterable, Iterator, Union, Optional, Callable
+
+from aims.data_structures import Duty, Sector, CrewMember
+import aims.instrument
+
+
+class EnrichedSector(NamedTuple):
+    sector: Sector
+    duration: int  # block time in minutes
+    night: int  # night flying in minutes
+    night_landing: bool
+    crew: tuple[CrewMember, ...]  # with cleaned names
+    captains: tuple[str, ...]  # cleaned names of crew with role CP
+
+
+class EnrichedDuty(NamedTuple):
+    duty: Duty
+    sectors: tuple[EnrichedSector, ...]
+    airports: tuple[str, ...]
+    route: str
+    night: bool  # whether night flying has been calculated
+
+
+NightFunction = Callable[[Sector], tuple[int, bool]]
+
+
+CACHE_SIZE = 4096
+_DROP = frozenset(("LR", "SR", "50%"))  # annotations rather than names
+_STRIP = str.maketrans("", "", "*,")
+
+
+def _clean_part(part: str) -> str:
+    part = part.capitalize()
+    # remove bracketted stuff and LR, SR, 50%
+    if part[0] == "(" or part.upper() in _DROP:
+        return ""
+    # remove stars and commas
+    part = part.translate(_STRIP)
+    # capitalize after - and ' and after Mc
+    for char in ("-", "'"):
+        index = part.find(char) + 1
+        if 0 < index < len(part):
+            part = part[:index] + part[index:].capitalize()
+    if len(part) > 2 and part.startswith("Mc"):
+        part = part[:2] + part[2:].capitalize()
+    return part
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def clean_name(name: str) -> str:
+    """Normalise a crew name as it appears in AIMS reports.
+
+    Names are converted to capitalised words, with capitals also following
+    hyphens, apostrophes and a leading "Mc". Annotations such as stars,
+    commas, bracketted text and the LR, SR and 50% markers are removed.
+
+    The same few hundred names recur throughout a logbook, so results are
+    cached.
+
+    :param name: The name as it appears in the report.
+    :return: The cleaned name.
+
+    """
+    return " ".join(X for X in map(_clean_part, name.split()) if X)
+
+
+def flown(sector: Sector) -> bool:
+    """Whether a sector was actually flown, rather than being a positioning
+    sector or a non-flying duty."""
+    return not (sector.position or sector.quasi)
+
+
+def _night(sector: Sector) -> tuple[int, bool]:
+    import aims.night
+    with aims.instrument.stage("night"):
+        return aims.night.night(sector.from_, sector.to, sector.off,
+                                sector.on)
+
+
+def _airports(duty: Duty) -> tuple[str, ...]:
+    airports = []
+    from_ = None
+    for sector in duty.sectors:
+        if not from_ and sector.from_:
+            from_ = sector.from_
+        if sector.position:
+            airports.append("[psn]")
+        elif sector.quasi:
+            if sector.from_:
+                airports.append(f"[{sector.name}]")
+            else:
+                airports.append(sector.name)
+        if sector.to:
+            airports.append(sector.to)
+    if from_:
+        airports = [from_] + airports
+    return tuple(airports)
+
+
+def _sector(sector: Sector, night: Optional[NightFunction]) -> EnrichedSector:
+    night_duration, night_landing = (
+        night(sector) if night and flown(sector) else (0, False))
+    crew = tuple(CrewMember(clean_name(X.name), X.role) for X in sector.crew)
+    return EnrichedSector(
+        sector,
+        (sector.on - sector.off) // dt.timedelta(minutes=1),
+        night_duration, night_landing,
+        crew,
+        tuple(X.name for X in crew if X.role == "CP"))
+
+
+def _duty(duty: Duty, night: Optional[NightFunction]) -> EnrichedDuty:
+    airports = _airports(duty)
+    return EnrichedDuty(duty,
+                        tuple(_sector(X, night) for X in duty.sectors),
+                        airports, "-".join(airports),
+                        night is not None)
+
+
+def _night_function(duties: tuple[Union[Duty, EnrichedDuty], ...],
+                    jobs: int, engine: str) -> NightFunction:
+    # the night calculations for all the flown sectors are done up front,
+    # across a pool of jobs worker processes or with NumPy
+    import aims.night
+    sectors = [X for duty in duties if not isinstance(duty, EnrichedDuty)
+               for X in duty.sectors if flown(X)]
+    sectors += [X.sector for duty in duties
+                if isinstance(duty, EnrichedDuty) and not duty.night
+                for X in duty.sectors if flown(X.sector)]
+    with aims.instrument.stage("night"):
+        results = aims.night.nights(sectors, jobs, engine)
+    return dict(zip(sectors, results)).__getitem__
+
+
+def enrich(duties: Iterable[Union[Duty, EnrichedDuty]],
+           night: bool = True,
+           jobs: int = 1,
+           night_engine: str = "nightflight") -> Iterator[EnrichedDuty]:
+    """Calculate the derived data of each duty and its sectors.
+
+    :param duties: The duties to process. Duties that have already been
+        enriched are passed through unchanged, unless night is True and
+        night flying was not calculated when they were enriched.
+    :param night: Whether to calculate night flying. This is the most
+        expensive part of enrichment, and is only needed by some output
+        formats. If False, night durations are 0 and night landing flags
+        are False.
+    :param jobs: The number of worker processes to use for the night
+        calculations. If more than one, all the duties are read before the
+        first is yielded.
+    :param night_engine: The night calculation engine, one of
+        aims.night.ENGINES. With the "numpy" engine, all the duties are read
+        before the first is yielded.
+    :return: An iterator of EnrichedDuty objects.
+
+    """
+    return aims.instrument.iterate(
+        "enrich", _enrich(duties, night, jobs, night_engine))
+
+
+def _enrich(duties: Iterable[Union[Duty, EnrichedDuty]],
+            night: bool,
+            jobs: int,
+            night_engine: str) -> Iterator[EnrichedDuty]:
+    night_function: Optional[NightFunction] = _night if night else None
+    if night and (jobs > 1 or night_engine != "nightflight"):
+        duties = tuple(duties)
+        night_function = _night_function(duties, jobs, night_engine)
+    for duty in duties:
+        if isinstance(duty, EnrichedDuty):
+            if duty.night or not night:
+                yield duty
+                continue
+            duty = duty.duty
+        yield _duty(duty, night_function)
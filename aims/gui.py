@@ -1,5 +1,6 @@
 import os.path
 import json
+import pathlib
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
@@ -7,6 +8,7 @@ from tkinter import filedialog
 import ctypes
 
 import aims.parse
+from aims.cache import ParseCache, DEFAULT_DIR
 from aims.data_structures import RosterException, InputFileException
 from aims.output import csv, ical, efj
 from aims.version import VERSION
@@ -302,22 +304,29 @@ class MainWindow(ttk.Frame):
             messagebox.showerror("Error", str(e))
 
     def __roster_html(self):
-        retval = ""
+        # the file is returned as a path so that it can be decoded with
+        # the encoding that it declares, and so that compressed files work
         path = self.settings.get('openPath')
         fn = filedialog.askopenfilename(
             filetypes=(
                 ("HTML file", "*.htm"),
                 ("HTML file", "*.html"),
+                ("Compressed HTML file", "*.htm.gz"),
+                ("Zip archive", "*.zip"),
                 ("All", "*.*")),
             initialdir=path)
-        if fn:
-            self.settings['openPath'] = os.path.dirname(fn)
-            try:
-                with open(fn) as f:
-                    retval = f.read()
-            except Exception:
-                raise InputFileException
-        return retval
+        if not fn:
+            return None
+        self.settings['openPath'] = os.path.dirname(fn)
+        if not os.path.isfile(fn):
+            raise InputFileException
+        return pathlib.Path(fn)
+
+    def __parse(self, html):
+        cache = None
+        if self.settings.get('cache'):
+            cache = ParseCache(self.settings.get('cacheDir', DEFAULT_DIR))
+        return aims.parse.parse(html, cache)
 
     def __csv(self):
         txt = ""
@@ -328,7 +337,7 @@ class MainWindow(ttk.Frame):
         self.txt.insert(tk.END, "Getting registration and type info...")
         self.txt.update()
 
-        duties, _ = aims.parse.parse(html)
+        duties, _ = self.__parse(html)
         # note: normalise newlines for Text widget - will restore on output
         txt = csv(duties).replace("\r\n", "\n")
         self.txt.delete('1.0', tk.END)
@@ -338,7 +347,7 @@ class MainWindow(ttk.Frame):
         html = self.__roster_html()
         if not html:
             return
-        duties, ade = aims.parse.parse(html)
+        duties, ade = self.__parse(html)
         # note: normalise newlines for Text widget - will restore on output
         if not self.ms.with_ade.get():
             ade = ()
@@ -353,7 +362,7 @@ class MainWindow(ttk.Frame):
         self.txt.delete('1.0', tk.END)
         self.txt.insert(tk.END, "Working…", 'efj')
         self.txt.update()
-        duties, _ = aims.parse.parse(html)
+        duties, _ = self.__parse(html)
         txt = efj(duties)
         self.txt.delete('1.0', tk.END)
         self.txt.insert(tk.END, txt, 'efj')
@@ -0,0 +1,215 @@
+"""Incremental iCalendar output.
+
+The ical renderer stamps every event with the current time, so a calendar
+client that imports a fresh conversion each day has to treat every event as
+modified. Here, the events are compared with those previously produced,
+identified by their UIDs. Only events that are new or have changed are
+output, each with an incremented SEQUENCE. Events that have disappeared are
+output again with STATUS:CANCELLED. Unchanged events keep their original
+timestamps.
+
+The previous events are taken from a state file written by save, or from a
+complete calendar produced by an earlier ical conversion.
+
+"""
+import datetime as dt
+import hashlib
+import json
+import os
+import os.path
+import re
+import tempfile
+from typing import NamedTuple, Iterable, Optional
+
+from aims.data_structures import AllDayEvent, InputFileException
+from aims.output import (
+    Duties, vcalendar, ical_datetime, _ical_events)
+
+STATE_VERSION = 1
+VOLATILE = ("DTSTAMP", "LAST-MODIFIED", "SEQUENCE")
+
+
+class EventState(NamedTuple):
+    digest: str  # hash of the event's content, excluding VOLATILE
+    sequence: int
+    event: str  # the VEVENT as last output, including its timestamps
+
+
+State = dict[str, EventState]
+
+
+def _lines(event: str) -> list[str]:
+    # unfolded content lines
+    return re.sub(r"\r\n[ \t]", "", event).split("\r\n")
+
+
+def _name(line: str) -> str:
+    return re.split("[;:]", line, maxsplit=1)[0].upper()
+
+
+def _property(event: str, name: str) -> Optional[str]:
+    for line in _lines(event):
+        if _name(line) == name:
+            return line.partition(":")[2]
+    return None
+
+
+def digest(event: str) -> str:
+    """Hash the content of a VEVENT, ignoring its timestamps and sequence.
+
+    :param event: The text of the event, from BEGIN:VEVENT to END:VEVENT.
+    :return: A hex digest.
+
+    """
+    lines = [X for X in _lines(event) if _name(X) not in VOLATILE]
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def _event_state(event: str) -> EventState:
+    sequence = _property(event, "SEQUENCE") or "0"
+    return EventState(digest(event),
+                      int(sequence) if sequence.isdigit() else 0,
+                      event)
+
+
+def _stamped(event: str, sequence: int, modified: str,
+             cancelled: bool = False) -> str:
+    lines = [X for X in event.split("\r\n")
+             if _name(X) not in VOLATILE
+             and not (cancelled and _name(X) == "STATUS")]
+    if cancelled:
+        lines.insert(-1, "STATUS:CANCELLED")
+    lines[-1:-1] = [f"SEQUENCE:{sequence}", f"DTSTAMP:{modified}",
+                    f"LAST-MODIFIED:{modified}"]
+    return "\r\n".join(lines)
+
+
+def _cancelled(state: EventState) -> bool:
+    return _property(state.event, "STATUS") == "CANCELLED"
+
+
+def state_from_ical(text: str) -> State:
+    """Extract the state of each event in a calendar.
+
+    :param text: An iCalendar document, e.g. the output of aims.output.ical.
+    :return: The state of each event, keyed by UID.
+
+    """
+    state: State = {}
+    event: Optional[list[str]] = None
+    for line in re.split(r"\r?\n", text):
+        if line == "BEGIN:VEVENT":
+            event = [line]
+        elif event is not None:
+            event.append(line)
+            if line == "END:VEVENT":
+                vevent = "\r\n".join(event)
+                uid = _property(vevent, "UID")
+                if uid:
+                    state[uid] = _event_state(vevent)
+                event = None
+    return state
+
+
+def load(path: str) -> State:
+    """Load the previous state.
+
+    :param path: The path of a state file written by save, or of a calendar
+        written by an earlier ical conversion. A missing file is treated as
+        having no previous events.
+    :return: The state of each event, keyed by UID.
+
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return {}
+    except (OSError, UnicodeDecodeError) as e:
+        raise InputFileException(f"Unable to read {path}: {e}")
+    if text.lstrip().startswith("BEGIN:VCALENDAR"):
+        return state_from_ical(text)
+    try:
+        data = json.loads(text)
+        if data["version"] != STATE_VERSION:
+            raise ValueError(f"unsupported version {data['version']}")
+        return {uid: EventState(X["digest"], X["sequence"], X["event"])
+                for uid, X in data["events"].items()}
+    except (ValueError, KeyError, TypeError) as e:
+        raise InputFileException(f"Bad sync state file {path}: {e}")
+
+
+def save(state: State, path: str) -> None:
+    """Save the state for the next sync.
+
+    The file is replaced atomically, so it is never left part written.
+
+    :param state: The state returned by sync.
+    :param path: The path of the state file.
+
+    """
+    data = {"version": STATE_VERSION,
+            "events": {uid: X._asdict() for uid, X in state.items()}}
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def sync(duties: Duties,
+         ade: Iterable[AllDayEvent],
+         previous: State,
+         full: bool = False) -> tuple[str, State]:
+    """Produce iCalendar output containing only the changed events.
+
+    A report only covers a limited period, so previous events that start
+    before the first event of the new calendar are assumed to have fallen
+    out of that period. They are kept in the state, but not cancelled.
+
+    :param duties: The duties to render.
+    :param ade: The all day events to render.
+    :param previous: The state from the previous sync, as returned by load.
+        If empty, every event is new.
+    :param full: If True, unchanged events and earlier events are also
+        output, with their original timestamps, so that the output is a
+        complete calendar.
+    :return: A tuple of the calendar and the new state. If there are no
+        events to output, the calendar is an empty string rather than a
+        VCALENDAR without components, which RFC 5545 does not allow.
+
+    """
+    modified = ical_datetime.format(dt.datetime.utcnow())
+    state: State = {}
+    changed: list[str] = []
+    first: Optional[str] = None
+    for uid, event in _ical_events(duties, ade, modified):
+        start = (_property(event, "DTSTART") or "")[:8]
+        first = min(first or start, start)
+        old = previous.get(uid)
+        new = digest(event)
+        if old and old.digest == new:
+            state[uid] = old
+            continue
+        sequence = old.sequence + 1 if old else 0
+        event = _stamped(event, sequence, modified)
+        state[uid] = EventState(new, sequence, event)
+        changed.append(event)
+    for uid, old in previous.items():
+        if uid in state:
+            continue
+        start = (_property(old.event, "DTSTART") or "")[:8]
+        if first is None or start < first or _cancelled(old):
+            state[uid] = old
+            continue
+        event = _stamped(old.event, old.sequence + 1, modified, True)
+        state[uid] = _event_state(event)
+        changed.append(event)
+    events = [X.event for X in state.values()] if full else changed
+    if not events:
+        return "", state
+    return vcalendar.format("\r\n".join(events)), state
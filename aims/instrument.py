@@ -0,0 +1,290 @@
+"""Instrumentation of the stages of a conversion.
+
+A conversion passes through the stages listed in STAGES: reading and
+decoding the input, parsing the HTML, converting table rows to Duty objects,
+calculating the derived data of the duties, night flying in particular, and
+rendering the output. Since reports are processed as a stream, these stages
+are interleaved, with each pulling its input from the one before. The code
+of each stage is therefore marked with stage or iterate, which keep a stack
+of the stages active on each thread, so that the time spent in a stage
+excludes the time spent in the stages nested inside it.
+
+Nothing is measured unless a hook has been added with add_hook. Each time a
+stage is left, each hook is called with a Sample. The Timings hook totals the
+samples, and the collect context manager installs one, e.g.::
+
+    with aims.instrument.collect() as timings:
+        aims.output.render("efj", aims.parse.parse_stream(path))
+    print(timings.summary())
+
+Hooks must be added before a conversion starts, since iterate does not wrap
+iterators created while there are no hooks.
+
+Work done in other processes, e.g. night calculations with jobs > 1, is not
+included in the samples.
+
+"""
+import contextlib
+import sys
+import threading
+import time
+from typing import (
+    Callable, Iterable, Iterator, NamedTuple, Optional, TypeVar, Union)
+
+STAGES = ("read", "parse", "convert", "enrich", "night", "render")
+PROFILE_INTERVAL = 0.001  # seconds between stack samples
+
+T = TypeVar("T")
+
+
+class Sample(NamedTuple):
+    stage: str
+    wall: float  # seconds, excluding nested stages
+    cpu: float  # seconds of CPU time of the thread, excluding nested stages
+    allocated: int  # net bytes allocated, if tracemalloc is tracing, else 0
+
+
+Hook = Callable[[Sample], None]
+
+_hooks: list[Hook] = []
+_local = threading.local()
+
+
+def add_hook(hook: Hook) -> None:
+    """Call hook with a Sample each time a stage is left."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    """Stop calling a hook added with add_hook."""
+    _hooks.remove(hook)
+
+
+def _allocated() -> int:
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+class _Stage:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        # start times, and the totals of the stages nested inside
+        self.start = (time.perf_counter(), time.thread_time(), _allocated())
+        self.nested = [0.0, 0.0, 0]
+        stack.append(self)
+
+    def __exit__(self, *_: object) -> None:
+        wall, cpu, allocated = (
+            X - Y for X, Y in zip(
+                (time.perf_counter(), time.thread_time(), _allocated()),
+                self.start))
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            nested = stack[-1].nested
+            nested[0] += wall
+            nested[1] += cpu
+            nested[2] += allocated
+        sample = Sample(self.name, wall - self.nested[0],
+                        cpu - self.nested[1], int(allocated - self.nested[2]))
+        for hook in _hooks:
+            hook(sample)
+
+
+_NULL = contextlib.nullcontext()
+
+
+def stage(name: str) -> Union[_Stage, contextlib.nullcontext]:
+    """Mark a block of code as belonging to a stage.
+
+    :param name: The name of the stage, usually one of STAGES.
+    :return: A context manager.
+
+    """
+    return _Stage(name) if _hooks else _NULL
+
+
+def iterate(name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """Mark the production of each item of an iterable as a stage.
+
+    This is for generators, whose code runs whenever an item is requested,
+    and which cannot hold a stage open across a yield.
+
+    :param name: The name of the stage, usually one of STAGES.
+    :param iterable: The items.
+    :return: An iterator of the items. If there are no hooks, this is
+        simply iter(iterable).
+
+    """
+    if not _hooks:
+        return iter(iterable)
+    return _iterate(name, iter(iterable))
+
+
+def _iterate(name: str, iterator: Iterator[T]) -> Iterator[T]:
+    while True:
+        with _Stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class Timings:
+    """A hook that totals the samples of each stage."""
+
+    def __init__(self) -> None:
+        # stage: [calls, wall, cpu, allocated]
+        self.totals: dict[str, list] = {}
+        self.wall = 0.0  # total elapsed time, set by collect
+        self.cpu = 0.0
+        self.peak: Optional[int] = None  # peak traced memory, if traced
+
+    def __call__(self, sample: Sample) -> None:
+        total = self.totals.setdefault(sample.stage, [0, 0.0, 0.0, 0])
+        total[0] += 1
+        total[1] += sample.wall
+        total[2] += sample.cpu
+        total[3] += sample.allocated
+
+    def summary(self) -> str:
+        """Tabulate the totals.
+
+        The "other" row is the time not spent in any stage, e.g. in writing
+        the output. Allocations are only included if they were traced.
+
+        """
+        traced = self.peak is not None
+        names = [X for X in STAGES if X in self.totals]
+        names += sorted(X for X in self.totals if X not in STAGES)
+        rows = [(X, *self.totals[X]) for X in names]
+        rows.append(("other", 0,
+                     self.wall - sum(X[2] for X in rows),
+                     self.cpu - sum(X[3] for X in rows), 0))
+        lines = [f"{'stage':10}{'calls':>8}{'wall ms':>10}{'cpu ms':>10}"
+                 + (f"{'alloc KiB':>11}" if traced else "")]
+        for name, calls, wall, cpu, allocated in rows:
+            lines.append(f"{name:10}{calls:8}{wall * 1000:10.1f}"
+                         f"{cpu * 1000:10.1f}"
+                         + (f"{allocated / 1024:11.1f}" if traced else ""))
+        lines.append(f"{'total':18}{self.wall * 1000:10.1f}"
+                     f"{self.cpu * 1000:10.1f}")
+        if self.peak is not None:
+            lines.append(f"peak traced memory: {self.peak / 1024:.1f} KiB")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def collect(allocations: bool = False) -> Iterator[Timings]:
+    """Collect the timings of the stages run in a block.
+
+    :param allocations: Whether to trace memory allocations with
+        tracemalloc. This makes the conversion several times slower, so
+        the times are then much less representative.
+    :return: A context manager, whose value is the Timings object.
+
+    """
+    timings = Timings()
+    traced = False
+    if allocations:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            traced = True
+    add_hook(timings)
+    start = (time.perf_counter(), time.thread_time())
+    try:
+        yield timings
+    finally:
+        timings.wall = time.perf_counter() - start[0]
+        timings.cpu = time.thread_time() - start[1]
+        remove_hook(timings)
+        if allocations:
+            timings.peak = tracemalloc.get_traced_memory()[1]
+        if traced:
+            tracemalloc.stop()
+
+
+class StackSampler:
+    """Periodically record the call stack of a thread.
+
+    The stacks are written in the collapsed format used by flame graph tools
+    such as flamegraph.pl and speedscope: one line per distinct stack, with
+    the frames from the outermost inwards separated by semicolons, followed
+    by the number of times the stack was seen.
+
+    """
+
+    def __init__(self, ident: Optional[int] = None,
+                 interval: float = PROFILE_INTERVAL) -> None:
+        self.ident = ident or threading.get_ident()
+        self.interval = interval
+        self.counts: dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="aims-sampler")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.ident)
+            names = []
+            while frame:
+                code = frame.f_code
+                names.append(
+                    f"{frame.f_globals.get('__name__', '?')}."
+                    f"{code.co_qualname}")
+                frame = frame.f_back
+            if names:
+                key = ";".join(reversed(names))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """The stacks in collapsed format."""
+        return "".join(f"{X} {Y}\n" for X, Y in sorted(self.counts.items()))
+
+
+@contextlib.contextmanager
+def profile(path: str, interval: float = PROFILE_INTERVAL) -> Iterator[None]:
+    """Profile a block of code.
+
+    cProfile statistics are written to path, in the format read by the
+    pstats module, and the stacks recorded by a StackSampler are written to
+    path with ".folded" appended. Only the calling thread is profiled.
+
+    :param path: The path of the statistics file.
+    :param interval: The time between stack samples, in seconds.
+
+    """
+    import cProfile
+    switch = sys.getswitchinterval()
+    # otherwise the sampler only runs every 5 ms
+    sys.setswitchinterval(min(switch, interval))
+    sampler = StackSampler(interval=interval)
+    profiler = cProfile.Profile()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        sys.setswitchinterval(switch)
+        profiler.dump_stats(path)
+        with open(path + ".folded", "w", encoding="utf-8") as f:
+            f.write(sampler.collapsed())
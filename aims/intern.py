@@ -0,0 +1,34 @@
+"""Interning of values that recur throughout a report.
+
+Every row of a report produces fresh string objects, so a long report ends up
+holding thousands of copies of the same airport codes, aircraft types,
+registrations and crew names. Passing values through this module means that
+equal values share a single object.
+
+Strings are interned with sys.intern. CrewMember objects and crew tuples are
+held in bounded pools, so long running processes do not grow without limit.
+
+"""
+import sys
+from functools import lru_cache
+
+from aims.data_structures import CrewMember
+
+POOL_SIZE = 4096
+
+
+def string(s: str) -> str:
+    """Return the shared copy of a string."""
+    return sys.intern(s)
+
+
+@lru_cache(maxsize=POOL_SIZE)
+def crew_member(name: str, role: str) -> CrewMember:
+    """Return the shared CrewMember object for a name and role."""
+    return CrewMember(sys.intern(name), sys.intern(role))
+
+
+@lru_cache(maxsize=POOL_SIZE)
+def crew(members: tuple[CrewMember, ...]) -> tuple[CrewMember, ...]:
+    """Return the shared copy of a crew tuple."""
+    return members
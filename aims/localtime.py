@@ -0,0 +1,90 @@
+"""Conversion of UTC times to local time using precomputed offset tables.
+
+Times in reports are UTC, but roster output is in local time. Rather than
+asking the time zone database for the offset of every time, the transitions
+between UTC offsets are found once for each zone and year, and each
+conversion is then a bisection of that table.
+
+The table for a year is built by sampling the offset at the start of each
+day and bisecting to the second any day in which it changes, so a zone is
+assumed to have at most one transition per day.
+
+"""
+import bisect
+import datetime as dt
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zoneinfo import ZoneInfo
+
+DEFAULT_ZONE = "Europe/London"
+CACHE_SIZE = 256
+
+Table = tuple[tuple[dt.datetime, ...], tuple[dt.timedelta, ...]]
+
+_DAY = 24 * 60 * 60
+
+
+def zone(name: str) -> "ZoneInfo":
+    """Look up a time zone.
+
+    :param name: An IANA time zone name, e.g. "Europe/London".
+    :return: The time zone.
+    :raises ValueError: If the name is not a known time zone.
+
+    """
+    # zoneinfo is only imported when local times are needed
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown time zone: {name}") from e
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def table(name: str, year: int) -> Table:
+    """The UTC offset transitions of a time zone during a year.
+
+    :param name: An IANA time zone name.
+    :param year: The year.
+    :return: A tuple of the naive UTC times at which each offset starts to
+        apply, starting with midnight on 1st January, and the offsets.
+
+    """
+    tz = zone(name)
+
+    def offset(time: dt.datetime) -> dt.timedelta:
+        utc = time.replace(tzinfo=dt.timezone.utc)
+        retval = utc.astimezone(tz).utcoffset()
+        assert retval is not None
+        return retval
+
+    day = dt.datetime(year, 1, 1)
+    starts, offsets = [day], [offset(day)]
+    while day.year == year:
+        next_ = day + dt.timedelta(days=1)
+        if offset(next_) != offsets[-1]:
+            lo, hi = 0, _DAY  # seconds after day, before and after the change
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if offset(day + dt.timedelta(seconds=mid)) == offsets[-1]:
+                    lo = mid
+                else:
+                    hi = mid
+            starts.append(day + dt.timedelta(seconds=hi))
+            offsets.append(offset(starts[-1]))
+        day = next_
+    return tuple(starts), tuple(offsets)
+
+
+def local(time: dt.datetime, name: str = DEFAULT_ZONE) -> dt.datetime:
+    """Convert a UTC time to local time.
+
+    :param time: A naive datetime in UTC.
+    :param name: An IANA time zone name.
+    :return: The naive local time.
+
+    """
+    starts, offsets = table(name, time.year)
+    return time + offsets[bisect.bisect_right(starts, time) - 1]
@@ -1,30 +1,35 @@
 import datetime as dt
 import re
-from typing import Optional
+from typing import Optional, Iterator, Iterable
 
-from bs4 import BeautifulSoup  # type: ignore
-
-from aims.data_structures import Duty, Sector, CrewMember, AllDayEvent
+from aims.data_structures import (
+    Duty, Sector, AllDayEvent, InputFileException)
+import aims.rows
+import aims.instrument
+import aims.timeconv as timeconv
+import aims.intern as intern
+from aims.sector_table import SectorTable
 
 
 DATE, FLTNUM, FROM, OFF, TO, ON, TYPE, REG, BLOCK, CP = range(1, 11)
 
+ENGINES = ("stream", "html5lib")
+
+_RE_DATE = re.compile(r"^\d{2}/\d{2}/\d{2}$")
+
 
 def _sector(row: tuple[str, ...]) -> Optional[Sector]:
     if not row[FLTNUM]:  # this is a sim sector
         return None
-    date = dt.datetime.strptime(row[DATE], "%d/%m/%y").date()
-    off = dt.datetime.combine(
-        date,
-        dt.datetime.strptime(row[OFF], "%H:%M").time())
-    on = dt.datetime.combine(
-        date,
-        dt.datetime.strptime(row[ON], "%H:%M").time())
+    date = timeconv.date_dmy_short(row[DATE])
+    off = dt.datetime.combine(date, timeconv.time_hm(row[OFF]))
+    on = dt.datetime.combine(date, timeconv.time_hm(row[ON]))
     if on < off:
         on += dt.timedelta(1)
-    crew = (CrewMember(row[CP], "CP"), )
-    return Sector(row[FLTNUM], row[REG], row[TYPE],
-                  row[FROM], row[TO],
+    crew = intern.crew((intern.crew_member(row[CP], "CP"), ))
+    return Sector(intern.string(row[FLTNUM]), intern.string(row[REG]),
+                  intern.string(row[TYPE]),
+                  intern.string(row[FROM]), intern.string(row[TO]),
                   off, on,
                   False, False, crew)
 
@@ -37,23 +42,92 @@ def _duty(sectors: tuple[Sector, ...]) -> Duty:
                 sectors)
 
 
-def duties(html) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
-    soup = BeautifulSoup(html, "html5lib")
-    sectors: list[Sector] = []
-    re_date = re.compile(r"^\d{2}/\d{2}/\d{2}$")
-    for row in soup.find_all("tr"):
-        strings = tuple(Y[0].replace("\xa0", " ") if Y else "" for Y in
-                        [tuple(X.stripped_strings) for X in row("td")])
-        if (len(strings) > 10 and re_date.match(strings[DATE])):
-            sector = _sector(strings)
+def _rows(html: str, engine: str) -> Iterator[tuple[str, ...]]:
+    """Produce the sector rows of the report using the requested engine.
+
+    Only the first string of each cell is of interest, and only rows with a
+    date in the DATE column represent sectors. The "stream" engine discards
+    other rows as soon as their DATE column has been seen.
+
+    """
+    if engine == "stream":
+        return aims.rows.first_strings(html, DATE, _RE_DATE.match)
+    elif engine == "html5lib":
+        # bs4 and html5lib are slow to import, and only used by this engine
+        from bs4 import BeautifulSoup  # type: ignore
+        with aims.instrument.stage("parse"):
+            soup = BeautifulSoup(html, "html5lib")
+        return (strings for strings in (
+            tuple(next(X.stripped_strings, "") for X in row("td"))
+            for row in soup.find_all("tr"))
+                if len(strings) > DATE and _RE_DATE.match(strings[DATE]))
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+def _sectors(rows: Iterable[tuple[str, ...]]) -> Iterator[Sector]:
+    for row in rows:
+        if len(row) > 10:
+            sector = _sector(tuple(X.replace("\xa0", " ") for X in row))
             if sector:
-                sectors.append(sector)
-    groups = [[sectors[0]]]
-    last_on = sectors[0].on
-    for sector in sectors[1:]:
-        if sector.off - last_on > dt.timedelta(hours=10):
-            groups.append([sector])
-        else:
-            groups[-1].append(sector)
-        last_on = sector.on
-    return (tuple(_duty(tuple(X)) for X in groups), ())
+                yield sector
+
+
+def _duties(sectors: Iterator[Sector]) -> Iterator[Duty]:
+    # Sectors separated by more than 10 hours are assumed to be in different
+    # duties, so a duty is complete once the first sector of the next one has
+    # been seen.
+    first = next(sectors, None)
+    if first is None:
+        raise InputFileException("No sectors found")
+    group = [first]
+    for sector in sectors:
+        if sector.off - group[-1].on > dt.timedelta(hours=10):
+            yield _duty(tuple(group))
+            group = []
+        group.append(sector)
+    yield _duty(tuple(group))
+
+
+def duties(
+        html: str,
+        engine: str = "stream"
+) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
+    return (tuple(_duties(_sectors(_rows(html, engine)))), ())
+
+
+def stream(chunks: Iterable[str]) -> Iterator[Duty]:
+    """Incrementally extract the duties from an AIMS Pilot Logbook report.
+
+    :param chunks: An iterable of strings that concatenate to form the html
+        of the report.
+    :return: An iterator of Duty objects, each yielded as soon as the first
+        sector of the following duty (or the end of the document) has been
+        read.
+
+    """
+    rows = aims.rows.iter_first_strings(chunks, DATE, _RE_DATE.match)
+    return _duties(_sectors(rows))
+
+
+def table(html: str, engine: str = "stream") -> SectorTable:
+    """Extract the sectors of an AIMS Pilot Logbook report into a table.
+
+    Sectors are added to the table as each row is converted, so Sector
+    objects for the whole report are never held in memory at once.
+
+    :param html: The html of the report.
+    :param engine: The HTML extraction engine, one of ENGINES.
+    :return: A SectorTable containing all the sectors of the report.
+
+    """
+    return SectorTable(_sectors(_rows(html, engine)))
+
+
+def iter_duties(sectors: Iterable[Sector]) -> Iterator[Duty]:
+    """Group sectors into duties on demand.
+
+    :param sectors: The sectors of a report, e.g. a SectorTable.
+    :return: An iterator of Duty objects, as would be returned by duties().
+
+    """
+    return _duties(iter(sectors))
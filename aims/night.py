@@ -0,0 +1,281 @@
+"""Memoised night flying calculations.
+
+The nightflight package calculates the night portion of a sector by sampling
+points along the great circle track, computing sunrise and sunset for each
+one. This is by far the most expensive part of producing eFJ or CSV output
+for a large logbook. This module produces identical results more cheaply:
+
+* results are memoised per (from, to, off, on), so repeated sectors are free;
+* sunrise and sunset are memoised per (position, date). Airports recur
+  constantly, and because the track of a return sector passes through
+  exactly the same sample points as the outbound sector, a same day return
+  reuses every calculation of the outbound;
+* sectors that are clearly entirely in daylight or entirely in darkness are
+  detected by checking the corners of a latitude/longitude box containing
+  the whole track, avoiding the sampling altogether.
+
+Night is defined as by nightflight: from 30 minutes after sunset until 30
+minutes before sunrise.
+
+"""
+import datetime as dt
+import itertools
+import math
+from functools import lru_cache
+from typing import Optional, Iterable
+
+from aims.data_structures import Sector
+
+import astral  # type: ignore
+import astral.sun  # type: ignore
+import nightflight.night as nightcalc  # type: ignore
+from nightflight.airport_nvecs import airfields  # type: ignore
+
+
+ENGINES = ("nightflight", "numpy")
+CACHE_SIZE = 1 << 16
+# sectors per task when using a process pool, and per set of array
+# operations in aims.night_batch
+CHUNK_SIZE = 256
+TWILIGHT = dt.timedelta(minutes=30)
+# Sunrise and sunset at the corners of the bounding box only approximately
+# bound those within it, so the short cut is only taken with this margin.
+MARGIN = dt.timedelta(minutes=15)
+
+NVec = tuple[float, float, float]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _daylight(nvec: NVec, date: dt.date
+              ) -> Optional[tuple[dt.datetime, dt.datetime]]:
+    # mirrors nightflight.night.night_p; None if there is no sunrise or
+    # sunset on date
+    observer = astral.LocationInfo(
+        "", "", "UTC", *nightcalc.to_latlong(nvec)).observer
+    try:
+        sunrise, sunset = astral.sun.daylight(observer, date)
+        # astral gives sunset on the day, and previous sunrise
+        if sunrise.date() != date:
+            sunrise = astral.sun.sunrise(observer, date + dt.timedelta(1))
+    except ValueError:
+        return None
+    return (sunrise.replace(tzinfo=None), sunset.replace(tzinfo=None))
+
+
+def night_p(nvec: NVec, time: dt.datetime) -> bool:
+    """Determine whether it is night at a position.
+
+    :param nvec: The position as an n-vector.
+    :param time: The UTC time as a naive datetime.
+    :return: The same result as ``nightflight.night.night_p(nvec, time)``.
+
+    """
+    daylight = _daylight(nvec, time.date())
+    if daylight is None:
+        # no sunrise or sunset: assume midnight sun in summer
+        if nvec[2] > 0 and 4 <= time.month <= 8:
+            return False
+        if nvec[2] < 0 and time.month in (10, 11, 12, 1, 2):
+            return False
+        return True
+    sunrise, sunset = daylight
+    if sunset > sunrise:  # ..dark..sr..light..ss..dark
+        return not sunrise - TWILIGHT <= time <= sunset + TWILIGHT
+    # ..light..ss..dark..sr..light
+    return not (time <= sunset + TWILIGHT or time >= sunrise - TWILIGHT)
+
+
+def _night_duration(from_: NVec, to: NVec,
+                    start: dt.datetime, end: dt.datetime,
+                    seclength: int = 32) -> float:
+    # mirrors nightflight.night.night_duration, using the memoised night_p
+    flight_duration = (end - start).total_seconds() / 60
+    if flight_duration <= 0:
+        raise ValueError((start, end))
+    min_sections = flight_duration / seclength
+    depth = max(math.ceil(math.log(min_sections) / math.log(2)) - 1, 0)
+    nvecs = nightcalc.recursive_bisect(from_, to, depth)
+    time_d = (end - start) / (len(nvecs) - 1)
+    time_d_mins = time_d.total_seconds() / 60
+    time = start
+    last_nvec = nvecs[0]
+    last_nstatus = night_p(last_nvec, time)
+    night_acc = 0.0
+    for nvec in nvecs[1:]:
+        time += time_d
+        nstatus = night_p(nvec, time)
+        if nstatus != last_nstatus:
+            if seclength > 2:
+                night_acc += _night_duration(
+                    last_nvec, nvec, time - time_d, time, 2)
+            else:
+                night_acc += time_d_mins / 2
+        elif nstatus:
+            night_acc += time_d_mins
+        last_nstatus = nstatus
+        last_nvec = nvec
+    return night_acc
+
+
+def _nvec(lat: float, lon: float) -> NVec:
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon),
+            math.cos(lat) * math.sin(lon),
+            math.sin(lat))
+
+
+def _cross(a: NVec, b: NVec) -> NVec:
+    return (a[1] * b[2] - a[2] * b[1],
+            a[2] * b[0] - a[0] * b[2],
+            a[0] * b[1] - a[1] * b[0])
+
+
+def _dot(a: NVec, b: NVec) -> float:
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _vertex_latitudes(from_: NVec, to: NVec) -> list[float]:
+    # The latitudes of the northern and southern vertices of the great
+    # circle through from_ and to, if they lie between them.
+    normal = _cross(from_, to)
+    size = math.sqrt(_dot(normal, normal))
+    if not size:
+        return []
+    normal = (normal[0] / size, normal[1] / size, normal[2] / size)
+    lats = []
+    for pole in ((0.0, 0.0, 1.0), (0.0, 0.0, -1.0)):
+        k = _dot(pole, normal)
+        vertex = (pole[0] - k * normal[0],
+                  pole[1] - k * normal[1],
+                  pole[2] - k * normal[2])
+        if (_dot(_cross(from_, vertex), normal) >= 0
+                and _dot(_cross(vertex, to), normal) >= 0):
+            lats.append(nightcalc.to_latlong(vertex)[0])
+    return lats
+
+
+def _uniform(from_: NVec, to: NVec,
+             start: dt.datetime, end: dt.datetime) -> Optional[bool]:
+    """Check whether a sector is entirely in daylight or darkness.
+
+    The track lies within the box bounded by the longitudes of its end points
+    and by the latitudes of its end points and any vertex it passes through.
+    Sunrise and sunset are very nearly monotonic in both latitude and
+    longitude, so their extremes within the box occur at its corners. The
+    corners at the latitude of each end point are derived from the (cached)
+    times at the airport itself, since a change of longitude simply shifts
+    the times by four minutes per degree.
+
+    :return: False if the whole sector is in daylight, True if it is all in
+        darkness, or None if this can't be established cheaply.
+
+    """
+    date = start.date()
+    if end.date() != date or _dot(from_, to) < -0.9:
+        return None
+    (from_lat, from_lon), (to_lat, to_lon) = (
+        nightcalc.to_latlong(from_), nightcalc.to_latlong(to))
+    if abs(from_lon - to_lon) > 180:  # crosses the antimeridian
+        return None
+    extra = _vertex_latitudes(from_, to)
+    if min(from_lat, to_lat, *extra) < 0 < max(from_lat, to_lat, *extra):
+        # sunrise is not quite monotonic in latitude around the equinoxes
+        extra.append(0.0)
+    rows = [from_, to] + [_nvec(X, from_lon) for X in extra]
+    shift = dt.timedelta(seconds=240 * (from_lon - to_lon))
+    corners = []
+    for nvec in rows:
+        daylight = _daylight(nvec, date)
+        if daylight is None or daylight[1] < daylight[0]:
+            return None
+        if nvec is to:
+            corners += [daylight, (daylight[0] - shift, daylight[1] - shift)]
+        else:
+            corners += [daylight, (daylight[0] + shift, daylight[1] + shift)]
+    if all(sunrise - TWILIGHT + MARGIN <= start
+           and end <= sunset + TWILIGHT - MARGIN
+           for sunrise, sunset in corners):
+        return False
+    if (all(end <= sunrise - TWILIGHT - MARGIN for sunrise, _ in corners)
+            or all(start >= sunset + TWILIGHT + MARGIN
+                   for _, sunset in corners)):
+        return True
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def night(from_: Optional[str], to: Optional[str],
+          off: dt.datetime, on: dt.datetime) -> tuple[int, bool]:
+    """Calculate the night flying of a sector.
+
+    :param from_: The identifier of the departure airport.
+    :param to: The identifier of the arrival airport.
+    :param off: The off blocks time, UTC as a naive datetime.
+    :param on: The on blocks time, UTC as a naive datetime.
+    :return: A tuple of the night duration in minutes and whether the
+        landing was at night. If either airport is unknown, this is
+        (0, False).
+
+    """
+    try:
+        from_nvec, to_nvec = airfields[from_], airfields[to]
+    except KeyError:
+        return (0, False)
+    night_landing = night_p(to_nvec, on)
+    if on <= off:
+        raise ValueError((off, on))
+    uniform = _uniform(from_nvec, to_nvec, off, on)
+    if uniform is None:
+        duration = _night_duration(from_nvec, to_nvec, off, on)
+    elif uniform:
+        duration = (on - off).total_seconds() / 60
+    else:
+        duration = 0.0
+    return (round(duration), night_landing)
+
+
+Key = tuple[Optional[str], Optional[str], dt.datetime, dt.datetime]
+
+
+def _chunk(keys: list[Key]) -> list[tuple[int, bool]]:
+    return [night(*X) for X in keys]
+
+
+def nights(sectors: Iterable[Sector],
+           jobs: int = 1,
+           engine: str = "nightflight") -> list[tuple[int, bool]]:
+    """Calculate the night flying of many sectors, optionally in parallel.
+
+    With more than one job, the distinct sectors are split into contiguous
+    chunks of CHUNK_SIZE, keeping sectors flown on the same day together so
+    that each worker benefits from its own sunrise and sunset cache, and the
+    chunks are processed by a pool of worker processes.
+
+    The "numpy" engine uses aims.night_batch instead, which requires NumPy.
+    Its results are not identical to those of night(); the differences are
+    described in that module.
+
+    :param sectors: The sectors.
+    :param jobs: The number of worker processes to use. This is only used by
+        the "nightflight" engine.
+    :param engine: The calculation engine, one of ENGINES.
+    :return: For each sector, in order, the result of night() for it.
+
+    """
+    if engine == "numpy":
+        # NumPy is an optional dependency, and slow to import
+        import aims.night_batch
+        return aims.night_batch.nights(sectors)
+    elif engine != "nightflight":
+        raise ValueError(f"Unknown engine: {engine}")
+    keys: list[Key] = [(X.from_, X.to, X.off, X.on) for X in sectors]
+    if jobs <= 1 or len(keys) <= CHUNK_SIZE:
+        return _chunk(keys)
+    distinct = list(dict.fromkeys(keys))
+    chunks = [distinct[X:X + CHUNK_SIZE]
+              for X in range(0, len(distinct), CHUNK_SIZE)]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(min(jobs, len(chunks))) as executor:
+        results = dict(zip(distinct, itertools.chain.from_iterable(
+            executor.map(_chunk, chunks))))
+    return [results[X] for X in keys]
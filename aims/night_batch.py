@@ -0,0 +1,170 @@
+"""Vectorised night flying calculations for large numbers of sectors.
+
+This module requires NumPy, which is an optional dependency (install the
+"numpy" extra). Instead of finding sunrise and sunset for a handful of points
+along each track, as aims.night does, every sector is sampled at one minute
+intervals and the solar elevation at every sample of every sector is
+calculated in a single set of array operations, using the NOAA solar
+position equations (the same equations used by astral).
+
+A sample is at night if the sun is below the horizon both 30 minutes before
+and 30 minutes after the sample time, which is equivalent to the definition
+used by aims.night and nightflight: from 30 minutes after sunset until 30
+minutes before sunrise.
+
+Results are not bit for bit identical to aims.night. For short haul sectors
+between European airports, night durations agree to within TOLERANCE
+minutes, and night landing flags agree except for landings within a minute
+or so of the twilight boundary. Long haul sectors can differ by more, since
+nightflight samples the track coarsely, so it can miss a passage through
+twilight, and uses the sunrise and sunset of the UTC date, which far from
+Greenwich is not the local solar day. In polar regions nightflight falls
+back to a seasonal approximation. In all these cases the results of this
+module are the more accurate.
+
+"""
+import datetime as dt
+from typing import Iterable
+
+import numpy as np
+from nightflight.airport_nvecs import airfields  # type: ignore
+
+from aims.data_structures import Sector
+import aims.night
+
+
+TOLERANCE = 2  # minutes
+STEP = 1  # minutes between samples
+HORIZON = -0.833  # degrees, allowing for refraction and the solar disc
+TWILIGHT = 30  # minutes
+EPOCH = dt.datetime(1970, 1, 1)
+JD_EPOCH = 2440587.5  # Julian date of EPOCH
+
+
+def _elevation(lat: np.ndarray, lon: np.ndarray,
+               minutes: np.ndarray) -> np.ndarray:
+    """The solar elevation in degrees.
+
+    :param lat: Latitudes in radians.
+    :param lon: Longitudes in degrees.
+    :param minutes: UTC times, in minutes since EPOCH.
+
+    """
+    jd = JD_EPOCH + minutes / 1440
+    jc = (jd - 2451545.0) / 36525
+    mean_long = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032))
+                           % 360)
+    anomaly = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    centre = (np.sin(anomaly) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+              + np.sin(2 * anomaly) * (0.019993 - 0.000101 * jc)
+              + np.sin(3 * anomaly) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * jc)
+    app_long = np.radians(np.degrees(mean_long) + centre
+                          - 0.00569 - 0.00478 * np.sin(omega))
+    obliquity = np.radians(
+        23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813)))
+              / 60) / 60 + 0.00256 * np.cos(omega))
+    decl = np.arcsin(np.sin(obliquity) * np.sin(app_long))
+    y = np.tan(obliquity / 2) ** 2
+    eqtime = 4 * np.degrees(
+        y * np.sin(2 * mean_long)
+        - 2 * eccent * np.sin(anomaly)
+        + 4 * eccent * y * np.sin(anomaly) * np.cos(2 * mean_long)
+        - 0.5 * y * y * np.sin(4 * mean_long)
+        - 1.25 * eccent * eccent * np.sin(2 * anomaly))
+    solar_time = (minutes % 1440) + eqtime + 4 * lon
+    hour_angle = np.radians(solar_time / 4 - 180)
+    cos_zenith = (np.sin(lat) * np.sin(decl)
+                  + np.cos(lat) * np.cos(decl) * np.cos(hour_angle))
+    return 90 - np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+
+
+def _night(nvecs: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    lat = np.arctan2(nvecs[:, 2], np.hypot(nvecs[:, 0], nvecs[:, 1]))
+    lon = np.degrees(np.arctan2(nvecs[:, 1], nvecs[:, 0]))
+    return ((_elevation(lat, lon, minutes - TWILIGHT) < HORIZON)
+            & (_elevation(lat, lon, minutes + TWILIGHT) < HORIZON))
+
+
+def _track(from_: np.ndarray, to: np.ndarray,
+           fraction: np.ndarray) -> np.ndarray:
+    # spherical linear interpolation between from_ and to; points are
+    # equally spaced in angle, as with nightflight's repeated bisection
+    cos_angle = np.clip(np.einsum("ij,ij->i", from_, to), -1, 1)
+    angle = np.arccos(cos_angle)[:, np.newaxis]
+    fraction = fraction[:, np.newaxis]
+    sin_angle = np.sin(angle)
+    small = sin_angle[:, 0] < 1e-9
+    sin_angle[small] = 1
+    a = np.where(small[:, np.newaxis], 1 - fraction,
+                 np.sin((1 - fraction) * angle) / sin_angle)
+    b = np.where(small[:, np.newaxis], fraction,
+                 np.sin(fraction * angle) / sin_angle)
+    points = a * from_ + b * to
+    return points / np.linalg.norm(points, axis=1)[:, np.newaxis]
+
+
+def _chunk(from_: np.ndarray, to: np.ndarray, off: np.ndarray,
+           duration: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # each sector is divided into equal segments of at most STEP minutes
+    segments = np.maximum(np.ceil(duration / STEP), 1).astype(np.int64)
+    samples = segments + 1
+    sector_of = np.repeat(np.arange(len(duration)), samples)
+    starts = np.cumsum(samples) - samples
+    index = np.arange(len(sector_of)) - starts[sector_of]
+    fraction = index / segments[sector_of]
+    points = _track(from_[sector_of], to[sector_of], fraction)
+    night = _night(points, off[sector_of]
+                   + fraction * duration[sector_of]).astype(np.float64)
+    # trapezoidal integration of the night flag over each sector
+    halves = night[1:] + night[:-1]
+    halves[starts[1:] - 1] = 0  # pairs that straddle two sectors
+    totals = np.add.reduceat(np.append(halves, 0), starts) / 2
+    minutes = np.rint(totals * duration / segments).astype(np.int64)
+    return minutes, night[starts + segments].astype(bool)
+
+
+def nights(sectors: Iterable[Sector]) -> list[tuple[int, bool]]:
+    """Calculate the night flying of many sectors at once.
+
+    The samples of every sector are held in memory together, so the sectors
+    are processed in chunks of aims.night.CHUNK_SIZE.
+
+    :param sectors: The sectors.
+    :return: For each sector, in order, a tuple of the night duration in
+        minutes and whether the landing was at night, as returned by
+        aims.night.night. Sectors with unknown airports give (0, False).
+        Sectors whose on blocks time is not after their off blocks time
+        raise ValueError.
+
+    """
+    sectors = list(sectors)
+    results = [(0, False)] * len(sectors)
+    known, from_, to, off, duration = [], [], [], [], []
+    for c, sector in enumerate(sectors):
+        try:
+            nvecs = airfields[sector.from_], airfields[sector.to]
+        except KeyError:
+            continue
+        minutes = (sector.on - sector.off) / dt.timedelta(minutes=1)
+        if minutes <= 0:
+            raise ValueError((sector.off, sector.on))
+        known.append(c)
+        from_.append(nvecs[0])
+        to.append(nvecs[1])
+        off.append((sector.off - EPOCH) / dt.timedelta(minutes=1))
+        duration.append(minutes)
+    if not known:
+        return results
+    from_a, to_a = np.array(from_), np.array(to)
+    off_a, duration_a = np.array(off), np.array(duration)
+    size = aims.night.CHUNK_SIZE
+    for start in range(0, len(known), size):
+        chunk = slice(start, start + size)
+        night_minutes, night_landing = _chunk(
+            from_a[chunk], to_a[chunk], off_a[chunk], duration_a[chunk])
+        for c, minutes, landing in zip(
+                known[chunk], night_minutes, night_landing):
+            results[c] = (int(minutes), bool(landing))
+    return results
@@ -1,63 +1,35 @@
 #!/usr/bin/python3
 
-from zoneinfo import ZoneInfo as Z
-import io
 import csv as libcsv
 import datetime as dt
-import re
 import itertools
+from typing import Iterable, Iterator, Union, Optional, TextIO
 
-from aims.data_structures import Duty, Sector, CrewMember, AllDayEvent
-import nightflight.night as nightcalc  # type: ignore
-from nightflight.airport_nvecs import airfields as nvecs  # type: ignore
+from aims.data_structures import Duty, AllDayEvent
+from aims.enrich import (
+    enrich, EnrichedDuty, EnrichedSector, clean_name, flown)
+from aims.localtime import local, zone, DEFAULT_ZONE
+import aims.instrument
 
-UTC = Z("UTC")
-LT = Z("Europe/London")
+__all__ = ["roster", "efj", "csv", "ical", "render",
+           "iter_roster", "iter_efj", "iter_csv", "iter_ical", "iter_render",
+           "write", "clean_name", "FORMATS"]
 
+Duties = Iterable[Union[Duty, EnrichedDuty]]
 
-def clean_name(name: str) -> str:
-    parts = [X.strip().capitalize() for X in name.split()]
-    for c, part in enumerate(parts):
-        # remove bracketted stuff
-        if part[0] == "(":
-            parts[c] = ""
-            continue
-        # remove LR, SR, 50%
-        if part.upper() in {"LR", "SR", "50%"}:
-            parts[c] = ""
-            continue
-        # remove stars
-        new = re.sub(r"\*+", "", part)
-        # remove commas
-        new = new.replace(",", "")
-        # capitilize after - and '
-        for char in ("-", "'"):
-            index = new.find(char)
-            if index not in {-1, len(new) - 1}:
-                index += 1
-                new = new[:index] + new[index:].capitalize()
-        # capitilize after Mc
-        index = new.find("Mc")
-        if index == 0 and len(new) > 2:
-            new = new[:2] + new[2:].capitalize()
-        parts[c] = new
-    return " ".join([X for X in parts if X])
-
-
-def _night(sector: Sector) -> tuple[int, bool]:
-    try:
-        night_landing = nightcalc.night_p(nvecs[sector.to], sector.on)
-        night_duration = nightcalc.night_duration(
-            nvecs[sector.from_], nvecs[sector.to],
-            sector.off, sector.on)
-    except KeyError:
-        return (0, False)
-    return (round(night_duration), night_landing)
-
-
-def _build_roster_string(start, end, block, string):
-    start, end = [X.replace(tzinfo=UTC).astimezone(LT)
-                  for X in (start, end)]
+
+def _joined(lines: Iterable[str], sep: str = "\n") -> Iterator[str]:
+    # the pieces of sep.join(lines), each yielded as soon as it is available
+    lines = iter(lines)
+    for line in lines:
+        yield line
+        break
+    for line in lines:
+        yield sep + line
+
+
+def _build_roster_string(start, end, block, string, tz):
+    start, end = local(start, tz), local(end, tz)
     duration = int((end - start).total_seconds()) // 60
     duration_str = f"{duration // 60}:{duration % 60:02d}"
     block_str = f"{block // 60}:{block % 60:02d}"
@@ -66,105 +38,171 @@ def _build_roster_string(start, end, block, string):
 
 
 def _roster_quasi(
-        qsectors: tuple[Sector, ...],
-        cursor: dt.datetime
+        qsectors: tuple[EnrichedSector, ...],
+        cursor: dt.datetime,
+        tz: str
 ) -> tuple[tuple[str, ...], dt.datetime]:
     retval: list[str] = []
     name = "Brief"
-    for s in qsectors:
+    for s in (X.sector for X in qsectors):
         if cursor < s.off:
-            retval.append(_build_roster_string(cursor, s.off, 0, name))
+            retval.append(_build_roster_string(cursor, s.off, 0, name, tz))
             name = "Debrief"
-        retval.append(_build_roster_string(s.off, s.on, 0, s.name))
+        retval.append(_build_roster_string(s.off, s.on, 0, s.name, tz))
         cursor = s.on
     return (tuple(retval), cursor)
 
 
 def _roster_real(
-        sectors: tuple[Sector, ...],
-        cursor: dt.datetime
+        sectors: tuple[EnrichedSector, ...],
+        cursor: dt.datetime,
+        tz: str
 ) -> tuple[str, dt.datetime]:
-    assert sectors[0].from_
-    airports: list[str] = [sectors[0].from_]
+    assert sectors[0].sector.from_
+    airports: list[str] = [sectors[0].sector.from_]
     block = 0
     start = cursor
-    for sector in sectors:
-        if sector.position:
+    for es in sectors:
+        if es.sector.position:
             airports.append("[psn]")
         else:
-            block += int((sector.on - sector.off).total_seconds()) // 60
-        assert sector.to
-        airports.append(sector.to)
-    cursor = sectors[-1].on + dt.timedelta(minutes=30)
+            block += es.duration
+        assert es.sector.to
+        airports.append(es.sector.to)
+    cursor = sectors[-1].sector.on + dt.timedelta(minutes=30)
     return (
-        _build_roster_string(start, cursor, block, '-'.join(airports)),
+        _build_roster_string(start, cursor, block, '-'.join(airports), tz),
         cursor)
 
 
-def roster(duties: tuple[Duty, ...]) -> str:
-    output: list[str] = []
-    for duty in duties:
+def _roster_lines(duties: Duties, tz: str) -> Iterator[str]:
+    for ed in enrich(duties, night=False):
+        duty = ed.duty
         if not duty.finish:  # an all day duty
             continue
         cursor = duty.start
-        for k, g in itertools.groupby(duty.sectors, key=lambda X: X.quasi):
+        for k, g in itertools.groupby(ed.sectors,
+                                      key=lambda X: X.sector.quasi):
             if k:  # group of quasi sectors
-                new_output, cursor = _roster_quasi(tuple(g), cursor)
-                output += new_output
+                new_output, cursor = _roster_quasi(tuple(g), cursor, tz)
+                yield from new_output
             else:  # group of real sectors
-                new, cursor = _roster_real(tuple(g), cursor)
-                output.append(new)
+                new, cursor = _roster_real(tuple(g), cursor, tz)
+                yield new
         if cursor < duty.finish:
-            output.append(
-                _build_roster_string(cursor, duty.finish, 0, "Debrief"))
-    return "\n".join(output)
+            yield _build_roster_string(cursor, duty.finish, 0, "Debrief", tz)
+
+
+def iter_roster(duties: Duties, tz: str = DEFAULT_ZONE) -> Iterator[str]:
+    """Produce roster output incrementally.
 
+    :param duties: The duties to render.
+    :param tz: The IANA name of the time zone for the output times.
+    :return: An iterator of strings that concatenate to form the output of
+        roster(duties, tz). Each line is yielded as soon as its duty has been
+        read from duties.
+    :raises ValueError: If tz is not a known time zone.
 
-def _efj_sector(sector: Sector) -> str:
-    duration = (sector.on - sector.off).total_seconds() // 60
-    night_duration, night_landing = _night(sector)
+    """
+    zone(tz)  # fail early on an unknown zone
+    return _joined(_roster_lines(duties, tz))
+
+
+def roster(duties: Duties, tz: str = DEFAULT_ZONE) -> str:
+    return "".join(iter_roster(duties, tz))
+
+
+def _efj_sector(es: EnrichedSector) -> str:
+    sector = es.sector
     night_flag = ""
-    if night_duration == duration:
+    if es.night == es.duration:
         night_flag = " n"
-    elif night_duration:
-        ldg_flag = " ln" if night_landing else ""
-        night_flag = f" n:{night_duration}{ldg_flag}"
+    elif es.night:
+        ldg_flag = " ln" if es.night_landing else ""
+        night_flag = f" n:{es.night}{ldg_flag}"
     return (f"{sector.from_}/{sector.to} "
             f"{sector.off:%H%M}/{sector.on:%H%M}{night_flag}")
 
 
-def efj(duties: tuple[Duty, ...]) -> str:
-    output = []
-    for duty in duties:
+def _efj_lines(duties: Duties, jobs: int,
+               night_engine: str) -> Iterator[str]:
+    for ed in enrich(duties, night=True, jobs=jobs,
+                     night_engine=night_engine):
+        duty = ed.duty
         if not duty.finish:  # all day event
             continue
-        output.append(f"{duty.start:%Y-%m-%d}")
+        yield f"{duty.start:%Y-%m-%d}"
         comment = ""
         if (len(duty.sectors) == 1 and duty.sectors[0].quasi):
             comment = f" #{duty.sectors[0].name}"
-        output.append(f"{duty.start:%H%M}/{duty.finish:%H%M}{comment}")
+        yield f"{duty.start:%H%M}/{duty.finish:%H%M}{comment}"
         last_airframe = None
         last_crew = None
-        for sector in duty.sectors:
-            if sector.position or sector.quasi:
+        for es in ed.sectors:
+            sector = es.sector
+            if not flown(sector):
                 continue
-            if sector.crew:
-                crew = [f"{X.role}:{clean_name(X.name)}" for X in sector.crew]
+            if es.crew:
+                crew = [f"{X.role}:{X.name}" for X in es.crew]
                 if crew != last_crew:
-                    output.append(f"{{ {', '.join(crew)} }}")
+                    yield f"{{ {', '.join(crew)} }}"
                 last_crew = crew
             reg = sector.reg or "?-????"
             type_ = sector.type_ or "???"
             if last_airframe != (reg, type_):
-                output.append(f"{reg}:{type_}")
+                yield f"{reg}:{type_}"
                 last_airframe = (reg, type_)
-            output.append(_efj_sector(sector))
-        output.append("")
-    return "\n".join(output)
+            yield _efj_sector(es)
+        yield ""
+
+
+def iter_efj(duties: Duties, jobs: int = 1,
+             night_engine: str = "nightflight") -> Iterator[str]:
+    """Produce eFJ output incrementally.
 
+    :param duties: The duties to render.
+    :param jobs: The number of processes to use for night calculations. If
+        more than one, all duties are read before any output is produced.
+    :param night_engine: The night calculation engine, one of
+        aims.night.ENGINES.
+    :return: An iterator of strings that concatenate to form the output of
+        efj(duties).
 
-def csv(duties: tuple[Duty, ...]) -> str:
-    output = io.StringIO(newline='')
+    """
+    return _joined(_efj_lines(duties, jobs, night_engine))
+
+
+def efj(duties: Duties, jobs: int = 1,
+        night_engine: str = "nightflight") -> str:
+    return "".join(iter_efj(duties, jobs, night_engine))
+
+
+class _Row:
+    # a file-like object that keeps just the last row written by a csv
+    # writer, so that rows can be yielded one at a time
+
+    def __init__(self) -> None:
+        self.text = ""
+
+    def write(self, text: str) -> int:
+        self.text = text
+        return len(text)
+
+
+def iter_csv(duties: Duties, jobs: int = 1,
+             night_engine: str = "nightflight") -> Iterator[str]:
+    """Produce CSV output incrementally.
+
+    :param duties: The duties to render.
+    :param jobs: The number of processes to use for night calculations. If
+        more than one, all duties are read before any output is produced.
+    :param night_engine: The night calculation engine, one of
+        aims.night.ENGINES.
+    :return: An iterator of strings, one per row including its line
+        terminator, that concatenate to form the output of csv(duties).
+
+    """
+    output = _Row()
     fieldnames = ['Off Blocks', 'On Blocks', 'Duration', 'Night', 'Origin',
                   'Destination', 'Registration', 'Type', 'Captain', 'Crew']
     writer = libcsv.DictWriter(
@@ -172,31 +210,36 @@ def csv(duties: tuple[Duty, ...]) -> str:
         fieldnames=fieldnames,
         extrasaction='ignore')
     writer.writeheader()
-    for duty in duties:
-        for sector in duty.sectors:
-            if sector.position or sector.quasi:
+    yield output.text
+    for ed in enrich(duties, night=True, jobs=jobs,
+                     night_engine=night_engine):
+        for es in ed.sectors:
+            sector = es.sector
+            if not flown(sector):
                 continue
-            crew = [CrewMember(clean_name(X[0]), X[1]) for X in sector.crew]
             out_dict = {
                 'Off Blocks': sector.off,
                 'On Blocks': sector.on,
-                'Duration':
-                (sector.on - sector.off) // dt.timedelta(minutes=1),
-                'Night': _night(sector)[0],
+                'Duration': es.duration,
+                'Night': es.night,
                 'Origin': sector.from_,
                 'Destination': sector.to
             }
             out_dict['Registration'] = sector.reg or ""
             out_dict['Type'] = sector.type_ or ""
-            captains = [X.name for X in crew if X.role == "CP"]
-            if not captains:
+            if not es.captains:
                 out_dict['Captain'] = 'Self'
             else:
-                out_dict['Captain'] = ', '.join(captains)
-            out_dict['Crew'] = "; ".join(f"{X.role}:{X.name} " for X in crew)
+                out_dict['Captain'] = ', '.join(es.captains)
+            out_dict['Crew'] = "; ".join(
+                f"{X.role}:{X.name} " for X in es.crew)
             writer.writerow(out_dict)
-    output.seek(0)
-    return output.read()
+            yield output.text
+
+
+def csv(duties: Duties, jobs: int = 1,
+        night_engine: str = "nightflight") -> str:
+    return "".join(iter_csv(duties, jobs, night_engine))
 
 
 vcalendar = """\
@@ -231,25 +274,13 @@ END:VEVENT"""
 ical_datetime = "{:%Y%m%dT%H%M%SZ}"
 
 
-def _build_dict(duty: Duty) -> dict[str, str]:
+def _build_dict(ed: EnrichedDuty, modified: str) -> dict[str, str]:
+    duty = ed.duty
     event = {}
     event["start"] = ical_datetime.format(duty.start)
     event["end"] = ical_datetime.format(duty.finish)
     sector_strings = []
-    airports = []
-    from_ = None
     for sector in duty.sectors:
-        if not from_ and sector.from_:
-            from_ = sector.from_
-        if sector.position:
-            airports.append("[psn]")
-        elif sector.quasi:
-            if sector.from_:
-                airports.append(f"[{sector.name}]")
-            else:
-                airports.append(sector.name)
-        if sector.to:
-            airports.append(sector.to)
         off, on = sector.off, sector.on
         from_to = ""
         if sector.from_ and sector.to:
@@ -260,29 +291,126 @@ def _build_dict(duty: Duty) -> dict[str, str]:
         sector_strings.append(
             f"{off:%H:%M}z-{on:%H:%M}z {sector.name}"
             f"{airframe}{from_to}")
-    if from_:
-        airports = [from_] + airports
     event["sectors"] = "DESCRIPTION:{}\r\n".format(
         "\\n\r\n ".join(sector_strings))
     event["uid"] = "{}{}@HURSTS.ORG.UK".format(
-        duty.start.isoformat(), "".join(airports))
-    event["route"] = "-".join(airports)
-    event["modified"] = ical_datetime.format(dt.datetime.utcnow())
+        duty.start.isoformat(), "".join(ed.airports))
+    event["route"] = ed.route
+    event["modified"] = modified
     return event
 
 
-def ical(duties: tuple[Duty, ...], ade: tuple[AllDayEvent, ...]) -> str:
-    events = []
-    for duty in duties:
-        d = _build_dict(duty)
-        events.append(vevent.format(**d))
+def _ical_events(duties: Duties,
+                 ade: Iterable[AllDayEvent],
+                 modified: Optional[str] = None
+                 ) -> Iterator[tuple[str, str]]:
+    # (uid, VEVENT) pairs, all stamped with modified, which defaults to the
+    # current time
+    modified = modified or ical_datetime.format(dt.datetime.utcnow())
+    for ed in enrich(duties, night=False):
+        d = _build_dict(ed, modified)
+        yield d["uid"], vevent.format(**d)
     for e in ade:
         uid = "{}{}@HURSTS.ORG.UK".format(
             e.date.isoformat(), e.code)
-        modified = ical_datetime.format(dt.datetime.utcnow())
-        events.append(advevent.format(
+        yield uid, advevent.format(
                 day=e.date,
                 ev=e.code,
                 modified=modified,
-                uid=uid))
-    return vcalendar.format("\r\n".join(events))
+                uid=uid)
+
+
+def iter_ical(duties: Duties, ade: Iterable[AllDayEvent]) -> Iterator[str]:
+    """Produce iCalendar output incrementally.
+
+    :param duties: The duties to render.
+    :param ade: The all day events to render. These are only iterated once
+        all the duties have been rendered, so they may be collected while
+        duties is being iterated.
+    :return: An iterator of strings that concatenate to form the output of
+        ical(duties, ade).
+
+    """
+    head, tail = vcalendar.split("{}")
+    yield head
+    yield from _joined((X for _, X in _ical_events(duties, ade)), "\r\n")
+    yield tail
+
+
+def ical(duties: Duties, ade: Iterable[AllDayEvent]) -> str:
+    return "".join(iter_ical(duties, ade))
+
+
+FORMATS = ("roster", "efj", "csv", "ical")
+
+
+def iter_render(format_: str,
+                duties: Duties,
+                ade: Iterable[AllDayEvent] = (),
+                jobs: int = 1,
+                tz: str = DEFAULT_ZONE,
+                night_engine: str = "nightflight") -> Iterator[str]:
+    """Render duties in one of the output formats incrementally.
+
+    The arguments are as for render.
+
+    :return: An iterator of strings that concatenate to form the output.
+
+    """
+    if format_ == "roster":
+        lines = iter_roster(duties, tz)
+    elif format_ == "efj":
+        lines = iter_efj(duties, jobs, night_engine)
+    elif format_ == "csv":
+        lines = iter_csv(duties, jobs, night_engine)
+    elif format_ == "ical":
+        lines = iter_ical(duties, ade)
+    else:
+        raise ValueError(f"Unknown format: {format_}")
+    return aims.instrument.iterate("render", lines)
+
+
+def write(format_: str,
+          duties: Duties,
+          stream: TextIO,
+          ade: Iterable[AllDayEvent] = (),
+          jobs: int = 1,
+          tz: str = DEFAULT_ZONE,
+          night_engine: str = "nightflight") -> None:
+    """Render duties in one of the output formats, writing to a stream.
+
+    Output is written as it is produced, so a stream of duties, e.g. from
+    aims.parse.parse_stream, is rendered without ever being held in memory in
+    full. The arguments are as for render.
+
+    :param stream: A text file-like object to write the output to.
+
+    """
+    for text in iter_render(format_, duties, ade, jobs, tz, night_engine):
+        stream.write(text)
+
+
+def render(format_: str,
+           duties: Duties,
+           ade: Iterable[AllDayEvent] = (),
+           jobs: int = 1,
+           tz: str = DEFAULT_ZONE,
+           night_engine: str = "nightflight") -> str:
+    """Render duties in one of the output formats.
+
+    :param format_: One of FORMATS.
+    :param duties: The duties to render. These may already have been
+        enriched with aims.enrich.enrich, in which case the derived data is
+        reused rather than recalculated.
+    :param ade: All day events. These are only used by the ical format.
+    :param jobs: The number of processes to use for night calculations.
+        These are only used by the efj and csv formats.
+    :param tz: The IANA name of the time zone for local times. This is only
+        used by the roster format.
+    :param night_engine: The night calculation engine, one of
+        aims.night.ENGINES. This is only used by the efj and csv formats.
+    :return: The rendered output.
+
+    """
+    return "".join(iter_render(format_, duties, ade, jobs, tz,
+                               night_engine))
@@ -1,16 +1,192 @@
+import importlib
+import itertools
+import os
+from types import ModuleType
+from typing import (
+    Iterable, Iterator, Union, Optional, NamedTuple, TYPE_CHECKING)
+
 from aims.data_structures import Duty, AllDayEvent, InputFileException
-import aims.roster
-import aims.logbook_report
+import aims.source
+from aims.source import Source, Buffer
+import aims.instrument
+
+if TYPE_CHECKING:
+    from aims.cache import ParseCache
+
+
+HTML5_HEADER = "<!DOCTYPE html><html>"
+ROSTER_MARKER = "Personal&nbsp;Crew&nbsp;Schedule&nbsp;Report"
+LOGBOOK_MARKER = "Pilot&nbsp;Logbook"
+DEFAULT_SNIFF_WINDOW = 1 << 18
+
+
+class ReportType(NamedTuple):
+    """A report layout that parse() can identify and route.
+
+    The module is only imported once a document has been identified as this
+    type of report. It must provide the functions ``duties(html: str)``, with
+    the same return type as parse(), and ``stream(chunks: Iterable[str])``,
+    which returns an iterator of Duty and AllDayEvent objects.
+
+    """
+    name: str
+    markers: tuple[str, ...]
+    module: str
+    sniff_window: int = DEFAULT_SNIFF_WINDOW
+
+
+_registry: list[ReportType] = []
+
+
+def register(report_type: ReportType) -> None:
+    """Add a report type to the registry.
+
+    Report types are tried in order of registration, with the first to find
+    one of its markers within its sniff window being selected. Registering a
+    report type with the same name as an existing entry replaces that entry.
+
+    :param report_type: The ReportType to register.
+
+    """
+    for c, existing in enumerate(_registry):
+        if existing.name == report_type.name:
+            _registry[c] = report_type
+            return
+    _registry.append(report_type)
+
+
+def report_types() -> tuple[ReportType, ...]:
+    """The registered report types, in the order that they are tried."""
+    return tuple(_registry)
+
+
+register(ReportType("roster", (ROSTER_MARKER, ), "aims.roster"))
+register(ReportType("logbook", (LOGBOOK_MARKER, ), "aims.logbook_report"))
+
+
+def identify(prefix: str, final: bool = True) -> Optional[ReportType]:
+    """Identify the type of a report from the start of its text.
 
+    Only the first sniff_window characters of the text are examined for the
+    markers of each report type.
 
-def parse(html: str) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
+    :param prefix: The text of the report, or at least the start of it.
+    :param final: Set to False if more text may follow prefix. In this case
+        a report type is only returned once all report types that take
+        precedence over it have been ruled out.
+    :return: The identified ReportType, or None if no markers were found.
+
+    """
+    for report_type in _registry:
+        for marker in report_type.markers:
+            if prefix.find(marker, 0, report_type.sniff_window) != -1:
+                return report_type
+        if not final and len(prefix) < report_type.sniff_window:
+            return None
+    return None
+
+
+def _module(report_type: ReportType) -> ModuleType:
+    return importlib.import_module(report_type.module)
+
+
+def parse(
+        html: Union[str, Buffer, "os.PathLike[str]"],
+        cache: Optional["ParseCache"] = None
+) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
+    """Parse a report.
+
+    :param html: The report. A str is the text of the document. Bytes-like
+        objects (including mmap objects) are decoded incrementally as they
+        are parsed, using the encoding declared by the document. Path-like
+        objects are read in the same way from the file they refer to, which
+        may also be gzip compressed or a zip archive containing a single
+        .htm or .html file.
+    :param cache: An optional ParseCache. For binary input and files, the
+        cache key is derived from the raw bytes.
+    :return: A tuple of Duty objects and a tuple of AllDayEvent objects.
+
+    """
+    if cache:
+        with aims.source.raw(html) as data:
+            key = cache.key(data)
+        result = cache.get(key)
+        if result is None:
+            result = _parse(html)
+            cache.put(key, result)
+        return result
+    return _parse(html)
+
+
+def _parse(
+        html: Union[str, Buffer, "os.PathLike[str]"]
+) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
+    if not isinstance(html, str):
+        return split(parse_stream(html))
     # check it's an html5 file
-    html5_header = "<!DOCTYPE html><html>"
-    if html[:len(html5_header)] != html5_header:
+    if html[:len(HTML5_HEADER)] != HTML5_HEADER:
+        raise InputFileException("HTML5 header not found.")
+    report_type = identify(html)
+    if not report_type:
+        raise InputFileException("Report type marker not found")
+    with aims.instrument.stage("convert"):
+        return _module(report_type).duties(html)
+
+
+def parse_stream(
+        source: Source
+) -> Iterator[Union[Duty, AllDayEvent]]:
+    """Incrementally parse a report.
+
+    Input is buffered only until the report type can be identified, which
+    requires at most the largest sniff window of the registered report types
+    to be read. After this, chunks are passed straight to the relevant parser
+    and Duty and AllDayEvent objects are yielded as soon as they are
+    complete.
+
+    :param source: The report, in any of the forms accepted by parse, or a
+        text or binary file-like object, or an iterable of str or bytes
+        chunks that concatenate to form the document.
+    :return: An iterator of Duty and AllDayEvent objects in report order.
+
+    """
+    chunks = aims.instrument.iterate("read", aims.source.text_chunks(source))
+    window = max((X.sniff_window for X in _registry), default=0)
+    buffer = ""
+    report_type = None
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) < len(HTML5_HEADER):
+            continue
+        if buffer[:len(HTML5_HEADER)] != HTML5_HEADER:
+            raise InputFileException("HTML5 header not found.")
+        report_type = identify(buffer, False)
+        if report_type or len(buffer) >= window:
+            break
+    if buffer[:len(HTML5_HEADER)] != HTML5_HEADER:
         raise InputFileException("HTML5 header not found.")
-    if html.find("Personal&nbsp;Crew&nbsp;Schedule&nbsp;Report") != -1:
-        return aims.roster.duties(html)
-    elif html.find("Pilot&nbsp;Logbook") != -1:
-        return aims.logbook_report.duties(html)
-    else:
+    report_type = report_type or identify(buffer)
+    if not report_type:
         raise InputFileException("Report type marker not found")
+    return aims.instrument.iterate(
+        "convert",
+        _module(report_type).stream(itertools.chain((buffer, ), chunks)))
+
+
+def split(
+        events: Iterable[Union[Duty, AllDayEvent]]
+) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
+    """Separate the output of parse_stream into the form returned by parse.
+
+    :param events: An iterable of Duty and AllDayEvent objects.
+    :return: A tuple of Duty objects and a tuple of AllDayEvent objects.
+
+    """
+    duties: list[Duty] = []
+    ade: list[AllDayEvent] = []
+    for event in events:
+        if isinstance(event, Duty):
+            duties.append(event)
+        else:
+            ade.append(event)
+    return (tuple(duties), tuple(ade))
@@ -1,29 +1,32 @@
 """Extracts data from a 'vertical' HTML AIMS roster."""
 import datetime as dt
 import re
-
-from bs4 import BeautifulSoup  # type: ignore
+from typing import (
+    Iterator, Iterable, Union, NamedTuple, Optional, Sequence, overload)
 
 from aims.data_structures import (
     Duty, Sector, CrewMember, AllDayEvent, InputFileException)
+import aims.rows
+import aims.instrument
+from aims.rows import Row
+import aims.timeconv as timeconv
+import aims.intern as intern
 
 
-Row = tuple[tuple[str, ...], ...]
+ENGINES = ("stream", "html5lib")
 
 # column indices
 DATE, CODES, DETAILS, DSTART, TIMES, DEND, BHR, DHR, IND, CREW = range(1, 11)
 
 
 def _convert_datestring(in_: str) -> dt.date:
-    return dt.datetime.strptime(in_.split()[0], "%d/%m/%Y").date()
+    return timeconv.date_dmy(in_.split()[0])
 
 
 def _convert_timestring(in_: str, date: dt.date) -> dt.datetime:
-    if in_[-2:] == "⁺¹":
-        in_ = in_[:-2]
-        date = date + dt.timedelta(1)
-    in_ = in_.replace("A", "").replace("E", "")
-    time = dt.datetime.strptime(in_, "%H:%M").time()
+    time, days = timeconv.roster_time(in_)
+    if days:
+        date = date + dt.timedelta(days)
     return dt.datetime.combine(date, time)
 
 
@@ -55,8 +58,8 @@ def _crew(strings: tuple[str, ...]) -> tuple[CrewMember, ...]:
         if len(fields) < 3:
             raise InputFileException("Bad crew block")
         if fields[1] != "PAX":
-            crew.append(CrewMember(fields[-1], fields[0]))
-    return tuple(crew)
+            crew.append(intern.crew_member(fields[-1], fields[0]))
+    return intern.crew(tuple(crew))
 
 
 def _sectors(data: Row, date: dt.date) -> tuple[Sector, ...]:
@@ -100,16 +103,17 @@ def _sectors(data: Row, date: dt.date) -> tuple[Sector, ...]:
     crew = _crew(data[CREW])
     for c, code in enumerate(data[CODES]):
         code_split = code.split()
-        name = code_split[0]
+        name = intern.string(code_split[0])
         type_ = None
         if len(code_split) == 2 and code_split[1][0] == "[":
-            type_ = code_split[1][1:-1]
-        airports = [X.strip() for X in data[DETAILS][c].split(" - ")]
+            type_ = intern.string(code_split[1][1:-1])
+        airports = [intern.string(X.strip())
+                    for X in data[DETAILS][c].split(" - ")]
         times = data[TIMES][c].split("/")[0].split(" - ")
         if len(airports) == 2:
             position = False
             if airports[0][0] == "*":  # Either ground or air positioning
-                airports[0] = airports[0][1:]
+                airports[0] = intern.string(airports[0][1:])
                 position = True
             quasi = not type_  # If no type in code, assume quasi sector
             retval.append(
@@ -209,7 +213,93 @@ def _ade(row: Row) -> AllDayEvent:
         raise InputFileException(f"Bad All Day Duty Record: {str(row)}")
 
 
-def duties(html: str) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
+def _rows(html: str, engine: str) -> Iterator[Row]:
+    """Produce an iterator of raw Row tuples using the requested engine.
+
+    The "stream" engine uses the event driven extractor in aims.rows. The
+    "html5lib" engine builds a full DOM with BeautifulSoup; it is much slower,
+    but is retained as a reference implementation.
+
+    """
+    if engine == "stream":
+        return aims.rows.rows(html)
+    elif engine == "html5lib":
+        # bs4 and html5lib are slow to import, and only used by this engine
+        from bs4 import BeautifulSoup  # type: ignore
+        with aims.instrument.stage("parse"):
+            soup = BeautifulSoup(html, "html5lib")
+        return (tuple(tuple(X.stripped_strings)
+                      for X in tr(["td", "th"]))
+                for tr in soup.find_all("tr"))
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+def _schedule(rows: Iterator[Row]) -> Iterator[Row]:
+    """Select the rows of the schedule table from the rows of a roster.
+
+    The layout of the table is described in the docstring of the duties()
+    function. Non-breaking spaces are replaced with normal spaces.
+
+    :param rows: An iterator of Row tuples representing the whole document.
+    :return: An iterator of the Row tuples of the schedule table, each with a
+        filled DATE field.
+
+    """
+    try:
+        # AIMS separates the words with a non-breaking space
+        while "Schedule Details" not in (
+                Y.replace("\xa0", " ") for X in next(rows) for Y in X):
+            pass
+        next(rows)
+        while True:
+            row: Row = tuple(
+                tuple(Y.replace("\xa0", " ") for Y in X)
+                for X in next(rows))
+            if not row[DATE]:  # line without date ends table
+                break
+            yield row
+    except (StopIteration, IndexError):
+        raise InputFileException("Duty table ended unexpectedly")
+
+
+def _convert(row: Row) -> Union[Duty, AllDayEvent, None]:
+    """Convert a row of the schedule table.
+
+    :param row: A Row tuple with a filled DATE field.
+    :return: A Duty or AllDayEvent object, or None for an unpublished duty.
+
+    """
+    try:
+        if not row[CODES]:  # unpublished duty
+            return None
+        if not row[TIMES]:  # an all day event
+            return _ade(row)
+    except IndexError:
+        raise InputFileException("Duty table ended unexpectedly")
+    return _duty(row)  # a normal duty
+
+
+def _events(rows: Iterator[Row]) -> Iterator[Union[Duty, AllDayEvent]]:
+    """Convert the rows of a roster into Duty and AllDayEvent objects.
+
+    Objects are yielded in document order as soon as the row that they
+    represent is available.
+
+    :param rows: An iterator of Row tuples representing the whole document.
+    :return: An iterator of Duty and AllDayEvent objects.
+
+    """
+    for row in _schedule(rows):
+        event = _convert(row)
+        if event:
+            yield event
+
+
+def duties(
+        html: str,
+        engine: str = "stream",
+        lazy: bool = False
+) -> tuple[Sequence[Duty], tuple[AllDayEvent, ...]]:
     """Extract the data from an AIMS vertical roster.
 
     The entire document is a single table (how retro!). The interesting part
@@ -231,29 +321,215 @@ def duties(html: str) -> tuple[tuple[Duty, ...], tuple[AllDayEvent, ...]]:
     of the _duty() function.
 
     :param html: The html of a 'vertical' HTML AIMS roster.
+    :param engine: The HTML extraction engine, one of ENGINES.
+    :param lazy: If True, the rows representing duties are not converted
+        until they are accessed, and a LazyDuties object is returned in place
+        of the tuple of Duty objects.
     :return: A tuple of Duty objects and a tuple of AllDayEvent objects
 
     """
-    soup = BeautifulSoup(html, "html5lib")
-    rows = iter(soup.find_all("tr"))
-    try:
-        while "Schedule Details" not in next(rows).stripped_strings:
-            pass
-        next(rows)
-        duty_list: list[Duty] = []
-        ade_list: list[AllDayEvent] = []
-        while True:
-            row: Row = tuple(
-                tuple(Y.replace("\xa0", " ") for Y in X.stripped_strings)
-                for X in next(rows)("td"))
-            if not row[DATE]:  # line without date ends table
-                break
+    if lazy:
+        return _lazy_duties(_rows(html, engine))
+    duty_list: list[Duty] = []
+    ade_list: list[AllDayEvent] = []
+    for event in _events(_rows(html, engine)):
+        if isinstance(event, Duty):
+            duty_list.append(event)
+        else:
+            ade_list.append(event)
+    return (tuple(duty_list), tuple(ade_list))
+
+
+class LazyDuties(Sequence[Duty]):
+    """A sequence of Duty objects that are converted on first access.
+
+    The raw Row tuples are stored, and each is converted to a Duty the first
+    time that it is accessed; the converted object is then cached. This is a
+    drop-in replacement for the tuple of Duty objects returned by duties() as
+    far as iteration, indexing, slicing, len() and equality are concerned.
+
+    Since conversion is deferred, an InputFileException caused by a bad duty
+    row is raised when that duty is first accessed rather than by duties().
+
+    """
+
+    def __init__(self, rows: Iterable[Row]) -> None:
+        self.__rows = tuple(rows)
+        self.__duties: list[Optional[Duty]] = [None] * len(self.__rows)
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def __duty(self, index: int) -> Duty:
+        duty = self.__duties[index]
+        if duty is None:
+            duty = _duty(self.__rows[index])
+            self.__duties[index] = duty
+        return duty
+
+    @overload
+    def __getitem__(self, index: int) -> Duty:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "LazyDuties":
+        ...
+
+    def __getitem__(
+            self, index: Union[int, slice]
+    ) -> Union[Duty, "LazyDuties"]:
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)))
+            retval = LazyDuties(self.__rows[index])
+            for c, X in enumerate(indices):
+                retval.__duties[c] = self.__duties[X]
+            return retval
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("LazyDuties index out of range")
+        return self.__duty(index)
+
+    def __iter__(self) -> Iterator[Duty]:
+        for c in range(len(self)):
+            yield self.__duty(c)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (LazyDuties, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        converted = sum(1 for X in self.__duties if X is not None)
+        return f"<LazyDuties: {len(self)} duties, {converted} converted>"
+
+
+def _lazy_duties(
+        rows: Iterator[Row]
+) -> tuple[LazyDuties, tuple[AllDayEvent, ...]]:
+    duty_rows: list[Row] = []
+    ade_list: list[AllDayEvent] = []
+    for row in _schedule(rows):
+        try:
             if not row[CODES]:  # unpublished duty
                 continue
             if not row[TIMES]:  # an all day event
                 ade_list.append(_ade(row))
-            else:  # a normal duty
-                duty_list.append(_duty(row))
-        return (tuple(duty_list), tuple(ade_list))
-    except (StopIteration, IndexError):
-        raise InputFileException("Duty table ended unexpectedly")
+                continue
+        except IndexError:
+            raise InputFileException("Duty table ended unexpectedly")
+        duty_rows.append(row)
+    return (LazyDuties(duty_rows), tuple(ade_list))
+
+
+def stream(chunks: Iterable[str]) -> Iterator[Union[Duty, AllDayEvent]]:
+    """Incrementally extract the data from an AIMS vertical roster.
+
+    :param chunks: An iterable of strings that concatenate to form the html
+        of a 'vertical' HTML AIMS roster.
+    :return: An iterator of Duty and AllDayEvent objects in roster order,
+        each yielded as soon as the row that it represents has been read.
+
+    """
+    return _events(aims.rows.iter_rows(chunks))
+
+
+Event = Union[Duty, AllDayEvent]
+
+
+class Changes(NamedTuple):
+    added: tuple[Event, ...]
+    removed: tuple[Event, ...]
+    modified: tuple[tuple[Event, Event], ...]
+
+
+class State(NamedTuple):
+    events: dict[bytes, Optional[Event]]
+    keys: dict[str, bytes]
+
+
+class Update(NamedTuple):
+    duties: tuple[Duty, ...]
+    ade: tuple[AllDayEvent, ...]
+    changes: Changes
+    state: State
+
+
+def _fingerprint(row: Row) -> bytes:
+    import hashlib  # only needed by update
+    return hashlib.blake2b(repr(row).encode(), digest_size=16).digest()
+
+
+def update(
+        html: str,
+        previous: Optional[State] = None,
+        engine: str = "stream"
+) -> Update:
+    """Extract the data from a revised AIMS vertical roster.
+
+    Rosters are often re-downloaded with only a few rows changed. Each row of
+    the schedule table is fingerprinted, and only rows whose fingerprint does
+    not appear in the state from the previous run are converted; the objects
+    for the remaining rows are taken from that state.
+
+    Rows are matched between versions by their date (with an occurrence
+    index to distinguish multiple rows on the same date), which allows the
+    differences to be reported as a set of changes.
+
+    :param html: The html of a 'vertical' HTML AIMS roster.
+    :param previous: The state returned by the previous call, or None to
+        process every row.
+    :param engine: The HTML extraction engine, one of ENGINES.
+    :return: An Update object containing the Duty and AllDayEvent objects of
+        the roster, the changes since the previous version, and the state to
+        pass to the next call.
+
+    """
+    if previous is None:
+        previous = State({}, {})
+    state = State({}, {})
+    duty_list: list[Duty] = []
+    ade_list: list[AllDayEvent] = []
+    for row in _schedule(_rows(html, engine)):
+        fingerprint = _fingerprint(row)
+        if fingerprint in previous.events:
+            event = previous.events[fingerprint]
+        else:
+            event = _convert(row)
+        state.events[fingerprint] = event
+        date = row[DATE][0].split()[0]
+        key, c = date, 1
+        while key in state.keys:
+            key = f"{date}#{c}"
+            c += 1
+        state.keys[key] = fingerprint
+        if isinstance(event, Duty):
+            duty_list.append(event)
+        elif event:
+            ade_list.append(event)
+    added: list[Event] = []
+    removed: list[Event] = []
+    modified: list[tuple[Event, Event]] = []
+    for key, fingerprint in state.keys.items():
+        new = state.events[fingerprint]
+        old_fingerprint = previous.keys.get(key)
+        if fingerprint == old_fingerprint:
+            continue
+        old = (previous.events[old_fingerprint]
+               if old_fingerprint else None)
+        if old and new:
+            modified.append((old, new))
+        elif new:
+            added.append(new)
+        elif old:
+            removed.append(old)
+    for key, fingerprint in previous.keys.items():
+        if key not in state.keys:
+            old = previous.events[fingerprint]
+            if old:
+                removed.append(old)
+    return Update(tuple(duty_list), tuple(ade_list),
+                  Changes(tuple(added), tuple(removed), tuple(modified)),
+                  state)
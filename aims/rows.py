@@ -0,0 +1,267 @@
+"""Event driven extraction of table rows from AIMS HTML reports.
+
+The AIMS reports are very long, flat tables, and all that is needed from them
+is the text content of each cell of each <tr>. Building a full DOM with
+BeautifulSoup and html5lib just to walk it once is expensive, so the classes
+in this module collect the required strings directly from the token stream
+produced by the standard library's html.parser module.
+
+"""
+from html.parser import HTMLParser
+from typing import Optional, Iterator, Iterable, Callable, Union
+
+import aims.instrument
+
+
+Row = tuple[tuple[str, ...], ...]
+
+# text inside these elements is not document text
+_IGNORED = {"script", "style", "template"}
+# cells: AIMS uses <td> for data, but headings may be <th>
+_CELLS = {"td", "th"}
+# end tags that implicitly close any open row
+_ROW_CLOSERS = {"table", "tbody", "thead", "tfoot"}
+
+
+class RowExtractor(HTMLParser):
+    """Collect the stripped strings of each <td> or <th> of each <tr>.
+
+    The output for each row matches what BeautifulSoup would produce with
+    ``tuple(tuple(X.stripped_strings) for X in tr(["td", "th"]))`` for a flat
+    table, i.e. a tuple with an entry for each cell, each entry being a tuple
+    of the non-empty, whitespace stripped text nodes of that cell. Text nodes
+    are separated by tags and comments, so a <br> in a cell results in two
+    strings. Non-breaking spaces are left as "\\xa0".
+
+    Completed rows are appended to the ``rows`` attribute as they close. When
+    feeding the parser incrementally, the consumer should remove rows from
+    this list after each call to ``feed``.
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: list[Row] = []
+        self.__row: Optional[list[tuple[str, ...]]] = None
+        self.__cell: Optional[list[str]] = None
+        self.__text: list[str] = []
+        self.__ignore = 0
+
+    def __flush_text(self) -> None:
+        # A text node may arrive in several handle_data calls, so it is only
+        # complete when the next tag or comment is seen.
+        if self.__text:
+            text = "".join(self.__text).strip()
+            self.__text = []
+            if text and self.__cell is not None:
+                self.__cell.append(text)
+
+    def __close_cell(self) -> None:
+        self.__flush_text()
+        if self.__cell is not None:
+            assert self.__row is not None
+            self.__row.append(tuple(self.__cell))
+            self.__cell = None
+
+    def __close_row(self) -> None:
+        self.__close_cell()
+        if self.__row is not None:
+            self.rows.append(tuple(self.__row))
+            self.__row = None
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self.__flush_text()
+        if tag == "tr":
+            self.__close_row()
+            self.__row = []
+        elif tag in _CELLS:
+            self.__close_cell()
+            if self.__row is None:  # implied <tr>
+                self.__row = []
+            self.__cell = []
+        elif tag in _IGNORED:
+            self.__ignore += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        self.__flush_text()
+        if tag in _CELLS:
+            self.__close_cell()
+        elif tag == "tr" or tag in _ROW_CLOSERS:
+            self.__close_row()
+        elif tag in _IGNORED and self.__ignore:
+            self.__ignore -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self.__cell is not None and not self.__ignore:
+            self.__text.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        self.__flush_text()
+
+    def close(self) -> None:
+        super().close()
+        self.__close_row()
+
+
+class FirstStringExtractor(HTMLParser):
+    """Collect the first stripped string of each <td> of selected <tr>s.
+
+    Each output row is a tuple with an entry for each cell, the entry being
+    the first non-empty, whitespace stripped text node of the cell, or an
+    empty string if there is none. This matches what BeautifulSoup would
+    produce with ``tuple(next(X.stripped_strings, "") for X in tr("td"))``.
+
+    Rows are selected by testing the string in the key column with the
+    accept function as soon as that cell closes. Rejected rows, and rows that
+    are too short to have a key column, are discarded without processing any
+    more of their content.
+
+    Completed rows are appended to the ``rows`` attribute as they close.
+
+    """
+
+    def __init__(self, key_column: int, accept: Callable[[str], object]
+                 ) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: list[tuple[str, ...]] = []
+        self.key_column = key_column
+        self.accept = accept
+        self.__row: Optional[list[str]] = None
+        self.__in_cell = False
+        self.__found = False
+        self.__text: list[str] = []
+        self.__ignore = 0
+
+    def __flush_text(self) -> None:
+        if self.__text:
+            text = "".join(self.__text).strip()
+            self.__text = []
+            if text and self.__row is not None:
+                self.__row[-1] = text
+                self.__found = True
+
+    def __close_cell(self) -> None:
+        if not self.__in_cell:
+            return
+        self.__flush_text()
+        self.__in_cell = False
+        assert self.__row is not None
+        if (len(self.__row) == self.key_column + 1
+                and not self.accept(self.__row[-1])):
+            self.__row = None
+
+    def __close_row(self) -> None:
+        self.__close_cell()
+        if self.__row is not None and len(self.__row) > self.key_column:
+            self.rows.append(tuple(self.__row))
+        self.__row = None
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self.__flush_text()
+        if tag == "tr":
+            self.__close_row()
+            self.__row = []
+        elif tag == "td":
+            self.__close_cell()
+            if self.__row is not None:
+                self.__row.append("")
+                self.__in_cell = True
+                self.__found = False
+        elif tag in _IGNORED:
+            self.__ignore += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        self.__flush_text()
+        if tag == "td":
+            self.__close_cell()
+        elif tag == "tr" or tag in _ROW_CLOSERS:
+            self.__close_row()
+        elif tag in _IGNORED and self.__ignore:
+            self.__ignore -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self.__in_cell and not self.__found and not self.__ignore:
+            self.__text.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        self.__flush_text()
+
+    def close(self) -> None:
+        super().close()
+        self.__close_row()
+
+
+def _drain(
+        parser: Union[RowExtractor, FirstStringExtractor],
+        chunks: Iterable[str]
+) -> Iterator:
+    # Rows are passed on as soon as the chunk that closes them has been fed.
+    for chunk in chunks:
+        with aims.instrument.stage("parse"):
+            parser.feed(chunk)
+        completed, parser.rows = parser.rows, []
+        yield from completed
+    with aims.instrument.stage("parse"):
+        parser.close()
+    yield from parser.rows
+
+
+def rows(html: str) -> Iterator[Row]:
+    """Iterate over the rows of an HTML document.
+
+    :param html: The HTML to process.
+    :return: An iterator of Row tuples, as described in the docstring of
+        RowExtractor.
+
+    """
+    return iter_rows((html, ))
+
+
+def iter_rows(chunks: Iterable[str]) -> Iterator[Row]:
+    """Iterate over the rows of an HTML document supplied in chunks.
+
+    Each row is yielded as soon as the chunk containing its end has been
+    processed, so only the row currently being built is held in memory.
+
+    :param chunks: An iterable of strings that concatenate to form the HTML.
+    :return: An iterator of Row tuples, as described in the docstring of
+        RowExtractor.
+
+    """
+    return _drain(RowExtractor(), chunks)
+
+
+def first_strings(
+        html: str,
+        key_column: int,
+        accept: Callable[[str], object]
+) -> Iterator[tuple[str, ...]]:
+    """Iterate over the selected rows of an HTML document.
+
+    :param html: The HTML to process.
+    :param key_column: The index of the cell used to select rows.
+    :param accept: A function that returns a truthy value if the first string
+        of the key column cell indicates that the row is required.
+    :return: An iterator of tuples of strings, as described in the docstring
+        of FirstStringExtractor.
+
+    """
+    return iter_first_strings((html, ), key_column, accept)
+
+
+def iter_first_strings(
+        chunks: Iterable[str],
+        key_column: int,
+        accept: Callable[[str], object]
+) -> Iterator[tuple[str, ...]]:
+    """Iterate over the selected rows of an HTML document supplied in chunks.
+
+    :param chunks: An iterable of strings that concatenate to form the HTML.
+    :param key_column: The index of the cell used to select rows.
+    :param accept: A function that returns a truthy value if the first string
+        of the key column cell indicates that the row is required.
+    :return: An iterator of tuples of strings, as described in the docstring
+        of FirstStringExtractor.
+
+    """
+    return _drain(FirstStringExtractor(key_column, accept), chunks)
@@ -0,0 +1,151 @@
+"""Columnar storage for very large numbers of sectors.
+
+A Sector named tuple holds ten Python objects, including two datetimes, which
+adds up for a logbook spanning a decade. A SectorTable instead stores each
+field in a compact array:
+
+* off and on times as whole minutes since the Unix epoch;
+* names, registrations, types and airports as indices into a table of
+  unique strings;
+* the quasi and position flags as bits of a single byte;
+* crews as indices into a table of unique crew tuples.
+
+The table is a Sequence of Sector objects, which are created on demand when
+indexed or iterated, so it can be used wherever a tuple of sectors would be.
+
+"""
+from array import array
+import datetime as dt
+from typing import Optional, Iterable, Iterator, Sequence, Union, overload
+
+from aims.data_structures import Sector, CrewMember
+
+
+EPOCH = dt.datetime(1970, 1, 1)
+MINUTE = dt.timedelta(minutes=1)
+
+QUASI = 1
+POSITION = 2
+
+
+def _minutes(time: dt.datetime) -> int:
+    minutes, remainder = divmod(time - EPOCH, MINUTE)
+    if remainder:
+        raise ValueError(f"SectorTable only stores whole minutes: {time}")
+    return minutes
+
+
+class SectorTable(Sequence[Sector]):
+
+    def __init__(self, sectors: Iterable[Sector] = ()) -> None:
+        self.__strings: list[Optional[str]] = [None]
+        self.__string_codes: dict[Optional[str], int] = {None: 0}
+        self.__crews: list[tuple[CrewMember, ...]] = []
+        self.__crew_codes: dict[tuple[CrewMember, ...], int] = {}
+        self.names = array("I")
+        self.regs = array("I")
+        self.types = array("I")
+        self.froms = array("I")
+        self.tos = array("I")
+        self.offs = array("q")
+        self.ons = array("q")
+        self.flags = array("B")
+        self.crews = array("I")
+        for sector in sectors:
+            self.append(sector)
+
+    def __string_code(self, s: Optional[str]) -> int:
+        code = self.__string_codes.get(s)
+        if code is None:
+            code = len(self.__strings)
+            self.__strings.append(s)
+            self.__string_codes[s] = code
+        return code
+
+    def __crew_code(self, crew: tuple[CrewMember, ...]) -> int:
+        code = self.__crew_codes.get(crew)
+        if code is None:
+            code = len(self.__crews)
+            self.__crews.append(crew)
+            self.__crew_codes[crew] = code
+        return code
+
+    def add(self, name: str, reg: Optional[str], type_: Optional[str],
+            from_: Optional[str], to: Optional[str],
+            off: dt.datetime, on: dt.datetime,
+            quasi: bool, position: bool,
+            crew: tuple[CrewMember, ...]) -> None:
+        """Add a sector to the table from its individual fields.
+
+        The arguments are as for the fields of a Sector. Times must be whole
+        minutes.
+
+        """
+        # everything is converted before anything is appended, so that an
+        # invalid value leaves the columns the same length
+        off_minutes, on_minutes = _minutes(off), _minutes(on)
+        codes = [self.__string_code(X) for X in (name, reg, type_, from_, to)]
+        crew_code = self.__crew_code(crew)
+        self.offs.append(off_minutes)
+        self.ons.append(on_minutes)
+        self.names.append(codes[0])
+        self.regs.append(codes[1])
+        self.types.append(codes[2])
+        self.froms.append(codes[3])
+        self.tos.append(codes[4])
+        self.flags.append((QUASI if quasi else 0)
+                          | (POSITION if position else 0))
+        self.crews.append(crew_code)
+
+    def append(self, sector: Sector) -> None:
+        """Add a Sector to the table."""
+        self.add(*sector)
+
+    def off(self, index: int) -> dt.datetime:
+        """The off blocks time of the sector at index."""
+        return EPOCH + MINUTE * self.offs[index]
+
+    def on(self, index: int) -> dt.datetime:
+        """The on blocks time of the sector at index."""
+        return EPOCH + MINUTE * self.ons[index]
+
+    def __len__(self) -> int:
+        return len(self.offs)
+
+    def __sector(self, index: int) -> Sector:
+        strings = self.__strings
+        name = strings[self.names[index]]
+        assert name is not None
+        flags = self.flags[index]
+        return Sector(name,
+                      strings[self.regs[index]],
+                      strings[self.types[index]],
+                      strings[self.froms[index]],
+                      strings[self.tos[index]],
+                      self.off(index), self.on(index),
+                      bool(flags & QUASI), bool(flags & POSITION),
+                      self.__crews[self.crews[index]])
+
+    @overload
+    def __getitem__(self, index: int) -> Sector:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> tuple[Sector, ...]:
+        ...
+
+    def __getitem__(
+            self, index: Union[int, slice]
+    ) -> Union[Sector, tuple[Sector, ...]]:
+        if isinstance(index, slice):
+            return tuple(self.__sector(X)
+                         for X in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SectorTable index out of range")
+        return self.__sector(index)
+
+    def __iter__(self) -> Iterator[Sector]:
+        for c in range(len(self)):
+            yield self.__sector(c)
@@ -0,0 +1,252 @@
+"""A long running HTTP server for converting reports.
+
+Each ``aims`` invocation pays for starting Python and importing the parsers
+and night flying code. For scripted use, ``aims serve`` pays this once: the
+server accepts the same JSON requests as the AWS lambda function (see
+aims.api), POSTed to any path, and responds with the JSON encoded result.
+
+Connections are HTTP/1.1 with keep-alive, and are handled by a fixed pool
+of threads. Optionally, the conversions themselves are run in a pool of
+worker processes, so that several can use the CPU at once. The server
+listens on a TCP port or, for local use without a network port, on a Unix
+domain socket.
+
+"""
+import functools
+import http.server
+import importlib
+import json
+import multiprocessing
+import os
+import socketserver
+import stat
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional, Callable, Union
+
+import aims.api
+from aims.cache import DEFAULT_DIR
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_THREADS = 8
+DEFAULT_MAX_BYTES = 16 << 20
+IDLE_TIMEOUT = 30  # seconds before an idle keep-alive connection is closed
+
+# imported when the server starts, so that the first request doesn't pay
+_WARM_MODULES = ("aims.roster", "aims.logbook_report", "aims.night",
+                 "zoneinfo")
+
+
+def warm() -> None:
+    """Import the modules used by conversions."""
+    for module in _WARM_MODULES:
+        importlib.import_module(module)
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    server_version = "aims-serve"
+    timeout = IDLE_TIMEOUT
+
+    def address_string(self) -> str:
+        # Unix domain socket clients don't have an address
+        return (self.client_address[0] if self.client_address
+                else "unix")
+
+    def _send(self, status: int, body: str,
+              close: bool = False, **headers: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str,
+               close: bool = False, **headers: str) -> None:
+        self._send(status, json.dumps({"error": message}), close, **headers)
+
+    def do_POST(self) -> None:
+        server: Any = self.server
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            self._error(411, "Chunked requests are not supported", True)
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+            if length < 0:
+                raise ValueError(length)
+        except (TypeError, ValueError):
+            self._error(411, "A valid Content-Length is required", True)
+            return
+        if length > server.max_bytes:
+            # the body is not read, so the connection can't be reused
+            self._error(413, f"Request larger than {server.max_bytes} bytes",
+                        True)
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            result = server.convert(request)
+        except (ValueError, KeyError, TypeError) as e:
+            # includes a missing member in the request
+            self._error(400, f"Bad request: {e!r}")
+            return
+        except Exception as e:
+            self.log_error("Conversion failed: %r", e)
+            self._error(500, f"Conversion failed: {e!r}")
+            return
+        self._send(200, json.dumps(result))
+
+    def do_GET(self) -> None:
+        self._error(405, "Requests must be POSTed", Allow="POST")
+
+    do_HEAD = do_PUT = do_DELETE = do_GET
+
+
+class _PoolMixIn:
+    # handles each connection on a thread from a fixed size pool, rather
+    # than on a new thread as socketserver.ThreadingMixIn does, and holds
+    # the settings used by Handler
+
+    convert: Callable[[dict[str, Any]], str]
+    max_bytes: int = DEFAULT_MAX_BYTES
+    pool: ThreadPoolExecutor
+    executor: Optional[Executor] = None  # for conversions, if any
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request: Any, client_address: Any) -> None:
+        server: Any = self
+        try:
+            server.finish_request(request, client_address)
+        except Exception:
+            server.handle_error(request, client_address)
+        finally:
+            server.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()  # type: ignore
+        self.pool.shutdown()
+        if self.executor:
+            self.executor.shutdown()
+
+
+class HTTPServer(_PoolMixIn, http.server.HTTPServer):
+    pass
+
+
+class UnixHTTPServer(_PoolMixIn, socketserver.UnixStreamServer):
+
+    def __init__(self, path: str, handler: Any) -> None:
+        self.path = path
+        super().__init__(path, handler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _convert(request: dict[str, Any], cache_dir: str) -> str:
+    return aims.api.convert(request, cache_dir)
+
+
+def server(address: Optional[tuple[str, int]] = None,
+           socket_path: Optional[str] = None,
+           threads: int = DEFAULT_THREADS,
+           jobs: int = 1,
+           max_bytes: int = DEFAULT_MAX_BYTES,
+           cache_dir: str = DEFAULT_DIR
+           ) -> Union[HTTPServer, UnixHTTPServer]:
+    """Create a server, ready to be run with serve_forever.
+
+    The caller is responsible for calling server_close when done, which
+    also shuts down the worker pools and removes any Unix domain socket.
+
+    :param address: The host and port to listen on. Port 0 picks a free
+        port, which can be found from the server's server_address.
+    :param socket_path: The path of a Unix domain socket to listen on
+        instead. An existing socket at this path, e.g. left by a server that
+        was killed, is replaced.
+    :param threads: The number of connections handled at once. Further
+        connections wait until a thread is free.
+    :param jobs: If more than one, conversions are run in a pool of this
+        many worker processes.
+    :param max_bytes: The largest request body accepted.
+    :param cache_dir: The cache directory used for requests with the
+        "cache" option.
+    :return: The server.
+    :raises FileExistsError: If socket_path exists and is not a socket.
+
+    """
+    srv: Union[HTTPServer, UnixHTTPServer]
+    if socket_path:
+        try:
+            mode = os.lstat(socket_path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(
+                    f"{socket_path} exists and is not a socket")
+            os.remove(socket_path)
+        srv = UnixHTTPServer(socket_path, Handler)
+    else:
+        srv = HTTPServer(address or (DEFAULT_HOST, DEFAULT_PORT), Handler)
+    srv.max_bytes = max_bytes
+    srv.pool = ThreadPoolExecutor(threads, thread_name_prefix="aims-serve")
+    convert = functools.partial(_convert, cache_dir=cache_dir)
+    if jobs > 1:
+        # workers are spawned rather than forked, since forking would copy
+        # the threads and open connections of the server
+        executor = ProcessPoolExecutor(
+            jobs, multiprocessing.get_context("spawn"), initializer=warm)
+        srv.executor = executor
+        srv.convert = lambda X: executor.submit(convert, X).result()
+    else:
+        warm()
+        srv.convert = convert
+    return srv
+
+
+def run(address: Optional[tuple[str, int]] = None,
+        socket_path: Optional[str] = None,
+        threads: int = DEFAULT_THREADS,
+        jobs: int = 1,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        cache_dir: str = DEFAULT_DIR) -> int:
+    """Run a server until interrupted.
+
+    The arguments are as for server.
+
+    :return: 0, or 1 if the server could not be started.
+
+    """
+    try:
+        srv = server(address, socket_path, threads, jobs, max_bytes,
+                     cache_dir)
+    except OSError as e:
+        print(f"Unable to start server: {e}", file=sys.stderr)
+        return 1
+    if isinstance(srv, HTTPServer):
+        host, port = srv.server_address[:2]
+        print(f"Serving on http://{host!s}:{port}/", file=sys.stderr)
+    else:
+        print(f"Serving on {socket_path}", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+    return 0
@@ -0,0 +1,253 @@
+"""Decoding of report input from the various forms in which it arrives.
+
+Reports may be supplied as text, as bytes (including memory-mapped files), as
+file objects or as paths to files. Files may be plain HTML, or gzip or zip
+compressed. Binary input is decoded incrementally in chunks, so the whole
+document is never copied just to decode it. Line endings are normalised to
+"\\n", as they would be when reading a file in text mode.
+
+The encoding of binary input is taken from a byte order mark or a <meta>
+charset declaration near the start of the document, defaulting to UTF-8.
+
+"""
+import codecs
+import contextlib
+import io
+import mmap
+import os
+import os.path
+import re
+from typing import (
+    Union, Iterable, Iterator, IO, Any, cast, TYPE_CHECKING)
+
+from aims.data_structures import InputFileException
+
+if TYPE_CHECKING:
+    import zipfile
+
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+Source = Union[str, Buffer, "os.PathLike[str]", IO[Any], Iterable[Any]]
+
+CHUNK_SIZE = 1 << 16
+SNIFF_SIZE = 4096
+DEFAULT_ENCODING = "utf-8"
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZIP_MAGIC = b"PK\x03\x04"
+_RE_CHARSET = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"),
+         (codecs.BOM_UTF16_LE, "utf-16"),
+         (codecs.BOM_UTF16_BE, "utf-16"))
+_REPORT_SUFFIXES = (".htm", ".html")
+
+
+def sniff_encoding(prefix: Buffer) -> str:
+    """Determine the encoding of an HTML document from its first bytes.
+
+    :param prefix: At least the first SNIFF_SIZE bytes of the document, if it
+        is that long.
+    :return: The name of the encoding.
+
+    """
+    prefix = bytes(prefix[:SNIFF_SIZE])
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    match = _RE_CHARSET.search(prefix)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return DEFAULT_ENCODING
+
+
+def decode(chunks: Iterable[Buffer]) -> Iterator[str]:
+    """Incrementally decode a document supplied as chunks of bytes.
+
+    :param chunks: An iterable of bytes-like objects.
+    :return: An iterator of decoded strings.
+
+    """
+    chunks = iter(chunks)
+    head: list[Buffer] = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= SNIFF_SIZE:
+            break
+    encoding = sniff_encoding(b"".join(head))
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding)(), True)
+    try:
+        for chunk in head:
+            yield decoder.decode(chunk)
+        for chunk in chunks:
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", True)
+    except UnicodeDecodeError as e:
+        raise InputFileException(f"Unable to decode input as {encoding}: {e}")
+
+
+def _slices(buffer: Buffer) -> Iterator[memoryview]:
+    view = memoryview(buffer)  # type: ignore
+    for c in range(0, len(view), CHUNK_SIZE):
+        yield view[c:c + CHUNK_SIZE]
+
+
+def _reads(f: Any) -> Iterator[Any]:
+    return iter(lambda: f.read(CHUNK_SIZE), f.read(0))
+
+
+def _zip_member(archive: "zipfile.ZipFile") -> str:
+    names = [X for X in archive.namelist()
+             if X.lower().endswith(_REPORT_SUFFIXES)]
+    if len(names) != 1:
+        raise InputFileException(
+            "Zip archive must contain exactly one .htm or .html file")
+    return names[0]
+
+
+def _magic(f: IO[bytes]) -> bytes:
+    if f.seekable():
+        magic = f.read(len(_ZIP_MAGIC))
+        f.seek(0)
+        return magic
+    peek = getattr(f, "peek", None)
+    return peek(len(_ZIP_MAGIC))[:len(_ZIP_MAGIC)] if peek else b""
+
+
+def _binary_chunks(f: IO[bytes], name: str = "input") -> Iterator[Buffer]:
+    try:
+        yield from _decompressed_chunks(f, name)
+    except (OSError, EOFError) as e:
+        raise InputFileException(f"Unable to read {name}: {e}")
+
+
+def _decompressed_chunks(f: IO[bytes], name: str) -> Iterator[Buffer]:
+    magic = _magic(f)
+    # the compression modules are only imported when they are needed
+    if magic.startswith(_GZIP_MAGIC):
+        import gzip
+        with gzip.GzipFile(fileobj=f) as g:
+            yield from _reads(g)
+    elif magic == _ZIP_MAGIC:
+        import zipfile
+        try:
+            with zipfile.ZipFile(f) as archive:
+                with archive.open(_zip_member(archive)) as member:
+                    yield from _reads(member)
+        except zipfile.BadZipFile as e:
+            raise InputFileException(f"Unable to read {name}: {e}")
+    else:
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # empty files, pipes and in-memory files can't be mapped
+            yield from _reads(f)
+            return
+        with m:
+            # slicing an mmap copies just the slice, and leaves no exported
+            # buffers that would prevent it from being closed
+            for c in range(0, len(m), CHUNK_SIZE):
+                yield m[c:c + CHUNK_SIZE]
+
+
+def _path_chunks(path: "os.PathLike[str]") -> Iterator[Buffer]:
+    try:
+        f = open(path, "rb")
+    except OSError as e:
+        raise InputFileException(f"Unable to open {os.fspath(path)}: {e}")
+    with f:
+        yield from _binary_chunks(f, os.fspath(path))
+
+
+def _buffer_chunks(buffer: Buffer) -> Iterator[Buffer]:
+    if (buffer[:len(_GZIP_MAGIC)] == _GZIP_MAGIC
+            or buffer[:len(_ZIP_MAGIC)] == _ZIP_MAGIC):
+        return _binary_chunks(io.BytesIO(buffer))  # type: ignore
+    return _slices(buffer)
+
+
+def text_chunks(source: Source) -> Iterator[str]:
+    """Produce the text of a report in chunks.
+
+    :param source: The report. This may be a str; a bytes-like object such as
+        bytes, a memoryview or an mmap; a path-like object; a text or binary
+        file object; or an iterable of str or bytes-like chunks. Paths and
+        bytes may be gzip or zip compressed; a zip archive must contain
+        exactly one .htm or .html file.
+    :return: An iterator of strings that concatenate to form the HTML.
+
+    """
+    if isinstance(source, str):
+        return iter((source, ))
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return decode(_buffer_chunks(source))
+    if isinstance(source, os.PathLike):
+        return decode(_path_chunks(source))
+    if hasattr(source, "read"):
+        f = cast(IO[Any], source)
+        if isinstance(f, io.TextIOBase):
+            return _reads(f)
+        return decode(_binary_chunks(f))
+    return _mixed_chunks(iter(source))
+
+
+def _mixed_chunks(chunks: Iterator[Any]) -> Iterator[str]:
+    first = next(chunks, "")
+    if isinstance(first, str):
+        yield first
+        yield from chunks
+    else:
+        yield from decode(_prepend(first, chunks))
+
+
+def _prepend(first: Any, rest: Iterator[Any]) -> Iterator[Any]:
+    yield first
+    yield from rest
+
+
+@contextlib.contextmanager
+def raw(source: Union[str, Buffer, "os.PathLike[str]"]
+        ) -> Iterator[Union[str, Buffer]]:
+    """Provide the undecoded content of a source, e.g. for hashing.
+
+    Files are memory-mapped rather than read.
+
+    :param source: A str, bytes-like object or path-like object.
+    :return: A context manager providing a str or bytes-like object.
+
+    """
+    if not isinstance(source, os.PathLike):
+        yield source
+        return
+    try:
+        f = open(source, "rb")
+    except OSError as e:
+        raise InputFileException(f"Unable to open {os.fspath(source)}: {e}")
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+def stem(path: str) -> str:
+    """The file name of a report without its directory or extensions.
+
+    Compression suffixes are removed along with the report suffix, so both
+    "roster.htm" and "roster.htm.gz" give "roster".
+
+    """
+    name = os.path.basename(path)
+    base, ext = os.path.splitext(name)
+    if ext.lower() in (".gz", ".zip"):
+        base, ext = os.path.splitext(base)
+        if ext.lower() not in _REPORT_SUFFIXES:
+            base += ext
+    return base
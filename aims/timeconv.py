@@ -0,0 +1,90 @@
+"""Fast conversion of the fixed format date and time strings used by AIMS.
+
+datetime.strptime is slow, and a large report requires several conversions
+per sector. The strings in AIMS reports always have the same fixed format, so
+they can be converted by slicing, and since the same dates and times recur
+many times in a report, results are memoised.
+
+Anything that does not match the expected format exactly, or that fails
+validation, is passed on to strptime, so results and exceptions are
+identical to calling strptime directly.
+
+"""
+import datetime as dt
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+
+def _digits(s: str) -> bool:
+    return s.isascii() and s.isdigit()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def date_dmy(in_: str) -> dt.date:
+    """Convert a string of the form DD/MM/YYYY to a date.
+
+    :param in_: The string to convert.
+    :return: The equivalent of ``datetime.strptime(in_, "%d/%m/%Y").date()``.
+
+    """
+    if (len(in_) == 10 and in_[2] == "/" and in_[5] == "/"
+            and _digits(in_[:2] + in_[3:5] + in_[6:])):
+        try:
+            return dt.date(int(in_[6:]), int(in_[3:5]), int(in_[:2]))
+        except ValueError:
+            pass
+    return dt.datetime.strptime(in_, "%d/%m/%Y").date()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def date_dmy_short(in_: str) -> dt.date:
+    """Convert a string of the form DD/MM/YY to a date.
+
+    :param in_: The string to convert.
+    :return: The equivalent of ``datetime.strptime(in_, "%d/%m/%y").date()``.
+
+    """
+    if (len(in_) == 8 and in_[2] == "/" and in_[5] == "/"
+            and _digits(in_[:2] + in_[3:5] + in_[6:])):
+        year = int(in_[6:])
+        year += 2000 if year <= 68 else 1900  # as strptime
+        try:
+            return dt.date(year, int(in_[3:5]), int(in_[:2]))
+        except ValueError:
+            pass
+    return dt.datetime.strptime(in_, "%d/%m/%y").date()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def time_hm(in_: str) -> dt.time:
+    """Convert a string of the form HH:MM to a time.
+
+    :param in_: The string to convert.
+    :return: The equivalent of ``datetime.strptime(in_, "%H:%M").time()``.
+
+    """
+    if len(in_) == 5 and in_[2] == ":" and _digits(in_[:2] + in_[3:]):
+        hours, minutes = int(in_[:2]), int(in_[3:])
+        if hours < 24 and minutes < 60:
+            return dt.time(hours, minutes)
+    return dt.datetime.strptime(in_, "%H:%M").time()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def roster_time(in_: str) -> tuple[dt.time, int]:
+    """Convert a time string from an AIMS vertical roster.
+
+    These have the basic form HH:MM, but may have an "A" (actual) or "E"
+    (estimated) prefix, and a "⁺¹" suffix if the time is on the following
+    day.
+
+    :param in_: The string to convert.
+    :return: A tuple of the time and the number of days to add to the date.
+
+    """
+    days = 0
+    if in_[-2:] == "⁺¹":
+        in_ = in_[:-2]
+        days = 1
+    return (time_hm(in_.replace("A", "").replace("E", "")), days)
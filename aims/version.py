@@ -1,4 +1,3 @@
-from importlib.metadata import version
-
-
-VERSION = version("aims-convert")
+# setup.py reads the version from here, so that it is only given once, and
+# it isn't looked up in the installed metadata, which is slow to import
+VERSION = "2.2"
@@ -0,0 +1,228 @@
+"""Automatic conversion of reports as they appear in a directory.
+
+The directory is polled rather than monitored with an operating system
+service. A report is only converted once its size and modification time are
+unchanged between two polls, so that files that are still being downloaded
+are left alone. Each converted file is fingerprinted with a hash of its
+content, and the fingerprints are kept in a state file in the directory, so
+that a file is only converted again if its content changes, even if the
+watcher is restarted. Touching a file, or downloading the same report again
+under the same name, does not cause it to be reconverted.
+
+Conversions that fail are recorded in the same way, and are not retried
+until the file changes.
+
+"""
+import hashlib
+import json
+import os
+import os.path
+import sys
+import tempfile
+import time
+from typing import NamedTuple, Optional
+
+from aims.batch import Job, convert
+from aims.data_structures import InputFileException
+
+STATE_VERSION = 1
+STATE_FILE = ".aims-watch.json"
+DEFAULT_INTERVAL = 2.0  # seconds
+SUFFIXES = (".htm", ".html", ".htm.gz", ".html.gz", ".zip")
+
+Stat = tuple[int, int]  # size and modification time in nanoseconds
+Result = tuple[str, list[str], Optional[str]]
+
+
+class FileState(NamedTuple):
+    size: int
+    mtime_ns: int
+    digest: str  # hash of the file's content
+    outputs: list[str]
+    error: Optional[str]
+
+
+State = dict[str, FileState]
+
+
+def settings(job: Job) -> str:
+    """Describe the settings of a job that affect its output.
+
+    If these change, for example because another output format is
+    requested, every report is converted again.
+
+    """
+    from aims.version import VERSION
+    return json.dumps([VERSION, job.formats, job.output_dir, job.with_ade,
+                       job.tz])
+
+
+def digest(path: str) -> str:
+    """Hash the content of a file."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 16):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load(path: str, settings_: str) -> State:
+    """Load the fingerprints of the files already converted.
+
+    :param path: The path of a state file written by save. A missing file
+        is treated as having no converted files.
+    :param settings_: The settings of the current job. If they differ from
+        those saved, the saved state is discarded.
+    :return: The state of each file, keyed by file name.
+
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["version"] != STATE_VERSION:
+            raise ValueError(f"unsupported version {data['version']}")
+        if data["settings"] != settings_:
+            return {}
+        return {name: FileState(**X) for name, X in data["files"].items()}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise InputFileException(f"Bad watch state file {path}: {e}")
+
+
+def save(state: State, settings_: str, path: str) -> None:
+    """Save the fingerprints of the converted files.
+
+    The file is replaced atomically, so it is never left part written.
+
+    """
+    data = {"version": STATE_VERSION, "settings": settings_,
+            "files": {name: X._asdict() for name, X in state.items()}}
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+class Watcher:
+
+    def __init__(self, directory: str, job: Job,
+                 state_path: Optional[str] = None,
+                 jobs: int = 1) -> None:
+        self.directory = directory
+        self.job = job
+        self.jobs = jobs
+        self.state_path = state_path or os.path.join(directory, STATE_FILE)
+        self.settings = settings(job)
+        self.state = load(self.state_path, self.settings)
+        self.pending: dict[str, Stat] = {}
+
+    def scan(self) -> dict[str, Stat]:
+        """Find the reports in the directory.
+
+        Hidden files, and files without one of the SUFFIXES, such as the
+        partial files written by browsers during a download, are ignored.
+
+        :return: The size and modification time of each report, keyed by
+            file name.
+
+        """
+        found = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if (entry.name.startswith(".")
+                        or not entry.name.lower().endswith(SUFFIXES)):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except FileNotFoundError:  # removed since listed
+                    continue
+                found[entry.name] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def poll(self) -> list[Result]:
+        """Convert the reports that are new or have changed.
+
+        A report is converted once it is seen with the same size and
+        modification time on two consecutive polls.
+
+        :return: The results of the conversions, as for batch.convert.
+
+        """
+        found = self.scan()
+        ready = []
+        pending = {}
+        for name, stat in found.items():
+            known = self.state.get(name)
+            if known and (known.size, known.mtime_ns) == stat:
+                continue
+            if stat[0] and self.pending.get(name) == stat:
+                ready.append(name)
+            else:
+                pending[name] = stat
+        self.pending = pending
+        if not ready:
+            return []
+        to_convert: dict[str, tuple[Stat, str]] = {}
+        for name in ready:
+            path = os.path.join(self.directory, name)
+            try:
+                hash_ = digest(path)
+            except FileNotFoundError:
+                continue
+            known = self.state.get(name)
+            if known and known.digest == hash_:
+                # same content, so only the fingerprint needs updating
+                self.state[name] = known._replace(size=found[name][0],
+                                                  mtime_ns=found[name][1])
+            else:
+                to_convert[path] = (found[name], hash_)
+        results = list(convert(list(to_convert), self.job, self.jobs))
+        for path, written, error in results:
+            (size, mtime_ns), hash_ = to_convert[path]
+            self.state[os.path.basename(path)] = FileState(
+                size, mtime_ns, hash_, written, error)
+        save(self.state, self.settings, self.state_path)
+        return results
+
+
+def run(directory: str, job: Job, interval: float = DEFAULT_INTERVAL,
+        jobs: int = 1, state_path: Optional[str] = None) -> int:
+    """Watch a directory until interrupted, reporting on stdout and stderr.
+
+    :param directory: The directory to watch.
+    :param job: The conversion settings.
+    :param interval: The time between polls, in seconds.
+    :param jobs: The number of worker processes used when several reports
+        are ready at once.
+    :param state_path: The path of the state file. Defaults to STATE_FILE
+        in the watched directory.
+    :return: 0 when interrupted, or 1 if the directory can't be watched.
+
+    """
+    try:
+        if not os.path.isdir(directory):
+            raise InputFileException(f"{directory} is not a directory")
+        watcher = Watcher(directory, job, state_path, jobs)
+    except InputFileException as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Watching {directory}", file=sys.stderr)
+    try:
+        while True:
+            for path, written, error in watcher.poll():
+                if error:
+                    print(f"{path}: {error}", file=sys.stderr)
+                else:
+                    print(f"{path} -> {', '.join(written)}", flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,77 @@
+"""Measure crew name cleaning over a realistic crew distribution.
+
+Usage: python benchmarks/bench_clean_name.py [SECTORS]
+
+Each of SECTORS sectors (default 20000, roughly ten years of flying) has a
+crew of four or five drawn from the synthetic crew list, with a few
+colleagues flown with far more often than the rest. The names are cleaned
+by the original regular expression implementation, by the current
+implementation with its cache disabled and by the cached function.
+
+"""
+import random
+import re
+import sys
+import time
+
+import aims.enrich
+import synthetic
+
+
+def _original(name: str) -> str:
+    parts = [X.strip().capitalize() for X in name.split()]
+    for c, part in enumerate(parts):
+        if part[0] == "(":
+            parts[c] = ""
+            continue
+        if part.upper() in {"LR", "SR", "50%"}:
+            parts[c] = ""
+            continue
+        new = re.sub(r"\*+", "", part)
+        new = new.replace(",", "")
+        for char in ("-", "'"):
+            index = new.find(char)
+            if index not in {-1, len(new) - 1}:
+                index += 1
+                new = new[:index] + new[index:].capitalize()
+        index = new.find("Mc")
+        if index == 0 and len(new) > 2:
+            new = new[:2] + new[2:].capitalize()
+        parts[c] = new
+    return " ".join([X for X in parts if X])
+
+
+def _uncached(name: str) -> str:
+    return " ".join(X for X in map(aims.enrich._clean_part, name.split())
+                    if X)
+
+
+def _names(sectors: int) -> list[str]:
+    rng = random.Random(1)
+    crew = [X + rng.choice(("", "", "", "*", " (LR)", ", SR"))
+            for X in synthetic.CREW]
+    weights = [1 / (c + 1) for c in range(len(crew))]  # Zipf-like
+    return [name for _ in range(sectors)
+            for name in rng.choices(crew, weights, k=rng.choice((4, 5)))]
+
+
+def main() -> None:
+    sectors = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    names = _names(sectors)
+    aims.enrich.clean_name.cache_clear()
+    results = []
+    for label, func in (("original", _original),
+                        ("single pass, uncached", _uncached),
+                        ("cached", aims.enrich.clean_name)):
+        start = time.perf_counter()
+        result = list(map(func, names))
+        elapsed = time.perf_counter() - start
+        results.append(result)
+        print(f"{label:>22}: {elapsed * 1000:7.1f} ms")
+    assert all(X == results[0] for X in results)
+    info = aims.enrich.clean_name.cache_info()
+    print(f"{len(names)} names, {info.currsize} distinct")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Compare the HTML extraction engines on large synthetic reports.
+
+Usage: python benchmarks/bench_engines.py [DAYS]
+
+"""
+import sys
+import time
+
+import aims.roster
+import aims.logbook_report
+import synthetic
+
+
+def _time(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    html = synthetic.roster(days)
+    print(f"Roster: {days} days, {len(html) // 1024} KiB")
+    results = {}
+    for engine in aims.roster.ENGINES:
+        results[engine] = aims.roster.duties(html, engine)
+        print(f"  {engine:>8}: "
+              f"{_time(aims.roster.duties, html, engine):.3f}s")
+    assert results["stream"] == results["html5lib"]
+    html = synthetic.logbook(days)
+    print(f"Logbook: {days} days, {len(html) // 1024} KiB")
+    for engine in aims.logbook_report.ENGINES:
+        results[engine] = aims.logbook_report.duties(html, engine)
+        print(f"  {engine:>8}: "
+              f"{_time(aims.logbook_report.duties, html, engine):.3f}s")
+    assert results["stream"] == results["html5lib"]
+
+
+if __name__ == "__main__":
+    main()
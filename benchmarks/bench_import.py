@@ -0,0 +1,63 @@
+"""Measure the time spent importing modules for each subcommand.
+
+Usage: python benchmarks/bench_import.py
+
+Each subcommand is run on a synthetic roster under python -X importtime, and
+the best of several runs of the cumulative time of the top level imports is
+reported, excluding those made by the interpreter itself at startup. The
+checks that the expensive modules are not imported unnecessarily are in
+tests/test_import_time.py.
+
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+import synthetic
+
+
+COMMANDS = ("version", "roster", "ical", "efj", "csv")
+RUNS = 5
+
+SCRIPT = """\
+import sys, aims.cli
+sys.argv[0] = 'aims'
+aims.cli.main()
+"""
+
+
+def _times(*args: str) -> dict[str, int]:
+    # the cumulative times in microseconds of the top level imports made by
+    # python running args
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "[us]" not in line:
+            _, cumulative, name = line[12:].split("|")
+            if not name.startswith("   "):
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    startup = set(_times("-c", "pass"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "roster.htm")
+        with open(path, "w") as f:
+            f.write(synthetic.roster(7))
+        for command in COMMANDS:
+            args = ("-c", SCRIPT, command)
+            if command != "version":
+                args += ("-i", path)
+            best = min(sum(Y for X, Y in _times(*args).items()
+                           if X not in startup)
+                       for _ in range(RUNS))
+            print(f"{command:>8}: {best / 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure the memory saved by interning on a multi-year logbook.
+
+Usage: python benchmarks/bench_intern.py [DAYS]
+
+The size of the parse result is measured with tracemalloc, with and without
+the pools in aims.intern. The "without" figure is obtained by temporarily
+replacing the pool functions with functions that construct fresh objects.
+
+"""
+import gc
+import sys
+import tracemalloc
+
+import aims.intern
+import aims.logbook_report
+import aims.roster
+from aims.data_structures import CrewMember
+import synthetic
+
+
+def _retained(func, html: str) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = func(html)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def _without_interning(func, html: str) -> int:
+    saved = (aims.intern.string, aims.intern.crew_member, aims.intern.crew)
+    aims.intern.string = lambda X: X  # type: ignore
+    aims.intern.crew_member = CrewMember  # type: ignore
+    aims.intern.crew = lambda X: X  # type: ignore
+    try:
+        return _retained(func, html)
+    finally:
+        (aims.intern.string, aims.intern.crew_member,
+         aims.intern.crew) = saved
+
+
+def main() -> None:
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    for name, func, html in (
+            ("Logbook", aims.logbook_report.duties, synthetic.logbook(days)),
+            ("Roster", aims.roster.duties, synthetic.roster(days))):
+        without = _without_interning(func, html)
+        aims.intern.crew_member.cache_clear()
+        aims.intern.crew.cache_clear()
+        with_ = _retained(func, html)
+        print(f"{name}, {days} days:")
+        print(f"  without interning: {without / 1024:8.0f} KiB")
+        print(f"     with interning: {with_ / 1024:8.0f} KiB "
+              f"({100 * (without - with_) / without:.0f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Compare aims.night with calling nightflight directly.
+
+Usage: python benchmarks/bench_night.py [DAYS]
+
+The sectors are those of a synthetic logbook, DAYS days long (default 730).
+The aims.night figures are for a cold cache, as would be the case for a
+single conversion. If NumPy is installed, aims.night_batch is also measured,
+along with the largest difference from the nightflight results.
+
+"""
+import sys
+import time
+
+import nightflight.night as nightcalc  # type: ignore
+from nightflight.airport_nvecs import airfields  # type: ignore
+
+import aims.logbook_report as report
+import aims.night
+import synthetic
+
+
+def _nightflight(sectors) -> list:
+    return [(round(nightcalc.night_duration(airfields[X.from_],
+                                            airfields[X.to], X.off, X.on)),
+             nightcalc.night_p(airfields[X.to], X.on))
+            for X in sectors]
+
+
+def _aims(sectors) -> list:
+    aims.night.night.cache_clear()
+    aims.night._daylight.cache_clear()
+    return [aims.night.night(X.from_, X.to, X.off, X.on) for X in sectors]
+
+
+def main() -> None:
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 730
+    duties, _ = report.duties(synthetic.logbook(days))
+    sectors = [X for duty in duties for X in duty.sectors]
+    results = []
+    for name, func in (("nightflight", _nightflight), ("aims.night", _aims)):
+        start = time.perf_counter()
+        results.append(func(sectors))
+        print(f"{name:12} {len(sectors)} sectors: "
+              f"{time.perf_counter() - start:.2f}s")
+    assert results[0] == results[1]
+    try:
+        import aims.night_batch
+    except ImportError:
+        return
+    start = time.perf_counter()
+    batch = aims.night_batch.nights(sectors)
+    print(f"{'night_batch':12} {len(sectors)} sectors: "
+          f"{time.perf_counter() - start:.2f}s, max difference "
+          f"{max(abs(X[0] - Y[0]) for X, Y in zip(batch, results[0]))} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare aims.timeconv with datetime.strptime.
+
+Usage: python benchmarks/bench_timeconv.py
+
+The inputs are the date and time strings of a synthetic ten year logbook, so
+the memoised figures reflect the repetition found in a real report.
+
+"""
+import datetime as dt
+import timeit
+
+import aims.rows
+import aims.logbook_report as report
+import aims.timeconv as timeconv
+import synthetic
+
+
+def _strptime(dates: list[str], times: list[str]) -> list:
+    return ([dt.datetime.strptime(X, "%d/%m/%y").date() for X in dates]
+            + [dt.datetime.strptime(X, "%H:%M").time() for X in times])
+
+
+def _timeconv(dates: list[str], times: list[str]) -> list:
+    return ([timeconv.date_dmy_short(X) for X in dates]
+            + [timeconv.time_hm(X) for X in times])
+
+
+def _cold(dates: list[str], times: list[str]) -> list:
+    timeconv.date_dmy_short.cache_clear()
+    timeconv.time_hm.cache_clear()
+    return _timeconv(dates, times)
+
+
+def main() -> None:
+    rows = list(aims.rows.first_strings(
+        synthetic.logbook(3650), report.DATE, report._RE_DATE.match))
+    dates = [X[report.DATE] for X in rows]
+    times = [X[Y] for X in rows for Y in (report.OFF, report.ON)]
+    print(f"{len(dates)} dates ({len(set(dates))} unique), "
+          f"{len(times)} times ({len(set(times))} unique)")
+    assert _strptime(dates, times) == _timeconv(dates, times)
+    for name, func in (("strptime", _strptime),
+                       ("timeconv (cold cache)", _cold),
+                       ("timeconv (warm cache)", _timeconv)):
+        best = min(timeit.repeat(lambda: func(dates, times),
+                                 number=1, repeat=5))
+        print(f"  {name:>22}: {best * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Generators for large synthetic AIMS reports.
+
+Real reports can't be distributed, so the benchmarks use documents that
+mimic the structure of AIMS vertical rosters and Pilot Logbook reports.
+
+"""
+import datetime as dt
+import random
+
+AIRPORTS = ("BRS", "AGP", "LIS", "NCL", "BFS", "GVA", "AMS", "FAO", "ALC",
+            "PMI", "EDI", "GLA", "CDG", "BCN", "MAD", "FCO", "AYT", "PFO")
+CREW = tuple(f"{first} {last}" for first in (
+    "JOHN", "MARY", "ANNE", "PETER", "SARAH", "DAVID", "EMMA", "JAMES",
+    "LUCY", "MARK", "KATE", "PAUL", "AMY", "TOM", "RUTH", "IAN")
+             for last in ("SMITH", "JONES", "O'BRIEN", "MCDONALD",
+                          "SMITH-JONES", "TAYLOR", "BROWN", "WILSON",
+                          "EVANS", "THOMAS", "ROBERTS", "WALKER"))
+REGS = tuple(f"G-EZ{a}{b}" for a in "ABCDEFGH" for b in "ABCDEFGH")
+
+HEADER = ("<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+          "<title>{title}</title></head><body>\n<table>\n")
+FOOTER = "</table></body></html>\n"
+
+
+def _td(*strings: str) -> str:
+    return "<td>" + "<br>".join(strings) + "</td>"
+
+
+def _sectors(rng: random.Random, day: dt.datetime, count: int):
+    base = rng.choice(AIRPORTS[:3])
+    off = day + dt.timedelta(minutes=rng.randrange(300, 480, 5))
+    retval = []
+    for c in range(count):
+        from_ = base if c % 2 == 0 else retval[-1][1]
+        to = rng.choice(AIRPORTS[3:]) if c % 2 == 0 else base
+        on = off + dt.timedelta(minutes=rng.randrange(60, 150))
+        retval.append((from_, to, off, on, str(rng.randrange(1, 9999))))
+        off = on + dt.timedelta(minutes=rng.randrange(30, 45))
+    return retval
+
+
+def roster(days: int, seed: int = 1) -> str:
+    """Generate a vertical roster covering the given number of days."""
+    rng = random.Random(seed)
+    out = [HEADER.format(title="Personal&nbsp;Crew&nbsp;Schedule&nbsp;Report"),
+           "<tr><td>Personal&nbsp;Crew&nbsp;Schedule&nbsp;Report</td></tr>\n",
+           "<tr><td></td><td>Schedule&nbsp;Details</td></tr>\n",
+           "<tr><td></td><td>Date</td><td>Duty</td><td>Details</td>"
+           "<td>Report</td><td>Times</td><td>Debrief</td><td>Block</td>"
+           "<td>Duty</td><td>Ind</td><td>Crew</td><td></td></tr>\n"]
+    start = dt.datetime(2020, 1, 1)
+    for d in range(days):
+        day = start + dt.timedelta(d)
+        date = f"{day:%d/%m/%Y}&nbsp;{day:%a}"
+        kind = rng.random()
+        if kind < 0.3:
+            out.append(f"<tr><td></td>{_td(date)}{_td('D/O')}"
+                       f"{_td('Day off')}" + "<td></td>" * 8 + "</tr>\n")
+            continue
+        sectors = _sectors(rng, day, rng.choice((2, 4)))
+        report = sectors[0][2] - dt.timedelta(hours=1)
+        debrief = sectors[-1][3] + dt.timedelta(minutes=30)
+        crew = [f"CP - {rng.randrange(9999):04d} - {rng.choice(CREW)}",
+                f"FO - {rng.randrange(9999):04d} - {rng.choice(CREW)}"]
+        crew += [f"{role} - {rng.randrange(9999):04d} - {rng.choice(CREW)}"
+                 for role in ("PU", "FA", "FA")]
+        out.append(
+            "<tr><td></td>" + _td(date)
+            + _td(*(f"{X[4]}&nbsp;[320]" for X in sectors))
+            + _td(*(f"{X[0]}&nbsp; - {X[1]}" for X in sectors))
+            + _td(f"{report:%H:%M}")
+            + _td(*(f"A{X[2]:%H:%M} - A{X[3]:%H:%M}" for X in sectors))
+            + _td(f"{debrief:%H:%M}") + _td("05:00") + _td("08:00")
+            + "<td></td>" + _td(*crew) + "<td></td></tr>\n")
+    out.append("<tr><td></td><td></td></tr>\n")
+    out.append(FOOTER)
+    return "".join(out)
+
+
+def logbook(days: int, seed: int = 1) -> str:
+    """Generate a Pilot Logbook report covering the given number of days."""
+    rng = random.Random(seed)
+    out = [HEADER.format(title="Pilot&nbsp;Logbook"),
+           "<tr><td>Pilot&nbsp;Logbook</td></tr>\n",
+           "<tr><td></td><td>Date</td><td>Flight</td><td>From</td>"
+           "<td>Off</td><td>To</td><td>On</td><td>Type</td><td>Reg</td>"
+           "<td>Block</td><td>Captain</td>" + "<td></td>" * 9 + "</tr>\n"]
+    start = dt.datetime(2014, 1, 1)
+    for d in range(days):
+        day = start + dt.timedelta(d)
+        if rng.random() < 0.4:
+            continue
+        reg = rng.choice(REGS)
+        captain = rng.choice(CREW)
+        for from_, to, off, on, flight in _sectors(rng, day, 2):
+            block = int((on - off).total_seconds()) // 60
+            out.append(
+                "<tr><td></td>"
+                + _td(f"{off:%d/%m/%y}") + _td(flight) + _td(from_)
+                + _td(f"{off:%H:%M}") + _td(to) + _td(f"{on:%H:%M}")
+                + _td("320") + _td(reg)
+                + _td(f"{block // 60:02d}:{block % 60:02d}")
+                + _td(captain) + "<td>&nbsp;</td>" * 9 + "</tr>\n")
+    out.append(FOOTER)
+    return "".join(out)
@@ -3,9 +3,13 @@ import setuptools
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+about: dict = {}
+with open("aims/version.py", "r") as fh:
+    exec(fh.read(), about)
+
 setuptools.setup(
     name="aims-convert",
-    version="2.2",
+    version=about["VERSION"],
     author="Jon Hurst",
     author_email="jon.a@hursts.org.uk",
     description="Extract useful information from AIMS",
@@ -35,6 +39,7 @@ setuptools.setup(
         "gui_scripts" : ["aimsgui = aims.gui:main"]
     },
     extras_require={
-        "unit_tests": ["freezegun"]
+        "unit_tests": ["freezegun"],
+        "numpy": ["numpy"]
     },
 )
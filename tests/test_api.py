@@ -0,0 +1,45 @@
+import unittest
+import tempfile
+
+import aims.api
+from aims.output import roster, efj, ical
+from test_roster import roster_html, roster_html_result
+
+
+class TestConvert(unittest.TestCase):
+
+    def request(self, format_, options=()):
+        return {"roster": roster_html, "format": format_,
+                "options": list(options)}
+
+    def test_formats(self):
+        duties, ade = roster_html_result
+        self.assertEqual(aims.api.convert(self.request("efj")), efj(duties))
+        self.assertEqual(aims.api.convert(self.request("roster", ["tz=UTC"])),
+                         roster(duties, "UTC"))
+        self.assertEqual(
+            aims.api.convert(self.request("ical", ["ade"])).count("VEVENT"),
+            ical(duties, ade).count("VEVENT"))
+        self.assertEqual(aims.api.convert(self.request("pdf")),
+                         "Not implemented")
+
+    def test_errors(self):
+        self.assertEqual(
+            aims.api.convert({"roster": "Not a roster", "format": "efj",
+                              "options": []}),
+            "HTML5 header not found.")
+        self.assertEqual(
+            aims.api.convert(self.request("roster", ["tz=Europe/Nowhere"])),
+            "Unknown time zone: Europe/Nowhere")
+        with self.assertRaises(KeyError):
+            aims.api.convert({"roster": roster_html})
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            request = self.request("efj", ["cache"])
+            self.assertEqual(aims.api.convert(request, cache_dir),
+                             aims.api.convert(request, cache_dir))
+
+    def test_option(self):
+        self.assertEqual(aims.api.option(["ade", "tz=UTC"], "tz", "x"), "UTC")
+        self.assertEqual(aims.api.option(["tz"], "tz", "x"), "x")
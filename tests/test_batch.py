@@ -0,0 +1,93 @@
+import unittest
+import gzip
+import os
+import tempfile
+
+import aims.batch as batch
+import aims.output
+from test_roster import roster_html, roster_html_result
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        for name, text in (("a.htm", roster_html), ("b.htm", roster_html),
+                           ("bad.htm", "Not a roster")):
+            with open(os.path.join(self.dir, name), "w") as f:
+                f.write(text)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_expand(self):
+        paths = batch.expand([os.path.join(self.dir, "b.htm"),
+                              os.path.join(self.dir, "*.htm"),
+                              "missing.htm"])
+        self.assertEqual(
+            paths,
+            [os.path.join(self.dir, X)
+             for X in ("b.htm", "a.htm", "bad.htm")] + ["missing.htm"])
+
+    def test_convert(self):
+        outdir = os.path.join(self.dir, "out")
+        job = batch.Job(("roster", "efj"), outdir)
+        paths = [os.path.join(self.dir, X)
+                 for X in ("a.htm", "bad.htm", "missing.htm", "b.htm")]
+        for jobs in (1, 2):
+            results = list(batch.convert(paths, job, jobs))
+            self.assertEqual([X[0] for X in results], paths)
+            self.assertEqual([bool(X[2]) for X in results],
+                             [False, True, True, False])
+            self.assertIn("InputFileException", results[1][2])
+            self.assertEqual(
+                results[0][1],
+                [os.path.join(outdir, X) for X in ("a.txt", "a.efj")])
+            with open(os.path.join(outdir, "b.efj")) as f:
+                self.assertEqual(
+                    f.read(), aims.output.efj(roster_html_result[0]) + "\n")
+
+    def test_same_output(self):
+        # r.htm and r.htm.gz would both write out/r.efj
+        path = os.path.join(self.dir, "a.htm")
+        gz_path = path + ".gz"
+        with gzip.open(gz_path, "wt") as f:
+            f.write(roster_html)
+        outdir = os.path.join(self.dir, "out")
+        job = batch.Job(("efj", ), outdir)
+        for jobs in (1, 2):
+            results = list(batch.convert([path, gz_path, path], job, jobs))
+            self.assertEqual([X[0] for X in results], [path, gz_path, path])
+            self.assertEqual(results[0],
+                             (path, [os.path.join(outdir, "a.efj")], None))
+            for result in results[1:]:
+                self.assertEqual(result[1], [])
+                self.assertIn("a.efj is also the output of", result[2])
+
+    def test_alongside(self):
+        job = batch.Job(("csv", ))
+        path = os.path.join(self.dir, "a.htm")
+        self.assertEqual(job(path),
+                         (path, [os.path.join(self.dir, "a.csv")], None))
+
+    def test_write(self):
+        duties, ade = roster_html_result
+        paths = {X: os.path.join(self.dir, "new", "r" + batch.EXTENSIONS[X])
+                 for X in aims.output.FORMATS}
+        self.assertEqual(batch.write(duties, ade, paths), list(paths.values()))
+        for format_, path in paths.items():
+            if format_ == "ical":  # contains timestamps
+                continue
+            with open(path, newline="") as f:
+                self.assertEqual(
+                    f.read(), aims.output.render(format_, duties) + "\n")
+
+    def test_tz(self):
+        job = batch.Job(("roster", ), tz="UTC")
+        path = os.path.join(self.dir, "a.htm")
+        job(path)
+        with open(os.path.join(self.dir, "a.txt")) as f:
+            self.assertEqual(
+                f.read(),
+                aims.output.roster(roster_html_result[0], "UTC") + "\n")
@@ -0,0 +1,65 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+
+from aims.cache import ParseCache, SUFFIX
+from aims.parse import parse
+from test_roster import roster_html, roster_html_result
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _entries(self):
+        return sorted(X for X in os.listdir(self.tmpdir.name)
+                      if X.endswith(SUFFIX))
+
+    def test_roundtrip(self):
+        key = self.cache.key(roster_html)
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(parse(roster_html, self.cache), roster_html_result)
+        self.assertEqual(self._entries(), [key + SUFFIX])
+        self.assertEqual(self.cache.get(key), roster_html_result)
+        self.assertEqual(parse(roster_html, self.cache), roster_html_result)
+
+    def test_key(self):
+        self.assertEqual(self.cache.key("a"), self.cache.key("a"))
+        self.assertNotEqual(self.cache.key("a"), self.cache.key("b"))
+
+    def test_corrupt(self):
+        key = self.cache.key(roster_html)
+        with open(os.path.join(self.tmpdir.name, key + SUFFIX), "wb") as f:
+            f.write(b"garbage")
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self._entries(), [])
+
+    def test_write_failure(self):
+        with mock.patch("os.replace",
+                        side_effect=OSError(28, "No space left on device")):
+            self.cache.put(self.cache.key("a"), roster_html_result)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_evict(self):
+        keys = [self.cache.key(str(X)) for X in range(3)]
+        for c, key in enumerate(keys):
+            self.cache.put(key, roster_html_result)
+            os.utime(os.path.join(self.tmpdir.name, key + SUFFIX), (c, c))
+        size = os.path.getsize(
+            os.path.join(self.tmpdir.name, keys[0] + SUFFIX))
+        self.cache.get(keys[0])  # most recently used
+        self.cache.max_bytes = size * 2
+        self.cache.evict()
+        self.assertEqual(self._entries(),
+                         sorted(X + SUFFIX for X in (keys[0], keys[2])))
+
+    def test_clear(self):
+        self.cache.put(self.cache.key("a"), roster_html_result)
+        self.cache.clear()
+        self.assertEqual(self._entries(), [])
@@ -0,0 +1,130 @@
+import unittest
+import random
+import re
+from unittest import mock
+
+import aims.enrich
+import aims.night
+from aims.enrich import enrich, EnrichedDuty, clean_name
+from aims.data_structures import CrewMember
+from aims.output import efj, csv, roster
+from test_output import standard_duty, standby_before_flight, loe_day3
+
+
+class TestEnrich(unittest.TestCase):
+
+    def test_sectors(self):
+        ed, = enrich((standard_duty, ))
+        self.assertEqual(ed.duty, standard_duty)
+        self.assertTrue(ed.night)
+        es = ed.sectors[0]
+        self.assertEqual(es.sector, standard_duty.sectors[0])
+        self.assertEqual(es.duration, 156)
+        self.assertEqual((es.night, es.night_landing), (0, False))
+        self.assertEqual(es.crew[:2], (CrewMember("Captain The", "CP"),
+                                       CrewMember("Fo The", "FO")))
+        self.assertEqual(es.captains, ("Captain The", ))
+
+    def test_route(self):
+        ed, = enrich((standby_before_flight, ), night=False)
+        self.assertEqual(ed.route, "BRS-[LSBY]-BRS-[ADTY]-BRS-BFS-BRS")
+        self.assertFalse(ed.night)
+        ed, = enrich((loe_day3, ), night=False)
+        self.assertEqual(ed.route, "LGW-[FFST]-LGW-[psn]-BRS")
+
+    def test_quasi_sectors(self):
+        ed, = enrich((standby_before_flight, ))
+        self.assertEqual([(X.night, X.night_landing) for X in ed.sectors],
+                         [(0, False)] * 4)
+
+    def test_passthrough(self):
+        enriched = tuple(enrich((standard_duty, )))
+        with mock.patch.object(aims.enrich, "_duty") as duty:
+            self.assertEqual(tuple(enrich(enriched)), enriched)
+            self.assertEqual(tuple(enrich(enriched, night=False)), enriched)
+            duty.assert_not_called()
+
+    def test_adds_night(self):
+        ed, = enrich((standard_duty, ), night=False)
+        self.assertIsInstance(ed, EnrichedDuty)
+        ed, = enrich((ed, ))
+        self.assertTrue(ed.night)
+
+    def test_jobs(self):
+        duties = (standard_duty, standby_before_flight) * 10
+        self.assertEqual(tuple(enrich(duties, jobs=2)),
+                         tuple(enrich(duties)))
+
+    def test_night_engine(self):
+        with mock.patch.object(
+                aims.night, "nights",
+                side_effect=lambda X, jobs, engine: [(7, True)] * len(X)
+        ) as nights:
+            ed, = enrich((standard_duty, ), night_engine="numpy")
+        self.assertEqual(nights.call_args.args[1:], (1, "numpy"))
+        self.assertEqual([(X.night, X.night_landing) for X in ed.sectors],
+                         [(7, True)] * len(ed.sectors))
+
+    def test_renderers(self):
+        duties = (standard_duty, standby_before_flight, loe_day3)
+        expected = (efj(duties), csv(duties), roster(duties))
+        enriched = tuple(enrich(duties))
+        with mock.patch.object(aims.night, "night") as night:
+            self.assertEqual(
+                (efj(enriched), csv(enriched), roster(enriched)), expected)
+            night.assert_not_called()
+
+
+def _reference_clean_name(name):
+    # the original, uncached implementation
+    parts = [X.strip().capitalize() for X in name.split()]
+    for c, part in enumerate(parts):
+        if part[0] == "(":
+            parts[c] = ""
+            continue
+        if part.upper() in {"LR", "SR", "50%"}:
+            parts[c] = ""
+            continue
+        new = re.sub(r"\*+", "", part)
+        new = new.replace(",", "")
+        for char in ("-", "'"):
+            index = new.find(char)
+            if index not in {-1, len(new) - 1}:
+                index += 1
+                new = new[:index] + new[index:].capitalize()
+        index = new.find("Mc")
+        if index == 0 and len(new) > 2:
+            new = new[:2] + new[2:].capitalize()
+        parts[c] = new
+    return " ".join([X for X in parts if X])
+
+
+class TestCleanName(unittest.TestCase):
+
+    def test_examples(self):
+        for name, expected in (
+                ("SMITH JOHN", "Smith John"),
+                ("O'BRIEN-SMITH MARY", "O'Brien-smith Mary"),
+                ("SMITH-O'BRIEN MARY", "Smith-O'Brien Mary"),
+                ("MCDONALD  PETER", "McDonald Peter"),
+                ("JONES, ANNE** (LR) SR 50%", "Jones Anne"),
+                ("*MC", "mc"),
+                ("  ", "")):
+            with self.subTest(name=name):
+                self.assertEqual(clean_name(name), expected)
+
+    def test_equivalence(self):
+        rng = random.Random(1)
+        alphabet = "abcMCLRS50%*,-'( \tßé"
+        for _ in range(5000):
+            name = "".join(rng.choice(alphabet)
+                           for _ in range(rng.randrange(12)))
+            with self.subTest(name=name):
+                self.assertEqual(clean_name(name),
+                                 _reference_clean_name(name))
+
+    def test_cached(self):
+        clean_name.cache_clear()
+        clean_name("SMITH JOHN")
+        clean_name("SMITH JOHN")
+        self.assertEqual(clean_name.cache_info().hits, 1)
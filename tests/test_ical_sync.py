@@ -0,0 +1,126 @@
+import unittest
+import datetime
+import os
+import tempfile
+from freezegun import freeze_time
+
+import aims.ical_sync as ical_sync
+from aims.data_structures import AllDayEvent, InputFileException
+from aims.output import ical
+from test_output import standard_duty, standby_duty, standby_before_flight
+
+
+ade = (AllDayEvent(datetime.date(2024, 1, 2), "P/T"), )
+uids = ("2023-06-02T05:00:00BRSLISBRSNCLBRS@HURSTS.ORG.UK",
+        "2023-07-02T11:45:00BRS[LSBY]BRS[ADTY]BRSBFSBRS@HURSTS.ORG.UK",
+        "2024-01-02P/T@HURSTS.ORG.UK")
+
+
+def _events(calendar):
+    return calendar.split("BEGIN:VEVENT\r\n")[1:]
+
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        with freeze_time("2024-01-01"):
+            self.text, self.state = ical_sync.sync(
+                (standard_duty, standby_before_flight), ade, {})
+
+    def test_initial(self):
+        self.assertEqual(tuple(self.state), uids)
+        self.assertEqual(len(_events(self.text)), 3)
+        self.assertIn("SEQUENCE:0\r\n", self.text)
+        self.assertTrue(self.text.endswith(
+            "END:VEVENT\r\nEND:VCALENDAR\r\n"))
+
+    def test_unchanged(self):
+        with freeze_time("2024-01-05"):
+            text, state = ical_sync.sync(
+                (standard_duty, standby_before_flight), ade, self.state)
+        # a calendar must have at least one component, so there is none
+        self.assertEqual(text, "")
+        self.assertEqual(state, self.state)
+
+    def test_changed(self):
+        changed = standard_duty._replace(
+            finish=datetime.datetime(2023, 6, 2, 16, 30))
+        with freeze_time("2024-01-05"):
+            text, state = ical_sync.sync(
+                (changed, standby_before_flight), ade, self.state)
+        event, = _events(text)
+        self.assertIn(f"UID:{uids[0]}\r\n", event)
+        self.assertIn("DTEND:20230602T163000Z\r\n", event)
+        self.assertIn("SEQUENCE:1\r\n", event)
+        self.assertIn("LAST-MODIFIED:20240105T000000Z\r\n", event)
+        self.assertEqual(state[uids[1]], self.state[uids[1]])
+
+    def test_removed(self):
+        with freeze_time("2024-01-05"):
+            text, state = ical_sync.sync((standard_duty, ), ade, self.state)
+        event, = _events(text)
+        self.assertIn(f"UID:{uids[1]}\r\n", event)
+        self.assertIn("STATUS:CANCELLED\r\n", event)
+        self.assertIn("SEQUENCE:1\r\n", event)
+        # not cancelled again
+        text, state = ical_sync.sync((standard_duty, ), ade, state)
+        self.assertEqual(_events(text), [])
+
+    def test_out_of_period(self):
+        # events before the start of the new report are not cancelled
+        text, state = ical_sync.sync((standby_before_flight, ), (),
+                                     self.state)
+        event, = _events(text)
+        self.assertIn(f"UID:{uids[2]}\r\n", event)
+        self.assertIn("STATUS:CANCELLED\r\n", event)
+        self.assertEqual(state[uids[0]], self.state[uids[0]])
+
+    def test_full(self):
+        with freeze_time("2024-01-05"):
+            text, _ = ical_sync.sync(
+                (standard_duty, standby_duty), (), self.state, full=True)
+        events = _events(text)
+        self.assertEqual(len(events), 4)
+        self.assertIn("LAST-MODIFIED:20240101T000000Z", events[0])
+
+    def test_from_ical(self):
+        with freeze_time("2024-01-01"):
+            previous = ical((standard_duty, standby_before_flight), ade)
+        state = ical_sync.state_from_ical(previous)
+        self.assertEqual(tuple(state), uids)
+        self.assertEqual({X: Y.digest for X, Y in state.items()},
+                         {X: Y.digest for X, Y in self.state.items()})
+        text, _ = ical_sync.sync(
+            (standard_duty, standby_before_flight), ade, state)
+        self.assertEqual(_events(text), [])
+
+
+class TestState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "state.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        _, state = ical_sync.sync((standard_duty, ), ade, {})
+        ical_sync.save(state, self.path)
+        self.assertEqual(ical_sync.load(self.path), state)
+
+    def test_ical_file(self):
+        text = ical((standard_duty, ), ade)
+        with open(self.path, "w", newline="") as f:
+            f.write(text + "\n")
+        self.assertEqual(ical_sync.load(self.path),
+                         ical_sync.state_from_ical(text))
+
+    def test_missing(self):
+        self.assertEqual(ical_sync.load(self.path), {})
+
+    def test_bad(self):
+        with open(self.path, "w") as f:
+            f.write("{}")
+        with self.assertRaises(InputFileException):
+            ical_sync.load(self.path)
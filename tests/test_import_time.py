@@ -0,0 +1,85 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+
+from test_roster import roster_html
+
+# Modules that each subcommand must not import. Timings vary too much from
+# machine to machine to be tested; benchmarks/bench_import.py measures them.
+ALWAYS_ABSENT = ("bs4", "html5lib", "concurrent.futures", "gzip", "json",
+                 "pickle", "aims.batch", "aims.ical_sync",
+                 "aims.watch", "aims.serve")
+NIGHT = ("aims.night", "nightflight", "astral")
+ABSENT = {
+    "version": ALWAYS_ABSENT + NIGHT + (
+        "zoneinfo", "importlib.metadata", "aims.roster", "aims.parse",
+        "aims.output", "aims.cache", "aims.source", "aims.localtime"),
+    "roster": ALWAYS_ABSENT + NIGHT + ("importlib.metadata", ),
+    "ical": ALWAYS_ABSENT + NIGHT + ("importlib.metadata", "zoneinfo"),
+    "efj": ALWAYS_ABSENT + ("importlib.metadata", ),
+    "csv": ALWAYS_ABSENT + ("importlib.metadata", ),
+}
+
+SCRIPT = """\
+import sys, aims.cli
+sys.argv[0] = 'aims'
+aims.cli.main()
+print('modules:', ' '.join(sys.modules), file=sys.stderr)
+"""
+
+
+def _run(*args: str) -> set[str]:
+    # the modules imported
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, *args],
+        stdin=subprocess.DEVNULL, capture_output=True, text=True,
+        check=True)
+    for line in result.stderr.splitlines():
+        if line.startswith("modules:"):
+            return set(line.split()[1:])
+    return set()
+
+
+class TestImportTime(unittest.TestCase):
+
+    # set by setUpClass
+    tmpdir: tempfile.TemporaryDirectory
+    path: str
+    startup: set[str]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmpdir.name, "roster.htm")
+        with open(cls.path, "w") as f:
+            f.write(roster_html)
+        # modules imported by the interpreter itself at startup
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "pass"],
+            capture_output=True, text=True, check=True)
+        cls.startup = {X[12:].split("|")[2].strip()
+                       for X in result.stderr.splitlines()
+                       if X.startswith("import time:") and "[us]" not in X}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def _args(self, command: str) -> tuple[str, ...]:
+        if command == "version":
+            return (command, )
+        return (command, "-i", self.path)
+
+    def test_absent(self):
+        for command, absent in ABSENT.items():
+            with self.subTest(command=command):
+                modules = _run(*self._args(command))
+                self.assertEqual(
+                    modules.intersection(absent) - self.startup, set())
+
+    def test_night_present(self):
+        # make sure that the absence checks can fail
+        modules = _run(*self._args("efj"))
+        self.assertIn("nightflight", modules)
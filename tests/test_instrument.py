@@ -0,0 +1,102 @@
+import unittest
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+
+import aims.instrument as instrument
+import aims.output
+from aims.parse import parse_stream, split
+from test_roster import roster_html, roster_html_result
+
+
+def duties():
+    return split(parse_stream(roster_html))[0]
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.samples = []
+        instrument.add_hook(self.samples.append)
+
+    def tearDown(self):
+        if self.samples.append in instrument._hooks:
+            instrument.remove_hook(self.samples.append)
+
+    def test_disabled(self):
+        instrument.remove_hook(self.samples.append)
+        it = iter([1, 2])
+        self.assertIs(instrument.iterate("x", it), it)
+        with instrument.stage("x"):
+            pass
+        self.assertEqual(self.samples, [])
+
+    def test_nested(self):
+        with instrument.stage("outer"):
+            with instrument.stage("inner"):
+                time.sleep(0.05)
+        inner, outer = self.samples
+        self.assertEqual((inner.stage, outer.stage), ("inner", "outer"))
+        self.assertGreaterEqual(inner.wall, 0.05)
+        self.assertLess(outer.wall, 0.04)
+
+    def test_iterate(self):
+        def slow():
+            for X in range(3):
+                time.sleep(0.01)
+                yield X
+        with instrument.stage("consumer"):
+            self.assertEqual(list(instrument.iterate("producer", slow())),
+                             [0, 1, 2])
+        self.assertEqual([X.stage for X in self.samples],
+                         ["producer"] * 4 + ["consumer"])
+        self.assertGreaterEqual(sum(X.wall for X in self.samples[:4]), 0.03)
+        self.assertLess(self.samples[-1].wall, 0.02)
+
+
+class TestCollect(unittest.TestCase):
+
+    def test_conversion(self):
+        with instrument.collect() as timings:
+            result = aims.output.render("efj", duties())
+        self.assertEqual(result, aims.output.efj(roster_html_result[0]))
+        self.assertEqual(instrument._hooks, [])
+        self.assertEqual(set(timings.totals),
+                         {"read", "parse", "convert", "enrich", "night",
+                          "render"})
+        self.assertIsNone(timings.peak)
+        summary = timings.summary()
+        for name in ("night", "other", "total"):
+            self.assertIn(name, summary)
+        self.assertNotIn("alloc", summary)
+
+    def test_allocations(self):
+        with instrument.collect(allocations=True) as timings:
+            aims.output.render("csv", duties())
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(timings.peak, 0)
+        self.assertGreater(timings.totals["convert"][3], 0)
+        self.assertIn("alloc KiB", timings.summary())
+
+
+class TestProfile(unittest.TestCase):
+
+    def test_profile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "aims.prof")
+            with instrument.profile(path):
+                aims.output.render("roster", duties())
+                end = time.perf_counter() + 0.05
+                while time.perf_counter() < end:
+                    pass
+            stats = pstats.Stats(path)
+            self.assertTrue(any(X[2] == "render" for X in stats.stats))
+            with open(path + ".folded") as f:
+                lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any("test_profile" in X for X in lines))
@@ -0,0 +1,28 @@
+import unittest
+
+import aims.intern as intern
+import aims.logbook_report as report
+from aims.data_structures import CrewMember
+from test_logbook import logbook_html
+
+
+class TestIntern(unittest.TestCase):
+
+    def test_string(self):
+        a = "".join(["B", "R", "S"])
+        b = "".join(["B", "R", "S"])
+        self.assertIsNot(a, b)
+        self.assertIs(intern.string(a), intern.string(b))
+
+    def test_crew(self):
+        a = intern.crew_member("".join(["A", "B"]), "CP")
+        b = intern.crew_member("".join(["A", "B"]), "CP")
+        self.assertIs(a, b)
+        self.assertEqual(a, CrewMember("AB", "CP"))
+        self.assertIs(intern.crew((a, )), intern.crew((b, )))
+
+    def test_shared(self):
+        duties, _ = report.duties(logbook_html)
+        first, second = duties[0].sectors[0], duties[1].sectors[0]
+        self.assertIs(first.crew, second.crew)
+        self.assertIs(first.from_, second.to)
@@ -0,0 +1,45 @@
+import unittest
+import datetime
+import random
+from zoneinfo import ZoneInfo
+
+from aims.localtime import local, table, zone
+
+
+class TestLocal(unittest.TestCase):
+
+    def test_table(self):
+        self.assertEqual(
+            table("Europe/London", 2023),
+            ((datetime.datetime(2023, 1, 1), datetime.datetime(2023, 3, 26, 1),
+              datetime.datetime(2023, 10, 29, 1)),
+             (datetime.timedelta(0), datetime.timedelta(hours=1),
+              datetime.timedelta(0))))
+        self.assertEqual(table("UTC", 2023),
+                         ((datetime.datetime(2023, 1, 1), ),
+                          (datetime.timedelta(0), )))
+
+    def test_transition(self):
+        self.assertEqual(local(datetime.datetime(2023, 3, 26, 0, 59)),
+                         datetime.datetime(2023, 3, 26, 0, 59))
+        self.assertEqual(local(datetime.datetime(2023, 3, 26, 1, 0)),
+                         datetime.datetime(2023, 3, 26, 2, 0))
+
+    def test_zoneinfo(self):
+        rng = random.Random(1)
+        for name in ("Europe/London", "America/St_Johns", "Asia/Kolkata",
+                     "Australia/Lord_Howe", "Pacific/Apia"):
+            tz = ZoneInfo(name)
+            for _ in range(2000):
+                time = datetime.datetime(2000, 1, 1) + datetime.timedelta(
+                    minutes=rng.randrange(60 * 24 * 365 * 30))
+                with self.subTest(name=name, time=time):
+                    self.assertEqual(
+                        local(time, name),
+                        time.replace(tzinfo=datetime.timezone.utc)
+                        .astimezone(tz).replace(tzinfo=None))
+
+    def test_unknown(self):
+        for name in ("Europe/Nowhere", "../etc", ""):
+            with self.assertRaises(ValueError):
+                zone(name)
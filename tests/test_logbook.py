@@ -5,6 +5,29 @@ import aims.logbook_report as report
 from aims.data_structures import Duty, Sector, CrewMember
 
 
+logbook_html = """\
+<!DOCTYPE html><html><head><title>Pilot&nbsp;Logbook</title></head><body>
+<table>
+<tr><td>Pilot&nbsp;Logbook</td></tr>
+<tr><td></td><td>Date</td><td>Flight</td><td>From</td><td>Off</td>
+<td>To</td><td>On</td><td>Type</td><td>Reg</td><td>Block</td><td>CP</td>
+</tr>
+<tr><td></td><td>23/07/22</td><td>6053</td><td>BRS</td><td>11:44</td>
+<td>AGP</td><td>14:07</td><td>320</td><td>G-EZRY</td><td>02:23</td>
+<td>CAPTAIN&nbsp;THE<br>X</td><td>&nbsp;</td></tr>
+<tr><td></td><td>23/07/22</td><td></td><td>LGW</td><td>15:00</td>
+<td>LGW</td><td>19:00</td><td>SIM</td><td></td><td>04:00</td>
+<td>CAPTAIN&nbsp;THE</td><td>&nbsp;</td></tr>
+<tr><td></td><td>Total</td><td>6053</td><td>BRS</td><td>11:44</td>
+<td>AGP</td><td>14:07</td><td>320</td><td>G-EZRY</td><td>02:23</td>
+<td>CAPTAIN&nbsp;THE</td><td>&nbsp;</td></tr>
+<tr><td></td><td>28/07/22</td><td>6304</td><td>AYT</td><td>21:28</td>
+<td>BRS</td><td>01:55</td><td>321</td><td>G-UZMJ</td><td>04:27</td>
+<td>CAPTAIN&nbsp;THE</td><td>&nbsp;</td></tr>
+</table></body></html>
+"""
+
+
 class TestDuty(unittest.TestCase):
 
     def test_standard(self):
@@ -75,3 +98,33 @@ class TestSector(unittest.TestCase):
                           quasi=False, position=False,
                           crew=(CrewMember("CAPTAIN THE", "CP"), ))
         self.assertEqual(report._sector(src), expected)
+
+
+class TestDuties(unittest.TestCase):
+
+    def test_engines(self):
+        crew = (CrewMember("CAPTAIN THE", "CP"), )
+        expected = (
+            (Duty(start=datetime.datetime(2022, 7, 23, 10, 44),
+                  finish=datetime.datetime(2022, 7, 23, 14, 37),
+                  sectors=(
+                      Sector(name='6053', reg='G-EZRY', type_='320',
+                             from_='BRS', to='AGP',
+                             off=datetime.datetime(2022, 7, 23, 11, 44),
+                             on=datetime.datetime(2022, 7, 23, 14, 7),
+                             quasi=False, position=False, crew=crew), )),
+             Duty(start=datetime.datetime(2022, 7, 28, 20, 28),
+                  finish=datetime.datetime(2022, 7, 29, 2, 25),
+                  sectors=(
+                      Sector(name='6304', reg='G-UZMJ', type_='321',
+                             from_='AYT', to='BRS',
+                             off=datetime.datetime(2022, 7, 28, 21, 28),
+                             on=datetime.datetime(2022, 7, 29, 1, 55),
+                             quasi=False, position=False, crew=crew), ))),
+            ())
+        for engine in report.ENGINES:
+            self.assertEqual(report.duties(logbook_html, engine), expected)
+
+    def test_bad_engine(self):
+        with self.assertRaises(ValueError):
+            report.duties(logbook_html, "nonexistent")
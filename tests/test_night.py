@@ -0,0 +1,96 @@
+import unittest
+import datetime as dt
+import random
+
+import nightflight.night as nightcalc  # type: ignore
+from nightflight.airport_nvecs import airfields  # type: ignore
+
+import aims.night
+from aims.night import night, nights
+from aims.data_structures import Sector
+
+
+def _nightflight(from_, to, off, on):
+    return (round(nightcalc.night_duration(airfields[from_], airfields[to],
+                                           off, on)),
+            nightcalc.night_p(airfields[to], on))
+
+
+class TestNight(unittest.TestCase):
+
+    def test_unknown_airport(self):
+        self.assertEqual(
+            night("BRS", "XXXX", dt.datetime(2023, 1, 1, 10),
+                  dt.datetime(2023, 1, 1, 12)),
+            (0, False))
+        self.assertEqual(
+            night(None, "BRS", dt.datetime(2023, 1, 1, 10),
+                  dt.datetime(2023, 1, 1, 12)),
+            (0, False))
+
+    def test_day(self):
+        self.assertEqual(
+            night("BRS", "ALC", dt.datetime(2023, 6, 1, 10),
+                  dt.datetime(2023, 6, 1, 12, 20)),
+            (0, False))
+
+    def test_night(self):
+        self.assertEqual(
+            night("BRS", "ALC", dt.datetime(2023, 1, 1, 1),
+                  dt.datetime(2023, 1, 1, 3, 20)),
+            (140, True))
+
+    def test_bad_times(self):
+        with self.assertRaises(ValueError):
+            night("BRS", "ALC", dt.datetime(2023, 6, 1, 12),
+                  dt.datetime(2023, 6, 1, 12))
+
+    def test_equivalence(self):
+        airports = ("BRS", "ALC", "EDI", "TOS", "KEF", "FNC", "SSH", "JFK",
+                    "LAX", "SYD", "NRT", "GIG", "LYR", "CPT")
+        rng = random.Random(0)
+        for _ in range(500):
+            from_, to = rng.sample(airports, 2)
+            off = dt.datetime(2023, 1, 1) + dt.timedelta(
+                minutes=rng.randrange(365 * 24 * 60))
+            on = off + dt.timedelta(minutes=rng.randrange(20, 600))
+            with self.subTest(from_=from_, to=to, off=off, on=on):
+                self.assertEqual(night(from_, to, off, on),
+                                 _nightflight(from_, to, off, on))
+
+    def test_night_p(self):
+        nvec = airfields["TOS"]
+        for month in range(1, 13):
+            for hour in range(0, 24, 3):
+                time = dt.datetime(2023, month, 15, hour)
+                self.assertEqual(aims.night.night_p(nvec, time),
+                                 nightcalc.night_p(nvec, time))
+
+
+class TestNights(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk_size = aims.night.CHUNK_SIZE
+        aims.night.CHUNK_SIZE = 4
+
+    def tearDown(self):
+        aims.night.CHUNK_SIZE = self.chunk_size
+
+    def test_parallel(self):
+        rng = random.Random(0)
+        sectors = []
+        for _ in range(30):
+            from_, to = rng.sample(("BRS", "ALC", "EDI", "FNC", "XXXX"), 2)
+            off = dt.datetime(2023, 1, 1) + dt.timedelta(
+                minutes=rng.randrange(365 * 24 * 60))
+            on = off + dt.timedelta(minutes=rng.randrange(60, 240))
+            sectors.append(Sector("TST1", None, None, from_, to, off, on,
+                                  False, False, ()))
+        sectors += sectors[:5]  # repeated sectors
+        expected = [night(X.from_, X.to, X.off, X.on) for X in sectors]
+        self.assertEqual(nights(sectors), expected)
+        self.assertEqual(nights(sectors, jobs=3), expected)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            nights([], engine="xxx")
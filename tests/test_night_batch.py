@@ -0,0 +1,84 @@
+import unittest
+import datetime as dt
+import math
+import random
+
+from aims.data_structures import Sector
+import aims.night
+
+try:
+    import aims.night_batch
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+
+def _sector(from_, to, off, minutes):
+    return Sector("TST1", None, None, from_, to,
+                  off, off + dt.timedelta(minutes=minutes),
+                  False, False, ())
+
+
+@unittest.skipUnless(HAVE_NUMPY, "NumPy not installed")
+class TestNights(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(aims.night_batch.nights([]), [])
+
+    def test_unknown_airport(self):
+        sectors = [_sector("BRS", "XXXX", dt.datetime(2023, 1, 1, 1), 120),
+                   _sector("BRS", "ALC", dt.datetime(2023, 1, 1, 1), 140)]
+        self.assertEqual(aims.night_batch.nights(sectors),
+                         [(0, False), (140, True)])
+
+    def test_bad_times(self):
+        with self.assertRaises(ValueError):
+            aims.night_batch.nights(
+                [_sector("BRS", "ALC", dt.datetime(2023, 1, 1, 1), 0)])
+
+    def test_chunks(self):
+        sectors = [_sector("BRS", "ALC", dt.datetime(2023, 1, 1, X), 140)
+                   for X in range(10)]
+        sectors.insert(3, _sector("BRS", "XXXX", dt.datetime(2023, 1, 1), 60))
+        expected = aims.night_batch.nights(sectors)
+        chunk_size = aims.night.CHUNK_SIZE
+        aims.night.CHUNK_SIZE = 4
+        try:
+            self.assertEqual(aims.night_batch.nights(sectors), expected)
+        finally:
+            aims.night.CHUNK_SIZE = chunk_size
+
+    def test_engine(self):
+        sectors = [_sector("BRS", "ALC", dt.datetime(2023, 1, 1, X), 140)
+                   for X in range(0, 24, 2)]
+        self.assertEqual(aims.night.nights(sectors, engine="numpy"),
+                         aims.night_batch.nights(sectors))
+
+    def test_against_scalar(self):
+        airports = ("BRS", "AGP", "LIS", "NCL", "BFS", "GVA", "AMS", "FAO",
+                    "ALC", "PMI", "EDI", "GLA", "CDG", "BCN", "FCO", "AYT")
+        rng = random.Random(0)
+        sectors = []
+        for _ in range(1000):
+            from_, to = rng.sample(airports, 2)
+            off = dt.datetime(2023, 1, 1) + dt.timedelta(
+                minutes=rng.randrange(365 * 24 * 60))
+            # a realistic block time for the distance at 450 knots
+            nvecs = aims.night.airfields[from_], aims.night.airfields[to]
+            distance = math.acos(sum(A * B for A, B in zip(*nvecs))) * 3440
+            minutes = 20 + round(distance / 450 * 60) + rng.randrange(20)
+            sectors.append(_sector(from_, to, off, minutes))
+        for sector, (duration, landing) in zip(
+                sectors, aims.night_batch.nights(sectors)):
+            expected_duration, expected_landing = aims.night.night(
+                sector.from_, sector.to, sector.off, sector.on)
+            with self.subTest(sector=sector):
+                self.assertLessEqual(abs(duration - expected_duration),
+                                     aims.night_batch.TOLERANCE)
+                if landing != expected_landing:
+                    # only acceptable close to the twilight boundary
+                    nvec = aims.night.airfields[sector.to]
+                    margin = dt.timedelta(minutes=2)
+                    self.assertNotEqual(
+                        aims.night.night_p(nvec, sector.on - margin),
+                        aims.night.night_p(nvec, sector.on + margin))
@@ -1,8 +1,10 @@
 import unittest
 import datetime
+import io
 from freezegun import freeze_time
 
-from aims.output import roster, efj, ical
+from aims.output import roster, efj, ical, csv
+import aims.output
 from aims.data_structures import Duty, Sector, CrewMember, AllDayEvent
 
 
@@ -148,6 +150,16 @@ class TestRoster(unittest.TestCase):
     def test_empty(self):
         self.assertEqual(roster(()), "")
 
+    def test_tz(self):
+        self.assertEqual(
+            roster((standard_duty, standby_duty), "Europe/Madrid"),
+            "02/06/2023 07:00-18:01 BRS-LIS-BRS-NCL-BRS 7:02/11:01\n"
+            "25/07/2024 07:15-15:15 ESBY 0:00/8:00")
+        self.assertEqual(roster((standby_duty, ), "UTC"),
+                         "25/07/2024 05:15-13:15 ESBY 0:00/8:00")
+        with self.assertRaises(ValueError):
+            roster((standby_duty, ), "Europe/Nowhere")
+
 
 class TestEFJ(unittest.TestCase):
 
@@ -191,6 +203,58 @@ class TestEFJ(unittest.TestCase):
         self.assertEqual(efj(()), "")
 
 
+class TestStreaming(unittest.TestCase):
+
+    duties = (standard_duty, standby_duty, standby_before_flight,
+              loe_day1, loe_day2, loe_day3)
+
+    def test_iter(self):
+        ade = (AllDayEvent(datetime.date(2024, 1, 2), "P/T"), )
+        with freeze_time("2024-01-01"):
+            for format_ in aims.output.FORMATS:
+                with self.subTest(format_=format_):
+                    self.assertEqual(
+                        "".join(aims.output.iter_render(
+                            format_, self.duties, ade)),
+                        aims.output.render(format_, self.duties, ade))
+
+    def test_empty(self):
+        for format_ in aims.output.FORMATS:
+            with self.subTest(format_=format_):
+                self.assertEqual(
+                    "".join(aims.output.iter_render(format_, ())),
+                    aims.output.render(format_, ()))
+
+    def test_write(self):
+        stream = io.StringIO(newline="")
+        aims.output.write("csv", self.duties, stream)
+        self.assertEqual(stream.getvalue(), csv(self.duties))
+
+    def test_incremental(self):
+        # the first duty's lines are available before the second duty is
+        # read from the iterator
+        def duties():
+            yield standard_duty
+            raise RuntimeError("read too far")
+        lines = aims.output.iter_efj(duties())
+        self.assertEqual(next(lines), "2023-06-02")
+        self.assertEqual(next(aims.output.iter_roster(duties())),
+                         roster((standard_duty, )))
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            aims.output.iter_render("pdf", ())
+
+
+class TestJobs(unittest.TestCase):
+
+    def test_parallel(self):
+        duties = (standard_duty, standby_before_flight, loe_day1) * 100
+        self.assertEqual(efj(duties, jobs=2), efj(duties))
+        self.assertEqual(csv(duties, jobs=2), csv(duties))
+        self.assertEqual(efj(iter(duties), jobs=2), efj(duties))
+
+
 @freeze_time("2024-01-01")
 class Test_ical(unittest.TestCase):
 
@@ -1,7 +1,11 @@
 import unittest
+import io
 
-from aims.parse import parse
+import aims.parse
+from aims.parse import parse, parse_stream, split, ReportType
 from aims.data_structures import InputFileException
+from test_roster import roster_html, roster_html_result
+from test_logbook import logbook_html
 
 
 class TestParse(unittest.TestCase):
@@ -18,3 +22,81 @@ class TestParse(unittest.TestCase):
         with self.assertRaises(InputFileException):
             parse("<!DOCTYPE html><html><head><title>Bad</title></head>"
                   "<body><p>Bad!</p></body></html>")
+
+
+class TestParseStream(unittest.TestCase):
+
+    def test_chunks(self):
+        for size in (1, 7, 100, len(roster_html)):
+            chunks = (roster_html[X:X + size]
+                      for X in range(0, len(roster_html), size))
+            self.assertEqual(split(parse_stream(chunks)),
+                             roster_html_result)
+
+    def test_file(self):
+        self.assertEqual(split(parse_stream(io.StringIO(roster_html))),
+                         roster_html_result)
+        self.assertEqual(split(parse_stream(io.StringIO(logbook_html))),
+                         parse(logbook_html))
+
+    def test_incremental(self):
+        # The duty should be available before the rest of the file is read
+        end = roster_html.index("<tr><td></td><td>03")
+        events = parse_stream((roster_html[:end], ))
+        self.assertEqual(next(events), roster_html_result[0][0])
+        with self.assertRaises(InputFileException):
+            next(events)
+
+    def test_errors(self):
+        for bad in ("", "afjp oijfqoefqnknzn a",
+                    "<!DOCTYPE html><html><head><title>Bad</title></head>"
+                    "<body><p>Bad!</p></body></html>"):
+            with self.assertRaises(InputFileException):
+                parse_stream(io.StringIO(bad))
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = aims.parse.report_types()
+
+    def tearDown(self):
+        aims.parse._registry[:] = self.saved
+
+    def test_identify(self):
+        self.assertEqual(aims.parse.identify(roster_html).name, "roster")
+        self.assertEqual(aims.parse.identify(logbook_html).name, "logbook")
+        self.assertIsNone(aims.parse.identify("<html></html>"))
+
+    def test_sniff_window(self):
+        padded = roster_html.replace(
+            "<head>", "<head>" + " " * aims.parse.DEFAULT_SNIFF_WINDOW)
+        self.assertIsNone(aims.parse.identify(padded))
+        with self.assertRaises(InputFileException):
+            parse(padded)
+        with self.assertRaises(InputFileException):
+            parse_stream(io.StringIO(padded))
+
+    def test_precedence(self):
+        # With only the start of the text, a lower precedence report type
+        # must not be chosen until higher precedence types are ruled out.
+        text = "<!DOCTYPE html><html>" + aims.parse.LOGBOOK_MARKER
+        self.assertIsNone(aims.parse.identify(text, False))
+        self.assertEqual(aims.parse.identify(text).name, "logbook")
+
+    def test_register(self):
+        custom = roster_html.replace("Personal&nbsp;Crew&nbsp;", "Custom")
+        with self.assertRaises(InputFileException):
+            parse(custom)
+        aims.parse.register(
+            ReportType("custom", ("CustomSchedule", ), "aims.roster", 1000))
+        self.assertEqual(aims.parse.report_types()[-1].name, "custom")
+        self.assertEqual(parse(custom), roster_html_result)
+        self.assertEqual(split(parse_stream(io.StringIO(custom))),
+                         roster_html_result)
+        # replace existing entry
+        aims.parse.register(
+            ReportType("custom", ("Nothing", ), "aims.roster"))
+        self.assertEqual(len(aims.parse.report_types()), len(self.saved) + 1)
+        with self.assertRaises(InputFileException):
+            parse(custom)
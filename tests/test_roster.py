@@ -12,6 +12,47 @@ crew = ('CP - 0000 - CAPTAIN THE',
         'FA - 8001 - FA', 'A',
         'FA - PAX - 8002 - POSITIONER')
 
+roster_html = """\
+<!DOCTYPE html><html><head>
+<title>Personal&nbsp;Crew&nbsp;Schedule&nbsp;Report</title></head><body>
+<table>
+<tr><td>Personal&nbsp;Crew&nbsp;Schedule&nbsp;Report</td></tr>
+<tr><td></td><td>Schedule&nbsp;Details</td></tr>
+<tr><td></td><td>Date</td><td>Duty</td><td>Details</td></tr>
+<tr><td></td><td>02/06/2023<br>Fri</td>
+<td>2867&nbsp;[320]<br>2868&nbsp;[320]</td>
+<td>BRS&nbsp; - LIS<br>LIS&nbsp; - BRS</td><td>05:00</td>
+<td>06:00 - A08:36<br/>A09:43 - A12:04</td><td>12:34</td>
+<td>05:00</td><td>07:34</td><td><!-- memo --></td>
+<td>CP - 0000 - CAPTAIN THE<br>FO - 0001 - FO<br>THE</td><td></td></tr>
+<tr><td></td><td>03/06/2023&nbsp;Sat</td><td>D/O</td><td>Day off</td>
+<td></td><td></td><td></td><td></td><td></td><td></td><td></td><td></td></tr>
+<tr><td></td><td>04/06/2023&nbsp;Sun</td><td></td><td></td>
+<td></td><td></td><td></td><td></td><td></td><td></td><td></td><td></td></tr>
+<tr><td></td><td></td></tr>
+</table></body></html>
+"""
+
+roster_html_result = (
+    (Duty(start=datetime.datetime(2023, 6, 2, 5, 0),
+          finish=datetime.datetime(2023, 6, 2, 12, 34),
+          sectors=(
+              Sector(name='2867', reg=None, type_='320',
+                     from_='BRS', to='LIS',
+                     off=datetime.datetime(2023, 6, 2, 6, 0),
+                     on=datetime.datetime(2023, 6, 2, 8, 36),
+                     quasi=False, position=False,
+                     crew=(CrewMember('CAPTAIN THE', 'CP'),
+                           CrewMember('FO THE', 'FO'))),
+              Sector(name='2868', reg=None, type_='320',
+                     from_='LIS', to='BRS',
+                     off=datetime.datetime(2023, 6, 2, 9, 43),
+                     on=datetime.datetime(2023, 6, 2, 12, 4),
+                     quasi=False, position=False,
+                     crew=(CrewMember('CAPTAIN THE', 'CP'),
+                           CrewMember('FO THE', 'FO'))))), ),
+    (AllDayEvent(datetime.date(2023, 6, 3), "D/O"), ))
+
 crew_result = (
     CrewMember(name='CAPTAIN THE', role='CP'),
     CrewMember(name='FO THE', role='FO'),
@@ -236,3 +277,94 @@ class Test_ade(unittest.TestCase):
                (), (), (), (), (), (), (), ())
         self.assertEqual(roster._ade(src),
                          AllDayEvent(datetime.date(2023, 6, 4), "D/O"))
+
+
+class Test_duties(unittest.TestCase):
+
+    def test_engines(self):
+        # AIMS writes "Schedule&nbsp;Details"; a plain space is also accepted,
+        # as is a <th> heading, which the original BeautifulSoup
+        # implementation matched
+        variants = (
+            roster_html,
+            roster_html.replace("Schedule&nbsp;Details", "Schedule Details"),
+            roster_html.replace("<td>Schedule&nbsp;Details</td>",
+                                "<th>Schedule&nbsp;Details</th>"))
+        for engine in roster.ENGINES:
+            for html in variants:
+                self.assertEqual(roster.duties(html, engine),
+                                 roster_html_result)
+
+    def test_bad_engine(self):
+        with self.assertRaises(ValueError):
+            roster.duties(roster_html, "nonexistent")
+
+    def test_truncated(self):
+        truncated = roster_html[:roster_html.index("<tr><td></td><td>03")]
+        for engine in roster.ENGINES:
+            with self.assertRaises(InputFileException):
+                roster.duties(truncated, engine)
+
+
+class Test_update(unittest.TestCase):
+
+    def test_update(self):
+        first = roster.update(roster_html)
+        self.assertEqual(first[:2], roster_html_result)
+        self.assertEqual(first.changes.added,
+                         roster_html_result[0] + roster_html_result[1])
+        self.assertEqual(first.changes[1:], ((), ()))
+        # unchanged
+        second = roster.update(roster_html, first.state)
+        self.assertEqual(second[:2], roster_html_result)
+        self.assertEqual(second.changes, ((), (), ()))
+        self.assertIs(second.duties[0], first.duties[0])
+        # day off removed, new duty added, duty modified
+        revised = (
+            roster_html
+            .replace("12:34", "13:34")
+            .replace("<td>D/O</td>", "<td></td>")
+            .replace("<td></td><td></td><td></td><td></td><td></td><td></td>"
+                     "<td></td><td></td></tr>\n<tr><td></td><td></td>",
+                     "<td></td><td></td><td></td><td></td><td></td><td></td>"
+                     "<td></td><td></td></tr>\n"
+                     "<tr><td></td><td>05/06/2023</td><td>ESBY</td>"
+                     "<td>Early Standby</td><td></td><td>05:15 - 13:15</td>"
+                     "<td></td><td></td><td>08:00</td><td></td><td></td>"
+                     "<td></td></tr>\n<tr><td></td><td></td>"))
+        third = roster.update(revised, second.state)
+        self.assertEqual(third.duties, roster.duties(revised)[0])
+        self.assertEqual(third.ade, ())
+        self.assertEqual(third.changes.added, (third.duties[1], ))
+        self.assertEqual(third.changes.removed, roster_html_result[1])
+        self.assertEqual(third.changes.modified,
+                         ((first.duties[0], third.duties[0]), ))
+        self.assertEqual(third.duties[0].finish,
+                         datetime.datetime(2023, 6, 2, 13, 34))
+
+
+class Test_lazy(unittest.TestCase):
+
+    def test_lazy(self):
+        duties, ade = roster.duties(roster_html, lazy=True)
+        self.assertIsInstance(duties, roster.LazyDuties)
+        self.assertEqual(ade, roster_html_result[1])
+        self.assertEqual(len(duties), 1)
+        self.assertIn("0 converted", repr(duties))
+        self.assertEqual(duties[0], roster_html_result[0][0])
+        self.assertIs(duties[0], duties[-1])
+        self.assertIn("1 converted", repr(duties))
+        self.assertEqual(duties, roster_html_result[0])
+        self.assertEqual(tuple(duties), roster_html_result[0])
+        self.assertEqual(duties[0:1], roster_html_result[0])
+        self.assertEqual(duties[1:], ())
+        self.assertIs(duties[:][0], duties[0])
+        with self.assertRaises(IndexError):
+            duties[1]
+
+    def test_deferred_error(self):
+        bad = roster_html.replace("06:00 - A08:36", "06:00 - A28:36")
+        duties, _ = roster.duties(bad, lazy=True)
+        self.assertEqual(len(duties), 1)
+        with self.assertRaises(InputFileException):
+            duties[0]
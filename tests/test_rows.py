@@ -0,0 +1,67 @@
+import unittest
+
+import aims.rows as rows
+
+
+class TestRowExtractor(unittest.TestCase):
+
+    def test_simple(self):
+        html = ("<table><tr><td>a</td><td> b <br> c </td><td></td></tr>"
+                "<tr><td>d&nbsp;e</td></tr></table>")
+        self.assertEqual(
+            list(rows.rows(html)),
+            [(("a",), ("b", "c"), ()), (("d\xa0e",),)])
+
+    def test_th(self):
+        html = "<table><tr><th>a</th><td>b</td><th>c<td>d</tr></table>"
+        self.assertEqual(
+            list(rows.rows(html)),
+            [(("a",), ("b",), ("c",), ("d",))])
+
+    def test_implied_close(self):
+        html = "<table><tr><td>a<td>b<tr><td>c</table>"
+        self.assertEqual(
+            list(rows.rows(html)),
+            [(("a",), ("b",)), (("c",),)])
+
+    def test_comments_and_scripts(self):
+        html = ("<table><tr><td>a<!-- comment -->b</td>"
+                "<td><script>var x;</script>c</td></tr></table>")
+        self.assertEqual(
+            list(rows.rows(html)),
+            [(("a", "b"), ("c",))])
+
+    def test_incremental(self):
+        html = ("<table><tr><td>abc&nbsp;def</td><td>ghi<br>jkl</td></tr>"
+                "</table>")
+        for c in range(len(html)):
+            parser = rows.RowExtractor()
+            parser.feed(html[:c])
+            parser.feed(html[c:])
+            parser.close()
+            self.assertEqual(parser.rows,
+                             [(("abc\xa0def",), ("ghi", "jkl"))])
+
+    def test_no_table(self):
+        self.assertEqual(list(rows.rows("<p>Hello</p>")), [])
+
+
+class TestFirstStringExtractor(unittest.TestCase):
+
+    def test_simple(self):
+        html = ("<table><tr><td>a</td><td> <br>b<br>c</td><td></td></tr>"
+                "<tr><td>d</td><td>x</td><td>e</td></tr>"
+                "<tr><td>f</td></tr></table>")
+        self.assertEqual(
+            list(rows.first_strings(html, 1, lambda X: X != "x")),
+            [("a", "b", "")])
+
+    def test_incremental(self):
+        html = ("<table><tr><td>abc&nbsp;def</td><td>ghi<br>jkl</td></tr>"
+                "</table>")
+        for c in range(len(html)):
+            parser = rows.FirstStringExtractor(0, bool)
+            parser.feed(html[:c])
+            parser.feed(html[c:])
+            parser.close()
+            self.assertEqual(parser.rows, [("abc\xa0def", "ghi")])
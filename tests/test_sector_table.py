@@ -0,0 +1,55 @@
+import unittest
+import datetime
+
+import aims.logbook_report as report
+import aims.output
+from aims.sector_table import SectorTable
+from aims.data_structures import Sector, CrewMember
+from test_logbook import logbook_html
+from test_output import standby_before_flight, loe_day1
+
+
+class TestSectorTable(unittest.TestCase):
+
+    def test_roundtrip(self):
+        sectors = standby_before_flight.sectors + loe_day1.sectors
+        table = SectorTable(sectors)
+        self.assertEqual(len(table), len(sectors))
+        self.assertEqual(tuple(table), sectors)
+        self.assertEqual(table[-1], sectors[-1])
+        self.assertEqual(table[1:3], sectors[1:3])
+        self.assertEqual(table.off(2), sectors[2].off)
+        with self.assertRaises(IndexError):
+            table[len(sectors)]
+        # crews and strings are stored once
+        self.assertIs(table[2].crew, table[3].crew)
+        self.assertIs(table[2].from_, table[3].to)
+
+    def test_whole_minutes(self):
+        sector = Sector("1", None, None, None, None,
+                        datetime.datetime(2024, 1, 1, 0, 0, 30),
+                        datetime.datetime(2024, 1, 1, 1, 0),
+                        True, False, (CrewMember("A", "CP"), ))
+        with self.assertRaises(ValueError):
+            SectorTable((sector, ))
+
+    def test_invalid_on(self):
+        # a failed append leaves the table as it was
+        table = SectorTable(standby_before_flight.sectors)
+        sector = standby_before_flight.sectors[0]
+        with self.assertRaises(ValueError):
+            table.append(sector._replace(
+                on=sector.on + datetime.timedelta(seconds=30)))
+        self.assertEqual(len(table), len(standby_before_flight.sectors))
+        self.assertEqual(tuple(table), standby_before_flight.sectors)
+        for column in (table.offs, table.ons, table.names, table.regs,
+                       table.types, table.froms, table.tos, table.flags,
+                       table.crews):
+            self.assertEqual(len(column), len(table))
+
+    def test_logbook(self):
+        table = report.table(logbook_html)
+        duties, _ = report.duties(logbook_html)
+        self.assertEqual(tuple(report.iter_duties(table)), duties)
+        self.assertEqual(aims.output.efj(report.iter_duties(table)),
+                         aims.output.efj(duties))
@@ -0,0 +1,166 @@
+import unittest
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+from unittest import mock
+
+import aims.api
+import aims.serve
+from test_roster import roster_html
+
+
+class UnixConnection(http.client.HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class ServerMixin:
+
+    def start(self, **kwargs):
+        # silence the access log
+        patcher = mock.patch.object(aims.serve.Handler, "log_message")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = aims.serve.server(**kwargs)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def post(self, conn, body):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        conn.request("POST", "/", body,
+                     {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+
+class TestServe(ServerMixin, unittest.TestCase):
+
+    request = {"roster": roster_html, "format": "efj", "options": []}
+
+    def setUp(self):
+        self.start(address=("127.0.0.1", 0), threads=2, max_bytes=1 << 16)
+        self.conn = http.client.HTTPConnection(
+            *self.server.server_address[:2], timeout=10)
+
+    def tearDown(self):
+        self.conn.close()
+        super().tearDown()
+
+    def test_keep_alive(self):
+        expected = aims.api.convert(self.request)
+        self.assertEqual(self.post(self.conn, self.request), (200, expected))
+        sock = self.conn.sock
+        self.assertIsNotNone(sock)
+        self.assertEqual(self.post(self.conn, self.request), (200, expected))
+        self.assertIs(self.conn.sock, sock)
+
+    def test_conversion_error(self):
+        # as for the lambda, the error message is the result
+        self.assertEqual(
+            self.post(self.conn, {"roster": "Not a roster", "format": "efj",
+                                  "options": []}),
+            (200, "HTML5 header not found."))
+
+    def test_bad_request(self):
+        for body in (b"{", b"[]", {"roster": roster_html}):
+            with self.subTest(body=body):
+                status, result = self.post(self.conn, body)
+                self.assertEqual(status, 400)
+                self.assertIn("error", result)
+        # the connection is still usable
+        self.assertEqual(self.post(self.conn, self.request)[0], 200)
+
+    def test_too_large(self):
+        status, result = self.post(self.conn, b" " * (1 << 17))
+        self.assertEqual(status, 413)
+
+    def test_get(self):
+        self.conn.request("GET", "/")
+        response = self.conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 405)
+        self.assertEqual(response.getheader("Allow"), "POST")
+
+    def test_concurrent(self):
+        expected = aims.api.convert(self.request)
+        results = []
+
+        def client():
+            conn = http.client.HTTPConnection(
+                *self.server.server_address[:2], timeout=10)
+            results.append(self.post(conn, self.request))
+            conn.close()
+        threads = [threading.Thread(target=client) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [(200, expected)] * 4)
+
+
+class TestUnixSocket(ServerMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "aims.sock")
+        self.start(socket_path=self.path, threads=1)
+
+    def tearDown(self):
+        super().tearDown()
+        self.assertFalse(os.path.exists(self.path))
+        self.tmpdir.cleanup()
+
+    def test_request(self):
+        request = {"roster": roster_html, "format": "roster",
+                   "options": ["tz=UTC"]}
+        conn = UnixConnection(self.path)
+        self.assertEqual(self.post(conn, request),
+                         (200, aims.api.convert(request)))
+        conn.close()
+
+    def test_not_a_socket(self):
+        path = os.path.join(self.tmpdir.name, "keep.txt")
+        with open(path, "w") as f:
+            f.write("keep")
+        with self.assertRaises(FileExistsError):
+            aims.serve.server(socket_path=path)
+        with open(path) as f:
+            self.assertEqual(f.read(), "keep")
+
+    def test_stale_socket(self):
+        # e.g. left by a server that was killed
+        path = os.path.join(self.tmpdir.name, "stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(path)
+        srv = aims.serve.server(socket_path=path, threads=1)
+        srv.server_close()
+        self.assertFalse(os.path.exists(path))
+
+
+class TestProcessPool(ServerMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.start(address=("127.0.0.1", 0), jobs=2)
+
+    def test_request(self):
+        request = {"roster": roster_html, "format": "csv", "options": []}
+        conn = http.client.HTTPConnection(*self.server.server_address[:2],
+                                          timeout=30)
+        self.assertEqual(self.post(conn, request),
+                         (200, aims.api.convert(request)))
+        conn.close()
@@ -0,0 +1,154 @@
+import unittest
+import gzip
+import io
+import mmap
+import os
+import pathlib
+import tempfile
+import zipfile
+
+import aims.source
+from aims.source import text_chunks, sniff_encoding, stem
+from aims.parse import parse, parse_stream, split
+from aims.cache import ParseCache
+from aims.data_structures import InputFileException
+from test_roster import roster_html, roster_html_result
+
+
+class TestSniffEncoding(unittest.TestCase):
+
+    def test_default(self):
+        self.assertEqual(sniff_encoding(b"<html></html>"), "utf-8")
+
+    def test_bom(self):
+        self.assertEqual(sniff_encoding(b"\xef\xbb\xbf<html>"), "utf-8-sig")
+        self.assertEqual(sniff_encoding("<html>".encode("utf-16")), "utf-16")
+
+    def test_meta(self):
+        self.assertEqual(
+            sniff_encoding(b'<meta charset="windows-1252">'), "cp1252")
+        self.assertEqual(
+            sniff_encoding(b'<meta http-equiv="Content-Type" '
+                           b'content="text/html; charset=ISO-8859-1">'),
+            "iso8859-1")
+
+    def test_unknown(self):
+        self.assertEqual(sniff_encoding(b'<meta charset="bogus">'), "utf-8")
+
+
+class TestTextChunks(unittest.TestCase):
+
+    def test_str(self):
+        self.assertEqual(list(text_chunks("abc")), ["abc"])
+
+    def test_bytes(self):
+        data = roster_html.encode("utf-8")
+        for source in (data, bytearray(data), memoryview(data)):
+            self.assertEqual("".join(text_chunks(source)), roster_html)
+
+    def test_declared_encoding(self):
+        html = '<meta charset="windows-1252"><p>Caf\xe9 €</p>'
+        self.assertEqual(
+            "".join(text_chunks(html.encode("cp1252"))), html)
+
+    def test_newlines(self):
+        self.assertEqual("".join(text_chunks(b"a\r\nb\rc\n")), "a\nb\nc\n")
+
+    def test_split_character(self):
+        # a multibyte character split across chunks must survive decoding
+        data = "é" * 10
+        encoded = data.encode("utf-8")
+        chunks = (encoded[X:X + 3] for X in range(0, len(encoded), 3))
+        self.assertEqual("".join(text_chunks(chunks)), data)
+
+    def test_bad_encoding(self):
+        with self.assertRaises(InputFileException):
+            "".join(text_chunks(b"abc\xff"))
+
+    def test_compressed_bytes(self):
+        data = roster_html.encode("utf-8")
+        self.assertEqual("".join(text_chunks(gzip.compress(data))),
+                         roster_html)
+
+    def test_file_objects(self):
+        data = roster_html.encode("utf-8")
+        self.assertEqual("".join(text_chunks(io.BytesIO(data))), roster_html)
+        self.assertEqual("".join(text_chunks(io.StringIO(roster_html))),
+                         roster_html)
+
+
+class TestFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data = roster_html.encode("utf-8")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _path(self, name):
+        return pathlib.Path(self.tmpdir.name, name)
+
+    def _zip(self, name, members):
+        path = self._path(name)
+        with zipfile.ZipFile(path, "w") as z:
+            for member in members:
+                z.writestr(member, self.data)
+        return path
+
+    def test_plain(self):
+        path = self._path("roster.htm")
+        path.write_bytes(self.data)
+        self.assertEqual(parse(path), roster_html_result)
+        self.assertEqual(split(parse_stream(path)), roster_html_result)
+
+    def test_gzip(self):
+        path = self._path("roster.htm.gz")
+        path.write_bytes(gzip.compress(self.data))
+        self.assertEqual(parse(path), roster_html_result)
+
+    def test_zip(self):
+        path = self._zip("roster.zip", ["roster.htm"])
+        self.assertEqual(parse(path), roster_html_result)
+
+    def test_zip_members(self):
+        for members in ([], ["a.htm", "b.html"]):
+            path = self._zip("roster.zip", members)
+            with self.assertRaises(InputFileException):
+                parse(path)
+
+    def test_missing(self):
+        with self.assertRaises(InputFileException):
+            parse(self._path("missing.htm"))
+
+    def test_bad_gzip(self):
+        path = self._path("roster.htm.gz")
+        path.write_bytes(gzip.compress(self.data)[:100])
+        with self.assertRaises(InputFileException):
+            parse(path)
+
+    def test_mmap(self):
+        path = self._path("roster.htm")
+        path.write_bytes(self.data)
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                self.assertEqual(parse(m), roster_html_result)
+
+    def test_cache(self):
+        path = self._path("roster.htm")
+        path.write_bytes(self.data)
+        cache = ParseCache(os.path.join(self.tmpdir.name, "cache"))
+        self.assertEqual(parse(path, cache), roster_html_result)
+        with aims.source.raw(path) as data:
+            key = cache.key(data)
+        self.assertEqual(key, cache.key(roster_html))
+        self.assertEqual(cache.get(key), roster_html_result)
+
+
+class TestStem(unittest.TestCase):
+
+    def test_stem(self):
+        self.assertEqual(stem("a/roster.htm"), "roster")
+        self.assertEqual(stem("a/roster.htm.gz"), "roster")
+        self.assertEqual(stem("roster.zip"), "roster")
+        self.assertEqual(stem("roster.tar.gz"), "roster.tar")
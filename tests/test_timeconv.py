@@ -0,0 +1,51 @@
+import unittest
+import datetime
+
+import aims.timeconv as timeconv
+
+
+class TestTimeconv(unittest.TestCase):
+
+    def _compare(self, func, fmt, inputs):
+        for in_ in inputs:
+            try:
+                expected = datetime.datetime.strptime(in_, fmt)
+            except ValueError as e:
+                with self.assertRaises(ValueError) as cm:
+                    func(in_)
+                self.assertEqual(str(cm.exception), str(e))
+                # exceptions are not memoised
+                with self.assertRaises(ValueError):
+                    func(in_)
+            else:
+                self.assertEqual(func(in_), expected.date()
+                                 if fmt != "%H:%M" else expected.time())
+                self.assertIs(func(in_), func(in_))
+
+    def test_date_dmy(self):
+        self._compare(timeconv.date_dmy, "%d/%m/%Y", (
+            "02/06/2023", "29/02/2024", "31/12/1999", "2/6/2023",
+            "29/02/2023", "32/07/2024", "00/01/2024", "01/13/2024",
+            "01-01-2024", "01/01/24", "", "aa/bb/cccc", "١٢/٠٦/٢٠٢٣"))
+
+    def test_date_dmy_short(self):
+        self._compare(timeconv.date_dmy_short, "%d/%m/%y", (
+            "23/07/22", "01/01/68", "01/01/69", "31/12/99", "1/1/22",
+            "30/02/22", "23/07/2022", "", "ab/cd/ef"))
+
+    def test_time_hm(self):
+        self._compare(timeconv.time_hm, "%H:%M", (
+            "00:00", "23:59", "05:15", "5:15", "24:00", "12:60",
+            "1215", "", "ab:cd", "12:5"))
+
+    def test_roster_time(self):
+        self.assertEqual(timeconv.roster_time("A08:36"),
+                         (datetime.time(8, 36), 0))
+        self.assertEqual(timeconv.roster_time("E00:57⁺¹"),
+                         (datetime.time(0, 57), 1))
+        self.assertEqual(timeconv.roster_time("14:00"),
+                         (datetime.time(14, 0), 0))
+        with self.assertRaises(ValueError):
+            timeconv.roster_time("24:00")
+        with self.assertRaises(ValueError):
+            timeconv.roster_time("X08:36")
@@ -0,0 +1,99 @@
+import unittest
+import os
+import tempfile
+
+import aims.batch as batch
+import aims.output
+import aims.watch as watch
+from aims.data_structures import InputFileException
+from test_roster import roster_html, roster_html_result
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        self.job = batch.Job(("efj", ))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text, mtime=None):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_debounce(self):
+        watcher = watch.Watcher(self.dir, self.job)
+        path = self.write("a.htm", roster_html[:1000], 10 ** 18)
+        self.assertEqual(watcher.poll(), [])
+        # still downloading
+        self.write("a.htm", roster_html, 10 ** 18 + 1)
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.poll(),
+                         [(path, [os.path.join(self.dir, "a.efj")], None)])
+        with open(os.path.join(self.dir, "a.efj")) as f:
+            self.assertEqual(f.read(),
+                             aims.output.efj(roster_html_result[0]) + "\n")
+        self.assertEqual(watcher.poll(), [])
+
+    def test_ignored(self):
+        watcher = watch.Watcher(self.dir, self.job)
+        self.write("a.htm.part", roster_html)
+        self.write(".a.htm", roster_html)
+        self.write("empty.htm", "")
+        os.mkdir(os.path.join(self.dir, "dir.htm"))
+        watcher.poll()
+        self.assertEqual(watcher.poll(), [])
+
+    def test_restart(self):
+        path = self.write("a.htm", roster_html, 10 ** 18)
+        watcher = watch.Watcher(self.dir, self.job)
+        watcher.poll()
+        self.assertEqual(len(watcher.poll()), 1)
+        # a new watcher with the saved state has nothing to do
+        watcher = watch.Watcher(self.dir, self.job)
+        watcher.poll()
+        self.assertEqual(watcher.poll(), [])
+        # nor if the file is touched or downloaded again
+        self.write("a.htm", roster_html, 2 * 10 ** 18)
+        watcher = watch.Watcher(self.dir, self.job)
+        watcher.poll()
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.state["a.htm"].mtime_ns, 2 * 10 ** 18)
+        # but a change of content or of settings is converted
+        self.write("a.htm", roster_html.replace("BRS", "BHX"), 3 * 10 ** 18)
+        watcher = watch.Watcher(self.dir, self.job)
+        watcher.poll()
+        self.assertEqual([X[0] for X in watcher.poll()], [path])
+        watcher = watch.Watcher(self.dir, batch.Job(("efj", "csv")))
+        watcher.poll()
+        self.assertEqual(watcher.poll()[0][1],
+                         [os.path.join(self.dir, X)
+                          for X in ("a.efj", "a.csv")])
+
+    def test_error(self):
+        path = self.write("bad.htm", "Not a roster")
+        watcher = watch.Watcher(self.dir, self.job)
+        watcher.poll()
+        (result, ) = watcher.poll()
+        self.assertEqual(result[0], path)
+        self.assertIn("InputFileException", result[2])
+        self.assertEqual(watch.Watcher(self.dir, self.job).state["bad.htm"],
+                         watcher.state["bad.htm"])
+        # not retried
+        watcher.poll()
+        self.assertEqual(watcher.poll(), [])
+
+    def test_bad_state(self):
+        path = os.path.join(self.dir, watch.STATE_FILE)
+        for text in ("{", '{"version": 2}'):
+            with self.subTest(text=text):
+                with open(path, "w") as f:
+                    f.write(text)
+                with self.assertRaises(InputFileException):
+                    watch.Watcher(self.dir, self.job)